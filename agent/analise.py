@@ -0,0 +1,140 @@
+import re
+from bisect import bisect_right
+from typing import Dict, Any, List, Optional
+
+# Palavras-chave (já normalizadas: minúsculas, sem acento) de cada rótulo.
+# "intencao:*" alimenta o classificador, "topico:*" o histórico de tópicos da
+# sessão e "tema:*" as sugestões do responder_generico.
+PALAVRAS_CHAVE = {
+    "intencao:consulta_saldo": ["saldo", "quanto tenho", "disponivel", "sobrou", "restante"],
+    "intencao:transferencia": ["transferir", "transferencia", "enviar", "mandar", "depositar", "passar", "pix"],
+    "intencao:extrato": ["transacoes", "extrato", "movimentacoes", "historico", "atividade"],
+    "intencao:pagamento_boleto": ["boleto", "conta", "fatura", "agua", "luz", "energia", "internet", "telefone"],
+    "intencao:pagamento_cartao": ["cartao", "comprar", "compra", "credito", "debito"],
+    "intencao:perfil": ["perfil", "comportamento", "analise", "gastos", "financeiro"],
+    "intencao:mcp": [
+        "emprestimo consignado", "consignado", "taxas", "juros", "taxa de juros", "elegibilidade",
+        "posso pegar emprestimo", "aprovacao", "consultar", "consulta", "margem", "margem consignavel",
+        "disponibilidade"
+    ],
+    "duvida": [
+        "?", "como", "o que e", "explique", "qual", "quando", "por que", "duvida", "pergunta",
+        "pode me informar", "gostaria de saber", "necessario", "necessarios", "documentos", "documentacao"
+    ],
+    "paginacao": ["mostrar mais", "mostre mais", "mais transacoes", "proxima pagina", "continuar o extrato"],
+    "boleto:agua": ["agua"],
+    "boleto:luz": ["luz", "energia"],
+    "boleto:internet": ["internet"],
+    "boleto:telefone": ["telefone", "celular"],
+    "estabelecimento:Restaurante": ["restaurante", "lanchonete", "comida"],
+    "estabelecimento:Supermercado": ["mercado", "supermercado", "compras"],
+    "estabelecimento:Farmácia": ["farmacia", "remedio", "medicamento"],
+    "estabelecimento:Posto de Combustível": ["posto", "gasolina", "combustivel"],
+    "topico:saldo": ["saldo", "disponivel", "conta"],
+    "topico:transferencia": ["transferir", "transferencia", "enviar"],
+    "topico:extrato": ["extrato", "transacoes", "historico"],
+    "topico:boleto": ["boleto", "conta", "fatura"],
+    "topico:cartao": ["cartao", "credito", "compra"],
+    "topico:perfil": ["perfil", "financeiro", "analise"],
+    "topico:emprestimo": ["emprestimo", "credito", "financiamento", "consignado", "taxa"],
+    "topico:api": ["api", "integracao", "sistema", "ferramenta", "consulta"],
+    "tema:investimentos": ["investir", "investimento", "aplicar", "rendimento"],
+    "tema:empréstimos": ["emprestimo", "credito", "financiamento", "emprestar"],
+    "tema:cartões": ["cartao", "credito", "comprar", "compra"],
+}
+
+# (nome, rótulo) de tópicos e temas, na ordem de prioridade
+TOPICOS = [(r.split(":", 1)[1], r) for r in PALAVRAS_CHAVE if r.startswith("topico:")]
+TEMAS = [(r.split(":", 1)[1], r) for r in PALAVRAS_CHAVE if r.startswith("tema:")]
+
+# Separadores de pedidos em uma mesma mensagem ("mostra meu saldo e o extrato dos últimos 10")
+SEPARADOR_PEDIDOS = re.compile(r",\s+|;\s*|\s+e\s+|\s+depois\s+|\s+também\s+")
+
+# Remoção de acentos que preserva o tamanho do texto, para que as posições dos
+# separadores (encontrados no texto com acentos: "e" separa, "é" não) valham
+# também no texto normalizado
+_SEM_ACENTO = str.maketrans("áàâãäéèêëíìîïóòôõöúùûüç", "aaaaaeeeeiiiiooooouuuuc")
+
+
+def _montar_indice():
+    rotulos_por_palavra: Dict[str, set] = {}
+    for rotulo, palavras in PALAVRAS_CHAVE.items():
+        for palavra in palavras:
+            rotulos_por_palavra.setdefault(palavra, set()).add(rotulo)
+    # Uma palavra-chave que contém outra também indica os rótulos dela ("compras" contém "compra"),
+    # preservando a semântica de busca por substring com uma única varredura sem sobreposição
+    indice = {
+        palavra: frozenset().union(*(r for outra, r in rotulos_por_palavra.items() if outra in palavra))
+        for palavra in rotulos_por_palavra
+    }
+    return indice, re.compile(_regex_trie(indice))
+
+
+def _regex_trie(palavras) -> str:
+    """Alternação das palavras fatorada por prefixos comuns ("compra(?:r|s)?").
+
+    Com os prefixos fatorados, cada posição do texto é descartada em um único
+    teste de caractere; os sufixos opcionais são gulosos, então a palavra-chave
+    mais longa vence na mesma posição.
+    """
+    arvore: Dict[str, Any] = {}
+    for palavra in palavras:
+        no = arvore
+        for caractere in palavra:
+            no = no.setdefault(caractere, {})
+        no[""] = True
+
+    def montar(no) -> str:
+        alternativas = [re.escape(c) + montar(filho) for c, filho in sorted(no.items()) if c]
+        if not alternativas:
+            return ""
+        if "" in no:
+            return "(?:" + "|".join(alternativas) + ")?"
+        return alternativas[0] if len(alternativas) == 1 else "(?:" + "|".join(alternativas) + ")"
+
+    return montar(arvore)
+
+
+_ROTULOS, _PADRAO = _montar_indice()
+
+
+def analisar_mensagem(mensagem: str) -> Dict[str, Any]:
+    """Analisa a mensagem do usuário em uma única varredura.
+
+    Retorna o texto normalizado, os rótulos encontrados na mensagem inteira e
+    em cada trecho (pedido) dela, os tópicos e o tema da mensagem.
+    """
+    minusculo = mensagem.lower()
+    texto = minusculo.translate(_SEM_ACENTO)
+
+    limites = [0]
+    trechos = []
+    for separador in SEPARADOR_PEDIDOS.finditer(minusculo):
+        trechos.append(texto[limites[-1]:separador.start()])
+        limites.append(separador.end())
+    trechos.append(texto[limites[-1]:])
+
+    rotulos = set()
+    if len(trechos) == 1:
+        for match in _PADRAO.finditer(texto):
+            rotulos |= _ROTULOS[match.group()]
+        rotulos_trechos = [rotulos]
+    else:
+        rotulos_trechos = [set() for _ in trechos]
+        for match in _PADRAO.finditer(texto):
+            encontrados = _ROTULOS[match.group()]
+            rotulos |= encontrados
+            rotulos_trechos[bisect_right(limites, match.start()) - 1] |= encontrados
+
+    return {
+        "texto": texto,
+        "rotulos": rotulos,
+        "trechos": [{"texto": t, "rotulos": r} for t, r in zip(trechos, rotulos_trechos)],
+        "topicos": [nome for nome, r in TOPICOS if r in rotulos],
+        "tema": next((nome for nome, r in TEMAS if r in rotulos), None)
+    }
+
+
+def rotulo(rotulos, prefixo: str, opcoes: List[str], padrao: Optional[str] = None) -> Optional[str]:
+    """Primeira opção de `prefixo` presente nos rótulos, na ordem dada."""
+    return next((opcao for opcao in opcoes if f"{prefixo}:{opcao}" in rotulos), padrao)
@@ -0,0 +1,162 @@
+import threading
+from array import array
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Códigos de tipo; outros tipos ficam com -1 e não entram nas análises
+TIPOS = ("transferência", "pagamento_boleto", "pagamento_cartao")
+TRANSFERENCIA, BOLETO, CARTAO = range(len(TIPOS))
+_CODIGO_TIPO = {tipo: codigo for codigo, tipo in enumerate(TIPOS)}
+
+# Categorias de boleto pelo prefixo do código de barras (simulado)
+CATEGORIAS_BOLETO = ("Água", "Energia", "Outros")
+_PREFIXOS_BOLETO = (("765", 0), ("891", 1))
+
+_ESQUEMA = (
+    ("centavos", np.int64),
+    ("epoch", np.int64),
+    ("tipo", np.int8),
+    ("cliente", np.int32),
+    ("categoria", np.int32),
+)
+
+
+def categoria_boleto(codigo_barras: str) -> int:
+    for prefixo, categoria in _PREFIXOS_BOLETO:
+        if codigo_barras.startswith(prefixo):
+            return categoria
+    return len(CATEGORIAS_BOLETO) - 1
+
+
+def centavos(valor) -> int:
+    return int(round(valor * 100))
+
+
+def pagador(transacao: Dict[str, Any]):
+    """Código do tipo e cliente que paga a transação (origem, ou titular no cartão)."""
+    tipo = _CODIGO_TIPO.get(transacao.get("tipo"), -1)
+    return tipo, transacao.get("cliente_id") if tipo == CARTAO else transacao.get("origem")
+
+
+class ColunasTransacoes:
+    """Representação colunar do ledger para análises vetorizadas.
+
+    Cada transação vira uma linha em arrays NumPy: valor em centavos, data em
+    µs, código do tipo, código do cliente que paga (origem ou titular do
+    cartão) e código da categoria (do boleto ou do estabelecimento). As
+    linhas de cada cliente ficam em um índice próprio, então analisar um
+    cliente custa O(k) nas linhas dele, e não no volume do banco.
+    """
+
+    def __init__(self, capacidade: int = 1024):
+        self.capacidade_inicial = capacidade
+        self._lock = threading.Lock()
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self.n = 0
+        self._colunas = {nome: np.empty(self.capacidade_inicial, dtype=dtype) for nome, dtype in _ESQUEMA}
+        self._linhas_cliente: Dict[int, array] = {}
+        self._clientes: Dict[str, int] = {}
+        self.estabelecimentos: List[str] = []
+        self._codigos_estabelecimento: Dict[str, int] = {}
+
+    def _codigo_estabelecimento(self, nome: str) -> int:
+        codigo = self._codigos_estabelecimento.get(nome)
+        if codigo is None:
+            codigo = self._codigos_estabelecimento[nome] = len(self.estabelecimentos)
+            self.estabelecimentos.append(nome)
+        return codigo
+
+    def adicionar(self, transacao: Dict[str, Any], epoch: int):
+        tipo, dono = pagador(transacao)
+        with self._lock:
+            if tipo == BOLETO:
+                categoria = categoria_boleto(transacao.get("codigo_barras", ""))
+            elif tipo == CARTAO:
+                categoria = self._codigo_estabelecimento(transacao.get("estabelecimento", "Desconhecido"))
+            else:
+                categoria = -1
+            cliente = self._clientes.setdefault(dono, len(self._clientes)) if dono is not None else -1
+
+            if self.n == len(self._colunas["centavos"]):
+                # Dobra a capacidade; a troca dos arrays acontece antes de a linha entrar nos índices
+                self._colunas = {
+                    nome: np.concatenate([coluna, np.empty_like(coluna)]) for nome, coluna in self._colunas.items()
+                }
+            linha = self.n
+            colunas = self._colunas
+            colunas["centavos"][linha] = centavos(transacao.get("valor", 0))
+            colunas["epoch"][linha] = epoch
+            colunas["tipo"][linha] = tipo
+            colunas["cliente"][linha] = cliente
+            colunas["categoria"][linha] = categoria
+            self.n += 1
+            if tipo >= 0 and cliente >= 0:
+                linhas = self._linhas_cliente.get(cliente)
+                if linhas is None:
+                    linhas = self._linhas_cliente[cliente] = array("q")
+                linhas.append(linha)
+
+    def do_cliente(self, cliente_id: str) -> Dict[str, np.ndarray]:
+        """Colunas das transações pagas pelo cliente, na ordem em que foram registradas."""
+        with self._lock:
+            cliente = self._clientes.get(cliente_id)
+            linhas = self._linhas_cliente.get(cliente) if cliente is not None else None
+            linhas = np.array(linhas if linhas is not None else [], dtype=np.int64)
+            colunas = self._colunas
+        return {nome: coluna[linhas] for nome, coluna in colunas.items()}
+
+    def clientes(self) -> List[str]:
+        """Clientes com ao menos uma transação paga registrada."""
+        with self._lock:
+            codigos = set(self._linhas_cliente)
+            return [cliente_id for cliente_id, codigo in self._clientes.items() if codigo in codigos]
+
+    def clear(self):
+        with self._lock:
+            self._reiniciar()
+
+    def __len__(self):
+        return self.n
+
+
+def agrupar(codigos: np.ndarray, valores: np.ndarray, nomes, top: int = 3) -> Dict[str, Dict[str, Any]]:
+    """Quantidade e valor (R$) por categoria, das `top` maiores em valor.
+
+    Empates em valor ficam na ordem da primeira ocorrência, como na ordenação
+    estável da versão com dicionários.
+    """
+    if not len(codigos):
+        return {}
+    presentes, primeira = np.unique(codigos, return_index=True)
+    quantidade = np.bincount(codigos, minlength=len(nomes))[presentes]
+    soma = np.bincount(codigos, weights=valores, minlength=len(nomes))[presentes]
+    ordem = np.lexsort((primeira, -soma))[:top]
+    return {
+        nomes[presentes[i]]: {"quantidade": int(quantidade[i]), "valor": float(soma[i]) / 100}
+        for i in ordem
+    }
+
+
+def resumo_gastos(colunas: Dict[str, np.ndarray], estabelecimentos) -> Optional[Dict[str, Any]]:
+    """Totais e principais categorias de boletos e estabelecimentos; None se não houver transações."""
+    quantidade = len(colunas["centavos"])
+    if not quantidade:
+        return None
+    tipo = colunas["tipo"]
+    boletos = tipo == BOLETO
+    cartao = tipo == CARTAO
+    total_gastos = int(colunas["centavos"].sum()) / 100
+    return {
+        "total_gastos": total_gastos,
+        "num_transacoes": quantidade,
+        "principais_categorias_boletos": agrupar(
+            colunas["categoria"][boletos], colunas["centavos"][boletos], CATEGORIAS_BOLETO
+        ),
+        "principais_categorias_estabelecimentos": agrupar(
+            colunas["categoria"][cartao], colunas["centavos"][cartao], estabelecimentos
+        ),
+        "valor_medio_transacao": total_gastos / quantidade
+    }
@@ -0,0 +1,254 @@
+import calendar
+import re
+import unicodedata
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional, Iterable, Tuple
+
+# Palavras ignoradas na indexação de nomes ("Maria da Silva" -> "maria silva")
+STOPWORDS_NOMES = {"de", "da", "do", "das", "dos", "e"}
+
+# Acima desse tamanho um token sozinho é ambíguo demais para ser intersectado
+LIMITE_CANDIDATOS = 5000
+
+# Número no formato brasileiro: 1.234,56 | 1234,56 | 1234.56 | 1234
+_NUMERO = r"\d{1,3}(?:\.\d{3})+(?:,\d{1,2})?|\d+\.\d{1,2}(?![\d.])|\d+(?:,\d{1,2})?"
+
+# Valor monetário: o número não pode fazer parte de conta (98765-4), data (10/03) ou outro número
+_VALOR_REGEX = re.compile(
+    r"(?P<moeda>r\$\s*)?(?<![\d.,/-])(?P<num>" + _NUMERO + r")(?![\d/]|-\d)(?P<sufixo>\s*(?:reais|real)\b)?",
+    re.IGNORECASE
+)
+_CONTA_REGEX = re.compile(r"(?<![\d-])(\d{4,6})-(\d)(?![\d-])")
+_TOKEN_REGEX = re.compile(r"[a-z0-9]+")
+
+_MESES = {
+    "janeiro": 1, "fevereiro": 2, "marco": 3, "abril": 4, "maio": 5, "junho": 6,
+    "julho": 7, "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12
+}
+_ULTIMOS_REGEX = re.compile(r"ultim[oa]s?\s+(\d+)(?:\s+(dias?|semanas?|mes|meses))?")
+_MES_REGEX = re.compile(r"\b(" + "|".join(_MESES) + r")\b(?:\s+(?:de\s+)?(\d{4}))?")
+# Tipos de transação citados em pedidos de extrato ("extrato das transferências de março")
+_TIPOS_TRANSACAO = [
+    ("transferência", re.compile(r"\btransferencias?\b|\bpix\b")),
+    ("pagamento_boleto", re.compile(r"\bboletos?\b|\bcontas? de (?:agua|luz|energia|internet|telefone)\b")),
+    ("pagamento_cartao", re.compile(r"\bcompras?\b|\bcartao\b")),
+]
+_LOTE_REGEX = re.compile(
+    r"\b(?:estas|essas|estes|esses|as|os|minhas|meus)\s+(\d+)\s+(?:contas|boletos|transferencias|pagamentos)\b"
+)
+
+
+def normalizar(texto: str) -> str:
+    """Converte para minúsculas e remove acentos ("Transferência" -> "transferencia")."""
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    return texto.encode("ascii", "ignore").decode("ascii")
+
+
+def converter_numero(numero: str) -> float:
+    """Converte um número no formato brasileiro ou americano para float."""
+    if "," in numero:
+        return float(numero.replace(".", "").replace(",", "."))
+    if re.fullmatch(r"\d{1,3}(?:\.\d{3})+", numero):
+        return float(numero.replace(".", ""))
+    return float(numero)
+
+
+def extrair_valor(texto: str) -> Optional[float]:
+    """Extrai o valor monetário da mensagem.
+
+    Valores com "R$" ou seguidos de "reais" têm prioridade sobre números soltos;
+    números de conta e datas são ignorados.
+    """
+    primeiro = None
+    for match in _VALOR_REGEX.finditer(texto):
+        valor = converter_numero(match.group("num"))
+        if match.group("moeda") or match.group("sufixo"):
+            return valor
+        if primeiro is None:
+            primeiro = valor
+    return primeiro
+
+
+def extrair_tipo_transacao(texto: str) -> Optional[str]:
+    """Tipo de transação pedido no extrato ("transferência", "pagamento_boleto", "pagamento_cartao")."""
+    texto = normalizar(texto)
+    return next((tipo for tipo, regex in _TIPOS_TRANSACAO if regex.search(texto)), None)
+
+
+def extrair_quantidade_lote(texto: str) -> Tuple[Optional[int], str]:
+    """Quantidade anunciada em "pague estas 5 contas" e o texto normalizado sem o anúncio.
+
+    O anúncio é removido para que o número não seja lido como valor do primeiro item.
+    """
+    normalizado = normalizar(texto)
+    match = _LOTE_REGEX.search(normalizado)
+    if not match:
+        return None, texto
+    return int(match.group(1)), normalizado[:match.start()] + " " + normalizado[match.end():]
+
+
+def extrair_conta(texto: str) -> Optional[str]:
+    """Extrai um número de conta no formato 12345-6."""
+    match = _CONTA_REGEX.search(texto)
+    if match:
+        return f"{match.group(1)}-{match.group(2)}"
+    return None
+
+
+def extrair_periodo(texto: str, agora: Optional[datetime] = None) -> Dict[str, Any]:
+    """Extrai expressões de período da mensagem.
+
+    Retorna {"limite": N} para "últimas N transações" e {"inicio": ..., "fim": ...}
+    (datas ISO) para "últimos N dias", "extrato de março", "hoje", "mês passado" etc.
+    """
+    agora = agora or datetime.now()
+    texto = normalizar(texto)
+    hoje = agora.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    match = _ULTIMOS_REGEX.search(texto)
+    if match:
+        quantidade = int(match.group(1))
+        unidade = match.group(2)
+        if not unidade:
+            return {"limite": quantidade}
+        if unidade.startswith("dia"):
+            inicio = hoje - timedelta(days=quantidade)
+        elif unidade.startswith("semana"):
+            inicio = hoje - timedelta(weeks=quantidade)
+        else:
+            inicio = _somar_meses(hoje, -quantidade)
+        return {"inicio": inicio.isoformat(), "fim": agora.isoformat()}
+
+    match = _MES_REGEX.search(texto)
+    if match:
+        mes = _MESES[match.group(1)]
+        ano = int(match.group(2)) if match.group(2) else agora.year
+        if not match.group(2) and mes > agora.month:
+            ano -= 1
+        inicio = datetime(ano, mes, 1)
+        return {"inicio": inicio.isoformat(), "fim": _somar_meses(inicio, 1).isoformat()}
+
+    if "hoje" in texto:
+        return {"inicio": hoje.isoformat(), "fim": agora.isoformat()}
+    if "ontem" in texto:
+        return {"inicio": (hoje - timedelta(days=1)).isoformat(), "fim": hoje.isoformat()}
+    if "mes passado" in texto:
+        inicio = _somar_meses(hoje.replace(day=1), -1)
+        return {"inicio": inicio.isoformat(), "fim": hoje.replace(day=1).isoformat()}
+    if "este mes" in texto or "esse mes" in texto:
+        return {"inicio": hoje.replace(day=1).isoformat(), "fim": agora.isoformat()}
+    if "semana passada" in texto:
+        inicio_semana = hoje - timedelta(days=hoje.weekday())
+        return {"inicio": (inicio_semana - timedelta(weeks=1)).isoformat(), "fim": inicio_semana.isoformat()}
+    if "esta semana" in texto or "essa semana" in texto:
+        return {"inicio": (hoje - timedelta(days=hoje.weekday())).isoformat(), "fim": agora.isoformat()}
+
+    return {}
+
+
+def _somar_meses(data: datetime, meses: int) -> datetime:
+    """Mesmo dia `meses` meses depois (ou antes), limitado ao último dia do mês ("31/05" - 3 -> "28/02")."""
+    total = data.year * 12 + (data.month - 1) + meses
+    ano, mes = total // 12, total % 12 + 1
+    return data.replace(year=ano, month=mes, day=min(data.day, calendar.monthrange(ano, mes)[1]))
+
+
+def _tokens_nome(nome: str) -> List[str]:
+    return [t for t in _TOKEN_REGEX.findall(normalizar(nome)) if t not in STOPWORDS_NOMES]
+
+
+class IndiceClientes:
+    """Índice de nomes e contas de clientes para resolução de destinatários.
+
+    Cada consulta faz apenas buscas em dicionários pelos tokens da mensagem,
+    então o custo não depende do número de clientes indexados.
+    """
+
+    def __init__(self):
+        self._por_conta: Dict[str, str] = {}
+        self._por_nome: Dict[str, List[str]] = defaultdict(list)
+        self._por_token: Dict[str, List[str]] = defaultdict(list)
+
+    def adicionar(self, cliente_id: str, nome: str, conta: str = ""):
+        """Indexa um cliente pelo número da conta, nome completo e tokens do nome."""
+        if conta:
+            self._por_conta[conta] = cliente_id
+            self._por_conta[conta.replace("-", "")] = cliente_id
+
+        tokens = _tokens_nome(nome)
+        if not tokens:
+            return
+        chaves = {" ".join(tokens)}
+        if len(tokens) > 2:
+            chaves.add(f"{tokens[0]} {tokens[-1]}")
+        for chave in chaves:
+            self._por_nome[chave].append(cliente_id)
+        for token in set(tokens):
+            self._por_token[token].append(cliente_id)
+
+    def por_conta(self, conta: str) -> Optional[str]:
+        return self._por_conta.get(conta) or self._por_conta.get(conta.replace("-", ""))
+
+    def eh_nome(self, palavra: str) -> bool:
+        """Se a palavra, com ou sem acentos, faz parte do nome de algum cliente."""
+        return normalizar(palavra) in self._por_token
+
+    def resolver(self, texto: str) -> Optional[str]:
+        """Resolve o cliente citado na mensagem pela conta ou pelo nome.
+
+        Retorna None quando nenhum cliente é encontrado ou quando o nome é ambíguo.
+        """
+        conta = extrair_conta(texto)
+        if conta:
+            cliente_id = self.por_conta(conta)
+            if cliente_id:
+                return cliente_id
+
+        tokens = [t for t in _TOKEN_REGEX.findall(normalizar(texto)) if t not in STOPWORDS_NOMES]
+
+        # Nome completo ou "primeiro último" citado na mensagem
+        for tamanho in (4, 3, 2):
+            for i in range(len(tokens) - tamanho + 1):
+                candidatos = self._por_nome.get(" ".join(tokens[i:i + tamanho]))
+                if candidatos:
+                    return candidatos[0] if len(candidatos) == 1 else None
+
+        # Tokens isolados: intersecta os grupos a partir do menor
+        grupos = sorted(
+            (self._por_token[t] for t in set(tokens) if t in self._por_token),
+            key=len
+        )
+        if not grupos or len(grupos[0]) > LIMITE_CANDIDATOS:
+            return None
+        candidatos = set(grupos[0])
+        for grupo in grupos[1:]:
+            restantes = candidatos.intersection(grupo) if len(grupo) <= LIMITE_CANDIDATOS else candidatos
+            if restantes:
+                candidatos = restantes
+        return next(iter(candidatos)) if len(candidatos) == 1 else None
+
+    @classmethod
+    def de_clientes(cls, clientes: Iterable[Tuple[str, Dict[str, Any]]]) -> "IndiceClientes":
+        indice = cls()
+        for cliente_id, dados in clientes:
+            indice.adicionar(cliente_id, dados.get("nome", ""), dados.get("conta", ""))
+        return indice
+
+
+_indice = None
+
+
+def indice_clientes() -> IndiceClientes:
+    """Retorna o índice construído a partir dos clientes de agent.services."""
+    global _indice
+    if _indice is None:
+        reconstruir_indice_clientes()
+    return _indice
+
+
+def reconstruir_indice_clientes() -> IndiceClientes:
+    global _indice
+    from agent.services import listar_clientes
+    _indice = IndiceClientes.de_clientes(listar_clientes())
+    return _indice
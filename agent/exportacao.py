@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator
+
+# Formatos de exportação do extrato e o tipo de conteúdo de cada um
+FORMATOS = {"csv": "text/csv; charset=utf-8", "jsonl": "application/x-ndjson"}
+TIPO_GZIP = "application/gzip"
+
+# Colunas do CSV: os campos que os serviços gravam nas transações (vazios quando não se aplicam)
+COLUNAS_CSV = (
+    "id", "data", "tipo", "origem", "destino", "cliente_id", "cartao_id", "estabelecimento", "codigo_barras", "valor"
+)
+
+# Bytes acumulados antes de entregar um pedaço ao consumidor
+TAMANHO_BLOCO = 64 * 1024
+
+
+def _linhas_csv(transacoes: Iterable[Dict[str, Any]], buffer: io.StringIO) -> Iterator[None]:
+    escritor = csv.writer(buffer, lineterminator="\n")
+    escritor.writerow(COLUNAS_CSV)
+    for transacao in transacoes:
+        linha = [transacao.get(coluna, "") for coluna in COLUNAS_CSV[:-1]]
+        linha.append(f"{transacao.get('valor', 0):.2f}")
+        escritor.writerow(linha)
+        yield
+
+
+def _linhas_jsonl(transacoes: Iterable[Dict[str, Any]], buffer: io.StringIO) -> Iterator[None]:
+    for transacao in transacoes:
+        buffer.write(json.dumps(transacao, ensure_ascii=False, separators=(",", ":")))
+        buffer.write("\n")
+        yield
+
+
+def exportar(
+    transacoes: Iterable[Dict[str, Any]], formato: str = "csv", compactar: bool = False, bloco: int = TAMANHO_BLOCO
+) -> Iterator[bytes]:
+    """Gera o arquivo de exportação em pedaços de ~`bloco` bytes, lendo `transacoes` uma a uma.
+
+    CSV tem cabeçalho e as colunas de COLUNAS_CSV, valor com duas casas; JSON
+    Lines traz cada transação inteira, uma por linha. Com `compactar` a saída
+    é um stream gzip. A memória usada é a de um bloco, independentemente do
+    tamanho do histórico.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de exportação desconhecido: {formato}")
+    buffer = io.StringIO()
+    linhas = _linhas_csv if formato == "csv" else _linhas_jsonl
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compactar else None  # wbits 31: cabeçalho gzip
+
+    def esvaziar() -> bytes:
+        dados = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(dados) if compressor is not None else dados
+
+    for _ in linhas(transacoes, buffer):
+        if buffer.tell() >= bloco:
+            pedaco = esvaziar()
+            if pedaco:
+                yield pedaco
+    pedaco = esvaziar()
+    if compressor is not None:
+        pedaco += compressor.flush()
+    if pedaco:
+        yield pedaco
@@ -1,32 +1,44 @@
+import copy
+import threading
+import uuid
+from datetime import datetime
+
 from langgraph.graph import StateGraph, END
-from langchain_groq import ChatGroq
-from langchain_core.messages import AIMessage
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.messages import AIMessage, HumanMessage
 
 from agent.states import ChatState
 from agent.nodes import (
+    INTENCOES_LEITURA,
+    INTENCOES_OPERACAO,
     classificar_intencao,
+    executar_operacoes,
+    consolidar_respostas,
     processar_saldo,
-    processar_transferencia,
     processar_extrato,
-    processar_pagamento_boleto,
-    processar_pagamento_cartao,
     processar_perfil,
     processar_duvida,
     responder_generico
 )
+from agent.mcp_client import MCPAgent
+from agent.analise import analisar_mensagem
+from agent.message_log import Conversa, MessageLog
+from agent.tracing import rastrear_no, span
+
+# Temas considerados pelo responder_generico: os das últimas 3 mensagens do usuário
+TEMAS_RETIDOS = 3
 
-# from agent.mcp_client import MCPAgent
-from agent.mcp_node_client import MCPAgent
+# Grafos compilados por vectorstore, compartilhados por todas as sessões do processo
+_grafos = {}
+_grafos_lock = threading.Lock()
 
 def create_agent_graph(vectorstore=None):
-    """Cria o grafo do agente de banking."""
-    # Configuração do modelo LLM usando Groq
-    llm = ChatGroq(
-        model="llama3-70b-8192",
-        temperature=0
-    )
-    
+    """Cria o grafo do agente de banking.
+
+    Consultas (saldo, extrato, perfil, dúvida, MCP) pedidas na mesma mensagem
+    rodam em paralelo; operações que alteram saldo rodam antes, em sequência,
+    no nó "operacoes". Todos os ramos terminam em "consolidar", que junta as
+    respostas em uma única mensagem.
+    """
     # Inicializa o cliente MCP
     mcp_agent = MCPAgent(vectorstore)
     
@@ -34,9 +46,21 @@ def create_agent_graph(vectorstore=None):
     def process_with_mcp(state: ChatState):
         return mcp_agent.process_state(state)
     
-    # Roteador baseado na intenção
+    def consultas(state: ChatState):
+        """Nós de consulta do turno, sem repetição, na ordem dos pedidos."""
+        return list(dict.fromkeys(
+            e["intencao"] for e in state["intencoes"] if e["intencao"] in INTENCOES_LEITURA
+        ))
+    
+    # Roteador baseado nas intenções do turno
     def router(state: ChatState):
-        return state["next"]
+        if any(e["intencao"] in INTENCOES_OPERACAO for e in state["intencoes"]):
+            return "operacoes"
+        return consultas(state) or "outro"
+    
+    # Após as operações, segue para as consultas pedidas na mesma mensagem
+    def router_apos_operacoes(state: ChatState):
+        return consultas(state) or "consolidar"
     
     # Função para processar dúvidas com o vectorstore
     def process_duvida_with_vectorstore(state: ChatState):
@@ -46,127 +70,192 @@ def create_agent_graph(vectorstore=None):
     builder = StateGraph(ChatState)
     
     # Define os nós do grafo
-    builder.add_node("classificador_intencao", classificar_intencao)
-    builder.add_node("consulta_saldo", processar_saldo)
-    builder.add_node("transferencia", processar_transferencia)
-    builder.add_node("extrato", processar_extrato)
-    builder.add_node("pagamento_boleto", processar_pagamento_boleto)
-    builder.add_node("pagamento_cartao", processar_pagamento_cartao)
-    builder.add_node("perfil", processar_perfil)
-    builder.add_node("duvida", process_duvida_with_vectorstore)
-    builder.add_node("outro", responder_generico)
-    builder.add_node("mcp", process_with_mcp)  # Adiciona o nó MCP para integração com a API bancária
+    nos = {
+        "classificador_intencao": classificar_intencao,
+        "operacoes": executar_operacoes,
+        "consulta_saldo": processar_saldo,
+        "extrato": processar_extrato,
+        "perfil": processar_perfil,
+        "duvida": process_duvida_with_vectorstore,
+        "outro": responder_generico,
+        "mcp": process_with_mcp,  # Nó MCP para integração com a API bancária
+        "consolidar": consolidar_respostas
+    }
+    for nome, funcao in nos.items():
+        builder.add_node(nome, rastrear_no(nome, funcao))
+    
+    rotas_consulta = {nome: nome for nome in INTENCOES_LEITURA}
     
     # Define o fluxo do grafo
     builder.set_entry_point("classificador_intencao")
     builder.add_conditional_edges(
         "classificador_intencao",
         router,
-        {
-            "consulta_saldo": "consulta_saldo",
-            "transferencia": "transferencia",
-            "extrato": "extrato",
-            "pagamento_boleto": "pagamento_boleto",
-            "pagamento_cartao": "pagamento_cartao",
-            "perfil": "perfil",
-            "duvida": "duvida",
-            "outro": "outro",
-            "mcp": "mcp"     # Rota para o processamento MCP
-        }
+        {**rotas_consulta, "operacoes": "operacoes", "outro": "outro"}
+    )
+    builder.add_conditional_edges(
+        "operacoes",
+        router_apos_operacoes,
+        {**rotas_consulta, "consolidar": "consolidar"}
     )
     
-    # Define os nós finais
-    builder.add_edge("consulta_saldo", END)
-    builder.add_edge("transferencia", END)
-    builder.add_edge("extrato", END)
-    builder.add_edge("pagamento_boleto", END)
-    builder.add_edge("pagamento_cartao", END)
-    builder.add_edge("perfil", END)
-    builder.add_edge("duvida", END)
-    builder.add_edge("outro", END)
-    builder.add_edge("mcp", END)
+    # Todos os ramos terminam na consolidação das respostas
+    for nome in INTENCOES_LEITURA + ("outro",):
+        builder.add_edge(nome, "consolidar")
+    builder.add_edge("consolidar", END)
     
     # Constrói o grafo
     graph = builder.compile()
     
     return graph
 
-def create_agent(cliente_id, vectorstore=None):
-    """Cria um agente para um cliente específico."""
-    from agent.services import clientes
-    from langchain_core.messages import AIMessage
-    import uuid
-    from datetime import datetime
-    
-    # Configuração da classe ChatAgent para encapsular o grafo
-    class ChatAgent:
-        def __init__(self, cliente_id, vectorstore):
-            self.graph = create_agent_graph(vectorstore)
-            self.initial_state = {
-                "messages": [
-                    AIMessage(content=f"Olá, {clientes[cliente_id]['nome']}! Como posso ajudar você hoje?")
-                ],
-                "cliente_id": cliente_id,
-                "next": "",
-                "context": {
-                    "last_access": datetime.now().isoformat(),
-                    "session_id": str(uuid.uuid4()),
-                    "conversation_topics": []
-                }
+def get_agent_graph(vectorstore=None):
+    """Retorna o grafo compilado do processo, criando-o na primeira chamada.
+
+    O grafo, o LLM e o cliente MCP não guardam estado de conversa, então uma
+    única instância por vectorstore atende todas as sessões.
+    """
+    chave = id(vectorstore)
+    with span("grafo.obter", cache_hit=True) as s:
+        entrada = _grafos.get(chave)
+        if entrada is None:
+            with _grafos_lock:
+                entrada = _grafos.get(chave)
+                if entrada is None:
+                    # Só a primeira chamada do processo compila; as demais aparecem com cache_hit=True
+                    s.set(cache_hit=False)
+                    # Mantém a referência ao vectorstore para que o id não seja reutilizado
+                    entrada = (vectorstore, create_agent_graph(vectorstore))
+                    _grafos[chave] = entrada
+    return entrada[1]
+
+class ChatAgent:
+    """Sessão de chat de um cliente; guarda apenas o estado da conversa."""
+
+    def __init__(self, cliente_id, graph, session_store=None, session_id=None, estado=None, max_turnos=None):
+        from agent.services import obter_cliente
+
+        self.graph = graph
+        self.session_store = session_store
+        self.cliente_id = cliente_id
+        if estado is not None:
+            # Sessão restaurada do session store
+            self.log = MessageLog.de_mensagens(estado["messages"], max_turnos)
+            self.context = estado["context"]
+            self._pendentes = []
+            self._contexto_salvo = copy.deepcopy(self.context)
+            self.versao = estado.get("versao", 0)
+        else:
+            saudacao = AIMessage(content=f"Olá, {obter_cliente(cliente_id)['nome']}! Como posso ajudar você hoje?")
+            self.log = MessageLog(max_turnos)
+            self.log.registrar_turno([saudacao])
+            self.context = {
+                "last_access": datetime.now().isoformat(),
+                "session_id": session_id or str(uuid.uuid4()),
+                "conversation_topics": []
             }
-            
-        def invoke(self, message):
-            # Criar uma cópia do estado inicial
-            state = dict(self.initial_state)
-            
-            # Adicionar a mensagem atual
-            from langchain_core.messages import HumanMessage
-            state["messages"].append(HumanMessage(content=message))
-            
-            # Atualizar contexto de conversa
-            topics = self._extract_topics(message)
-            if topics:
-                state["context"]["conversation_topics"].extend(topics)
-                # Manter apenas os 5 tópicos mais recentes
-                state["context"]["conversation_topics"] = state["context"]["conversation_topics"][-5:]
-            
-            # Executar o grafo
-            result = self.graph.invoke(state)
-            
-            # Atualizar o estado para a próxima iteração
-            self.initial_state = result
-            
-            # Retornar a última mensagem do assistente
-            for msg in reversed(result["messages"]):
-                if isinstance(msg, AIMessage):
-                    return msg.content
-            
-            return "Desculpe, não consegui processar sua solicitação."
+            # Mensagens ainda não gravadas no session store
+            self._pendentes = [saudacao]
+            self._contexto_salvo = {}
+            # Versão da sessão no session store (número do último turno gravado)
+            self.versao = 0
+
+    @property
+    def session_id(self):
+        return self.context["session_id"]
         
-        def _extract_topics(self, message):
-            """Extrai tópicos básicos da mensagem do usuário."""
-            topics = []
-            message_lower = message.lower()
-            
-            # Palavras-chave para identificar tópicos
-            topic_keywords = {
-                "saldo": ["saldo", "disponível", "conta"],
-                "transferencia": ["transferir", "transferência", "enviar"],
-                "extrato": ["extrato", "transações", "histórico"],
-                "boleto": ["boleto", "conta", "fatura"],
-                "cartao": ["cartão", "crédito", "compra"],
-                "perfil": ["perfil", "financeiro", "análise"],
-                "emprestimo": ["empréstimo", "crédito", "financiamento", "consignado", "taxa"],
-                "api": ["api", "integração", "sistema", "ferramenta", "consulta"]
-            }
-            
-            for topic, keywords in topic_keywords.items():
-                if any(keyword in message_lower for keyword in keywords):
-                    topics.append(topic)
-            
-            return topics
-            
-        def get_messages(self):
-            return self.initial_state["messages"]
+    def invoke(self, message):
+        """Executa um turno e retorna a resposta consolidada."""
+        resposta = "Desculpe, não consegui processar sua solicitação."
+        for evento in self.stream(message):
+            if evento["tipo"] == "resposta":
+                resposta = evento["texto"]
+        return resposta
+
+    def stream(self, message):
+        """Executa um turno gerando eventos à medida que os nós terminam.
+
+        Gera {"tipo": "parcial", "no", "texto"} para a resposta de cada nó e,
+        ao final, {"tipo": "resposta", "texto"} com a resposta consolidada. O
+        turno só é registrado se o gerador for consumido até o fim.
+        """
+        # O histórico é imutável e o contexto é copiado: se o turno falhar, o log e o contexto ficam intactos
+        state = {
+            "messages": Conversa(self.log.snapshot(), (HumanMessage(content=message),)),
+            "cliente_id": self.cliente_id,
+            "next": "",
+            "intencao": "",
+            "intencoes": [],
+            "analise": analisar_mensagem(message),
+            "context": copy.deepcopy(self.context)
+        }
+        
+        # Atualizar contexto de conversa com a análise do turno, sem reler o histórico
+        contexto = state["context"]
+        if state["analise"]["topicos"]:
+            # Manter apenas os 5 tópicos mais recentes
+            contexto["conversation_topics"] = (contexto["conversation_topics"] + state["analise"]["topicos"])[-5:]
+        contexto["temas_recentes"] = (contexto.get("temas_recentes", []) + [state["analise"]["tema"]])[-TEMAS_RETIDOS:]
+        
+        # Executar o grafo
+        result = state
+        with span("turno", session_id=self.session_id, cliente_id=self.cliente_id) as s:
+            for modo, dados in self.graph.stream(state, stream_mode=["updates", "values"]):
+                if modo == "values":
+                    result = dados
+                    continue
+                for no, atualizacao in dados.items():
+                    for _, texto in (atualizacao or {}).get("respostas", []):
+                        yield {"tipo": "parcial", "no": no, "texto": texto}
+            s.set(intencao=result.get("intencao"), intencoes=[e["intencao"] for e in result.get("intencoes", [])])
+        
+        # Registrar o turno concluído
+        novas = result["messages"].turno
+        self.log.registrar_turno(novas)
+        self.context = result["context"]
+        self.context["last_access"] = datetime.now().isoformat()
+        self._salvar_turno(novas)
+        
+        # A última mensagem do assistente é a resposta do turno
+        for msg in reversed(novas):
+            if isinstance(msg, AIMessage):
+                yield {"tipo": "resposta", "texto": msg.content}
+                break
+
+    def salvar(self):
+        """Grava no session store as mensagens ainda pendentes, como a saudação de uma sessão nova."""
+        if self._pendentes:
+            self._salvar_turno([])
     
-    return ChatAgent(cliente_id, vectorstore)
\ No newline at end of file
+    def _salvar_turno(self, novas):
+        """Grava no session store apenas as mensagens e chaves de contexto novas do turno."""
+        if self.session_store is None:
+            return
+        contexto = {
+            chave: valor for chave, valor in self.context.items()
+            if self._contexto_salvo.get(chave) != valor
+        }
+        self.versao = self.session_store.salvar_turno(
+            self.session_id, self.cliente_id, self._pendentes + list(novas), contexto
+        )
+        self._pendentes = []
+        self._contexto_salvo = copy.deepcopy(self.context)
+
+    def get_messages(self):
+        return list(self.log.snapshot())
+
+def create_agent(cliente_id, vectorstore=None, session_store=None, session_id=None, max_turnos=None, estado=None):
+    """Cria uma sessão de chat para um cliente usando o grafo compartilhado do processo.
+
+    Com um session_store, cada turno é gravado ao final da execução e uma
+    sessão existente com o mesmo session_id é restaurada, em qualquer worker.
+    `estado` é a sessão já lida do session_store, para não lê-la de novo.
+    """
+    graph = get_agent_graph(vectorstore)
+    if estado is not None:
+        return ChatAgent(estado["cliente_id"], graph, session_store, session_id, estado, max_turnos)
+    if session_store is not None and session_id:
+        estado = session_store.carregar(session_id)
+        if estado is not None:
+            return ChatAgent(estado["cliente_id"], graph, session_store, session_id, estado, max_turnos)
+    return ChatAgent(cliente_id, graph, session_store, session_id, max_turnos=max_turnos)
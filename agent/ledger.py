@@ -0,0 +1,391 @@
+import sys
+import threading
+import uuid
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from agent.colunas import ColunasTransacoes, centavos
+from agent.perfis import PerfisGastos
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSSEGUNDO = timedelta(microseconds=1)
+
+
+def epoch_us(data) -> int:
+    """Converte uma data (ISO ou datetime) em microssegundos desde 1970, sem arredondamento."""
+    if isinstance(data, str):
+        data = datetime.fromisoformat(data)
+    if data.tzinfo is not None:
+        data = data.astimezone(timezone.utc).replace(tzinfo=None)
+    return (data - _EPOCH) // _MICROSSEGUNDO
+
+
+def data_iso(epoch: int) -> str:
+    """Inverso de epoch_us: a data ISO (sem fuso) de um instante em µs."""
+    return (_EPOCH + timedelta(microseconds=epoch)).isoformat()
+
+
+def mes_de(epoch: int) -> Tuple[int, int]:
+    """Início e fim (µs, fim exclusivo) do mês de calendário que contém o instante."""
+    data = _EPOCH + timedelta(microseconds=epoch)
+    inicio = datetime(data.year, data.month, 1)
+    fim = datetime(data.year + data.month // 12, data.month % 12 + 1, 1)
+    return epoch_us(inicio), epoch_us(fim)
+
+
+# Campos guardados em Transacao.dono e Transacao.alvo para cada tipo, na ordem do dicionário
+_LEIAUTES = {
+    "transferência": ("origem", "destino", None),
+    "pagamento_boleto": ("origem", "codigo_barras", None),
+    "pagamento_cartao": ("cliente_id", "estabelecimento", "cartao_id"),
+}
+_CAMPOS_FIXOS = {"id", "data", "tipo", "valor"}
+
+# Códigos dos tipos de transação; tipos novos ganham código na primeira ocorrência
+_TIPOS: List[str] = list(_LEIAUTES)
+_CODIGOS_TIPO: Dict[str, int] = {tipo: codigo for codigo, tipo in enumerate(_TIPOS)}
+_LEIAUTE_POR_CODIGO = [_LEIAUTES[tipo] for tipo in _TIPOS]
+
+
+def _codigo_tipo(tipo: str) -> int:
+    """Código do tipo; chamado com o lock do Ledger, que serializa os tipos novos."""
+    codigo = _CODIGOS_TIPO.get(tipo)
+    if codigo is None:
+        codigo = _CODIGOS_TIPO[tipo] = len(_TIPOS)
+        _TIPOS.append(tipo)
+        _LEIAUTE_POR_CODIGO.append((None, None, None))
+    return codigo
+
+
+def _interno(valor):
+    return sys.intern(valor) if type(valor) is str else valor
+
+
+def _id_compacto(transacao_id):
+    """UUIDs em texto canônico viram os 16 bytes do UUID (49 bytes em vez de 85); outros ids ficam como estão."""
+    if type(transacao_id) is str and len(transacao_id) == 36:
+        try:
+            compacto = uuid.UUID(transacao_id)
+        except ValueError:
+            return transacao_id
+        if str(compacto) == transacao_id:
+            return compacto.bytes
+    return transacao_id
+
+
+def _id_original(transacao_id):
+    if type(transacao_id) is not bytes:
+        return transacao_id
+    h = transacao_id.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+class Transacao:
+    """Transação guardada pelo Ledger: valor em centavos, data em µs e tipo em código.
+
+    Os campos que dependem do tipo ficam em `dono` (origem ou titular do
+    cartão), `alvo` (destino, código de barras ou estabelecimento) e
+    `cartao_id`, conforme _LEIAUTES; ids e textos repetidos são internados e
+    compartilhados entre registros; um id UUID fica em 16 bytes. Campos fora do leiaute vão para `extras`.
+    get() lê o registro como o dicionário original e para_dict() o reconstrói
+    só quando o resultado sai do Ledger.
+    """
+
+    __slots__ = ("id", "epoch", "centavos", "tipo", "dono", "alvo", "cartao_id", "extras")
+
+    def __init__(self, transacao: Dict[str, Any], epoch: int):
+        self.id = _id_compacto(transacao["id"])
+        self.epoch = epoch
+        self.centavos = centavos(transacao.get("valor", 0))
+        self.tipo = _codigo_tipo(transacao["tipo"])
+        campo_dono, campo_alvo, campo_cartao = _LEIAUTE_POR_CODIGO[self.tipo]
+        self.dono = _interno(transacao.get(campo_dono)) if campo_dono else None
+        self.alvo = _interno(transacao.get(campo_alvo)) if campo_alvo else None
+        self.cartao_id = _interno(transacao.get(campo_cartao)) if campo_cartao else None
+        extras = None
+        for campo, valor in transacao.items():
+            if campo not in _CAMPOS_FIXOS and campo != campo_dono and campo != campo_alvo and campo != campo_cartao:
+                if extras is None:
+                    extras = {}
+                extras[campo] = valor
+        self.extras = extras
+
+    def get(self, campo: str, padrao=None):
+        if campo == "tipo":
+            return _TIPOS[self.tipo]
+        if campo == "valor":
+            return self.centavos / 100
+        if campo == "id":
+            return _id_original(self.id)
+        if campo == "data":
+            return data_iso(self.epoch)
+        campo_dono, campo_alvo, campo_cartao = _LEIAUTE_POR_CODIGO[self.tipo]
+        if campo == campo_dono:
+            valor = self.dono
+        elif campo == campo_alvo:
+            valor = self.alvo
+        elif campo == campo_cartao:
+            valor = self.cartao_id
+        else:
+            return self.extras.get(campo, padrao) if self.extras else padrao
+        return padrao if valor is None else valor
+
+    def para_dict(self) -> Dict[str, Any]:
+        """A transação no formato usado pelos serviços (valor em reais, data ISO)."""
+        transacao = {"id": _id_original(self.id), "data": data_iso(self.epoch), "tipo": _TIPOS[self.tipo]}
+        campo_dono, campo_alvo, campo_cartao = _LEIAUTE_POR_CODIGO[self.tipo]
+        if self.dono is not None:
+            transacao[campo_dono] = self.dono
+        if self.cartao_id is not None:
+            transacao[campo_cartao] = self.cartao_id
+        if self.alvo is not None:
+            transacao[campo_alvo] = self.alvo
+        if self.extras:
+            transacao.update(self.extras)
+        transacao["valor"] = self.centavos / 100
+        return transacao
+
+
+def _dicts(registros) -> List[Dict[str, Any]]:
+    return [registro.para_dict() for registro in registros]
+
+
+def clientes_da_transacao(transacao: Dict[str, Any]):
+    """Clientes que veem a transação no extrato: origem, destino e titular do cartão."""
+    envolvidos = {transacao.get("origem"), transacao.get("destino"), transacao.get("cliente_id")}
+    envolvidos.discard(None)
+    return envolvidos
+
+
+def contraparte_da_transacao(transacao: Dict[str, Any], cliente_id: str):
+    """Quem está do outro lado da transação para o cliente: a outra conta ou o estabelecimento."""
+    if transacao.get("origem") == cliente_id and transacao.get("destino") is not None:
+        return transacao.get("destino")
+    if transacao.get("destino") == cliente_id:
+        return transacao.get("origem")
+    return transacao.get("estabelecimento")
+
+
+class _IndiceCliente:
+    """Transações de um cliente em ordem de (data, sequência), com as chaves em arrays paralelos.
+
+    A sequência é a posição da transação no livro e desempata datas iguais,
+    então (epoch, seq) identifica cada transação e serve de cursor. `no_mes`
+    conta as transações do mês [inicio_mes, fim_mes) da mais recente.
+    """
+
+    __slots__ = ("epochs", "seqs", "transacoes", "inicio_mes", "fim_mes", "no_mes")
+
+    def __init__(self):
+        self.epochs = array("q")
+        self.seqs = array("q")
+        self.transacoes: List[Transacao] = []
+        self.inicio_mes = self.fim_mes = -2 ** 63
+        self.no_mes = 0
+
+    def contar_no_mes(self, epoch: int):
+        if self.inicio_mes <= epoch < self.fim_mes:
+            self.no_mes += 1
+        elif epoch >= self.fim_mes:
+            # Primeira transação de um mês novo; lançamentos de meses anteriores não mudam a contagem
+            self.inicio_mes, self.fim_mes = mes_de(epoch)
+            self.no_mes = 1
+
+    def posicao(self, epoch: int, seq: int) -> int:
+        """Quantidade de transações com chave menor que (epoch, seq)."""
+        de = bisect_left(self.epochs, epoch)
+        ate = bisect_right(self.epochs, epoch, de)
+        return bisect_left(self.seqs, seq, de, ate)
+
+
+class Ledger:
+    """Livro de transações com um índice por cliente ordenado no tempo.
+
+    É o armazenamento do RepositorioMemoria (ver agent.repositorio), que
+    grava com append/extend e lê com ultimas, pagina, iterar e
+    transacoes_no_mes; len, iteração e fatias servem aos snapshots do
+    diário. Para cada cliente guarda um array de datas em microssegundos e a
+    lista de transações na mesma ordem. As transações são guardadas como
+    registros compactos (Transacao) e voltam a ser dicionários só nos
+    resultados devolvidos. As últimas N
+    transações de um cliente custam O(N) e um período custa O(log n + k),
+    independentemente do volume total do banco, e uma página do extrato a
+    partir de um cursor também (ver pagina). `colunas` guarda as mesmas
+    transações em formato colunar para as análises vetorizadas e `perfis`
+    mantém os agregados de gastos de cada cliente a cada lançamento.
+    """
+
+    def __init__(self):
+        self._transacoes: List[Transacao] = []
+        self._indices: Dict[str, _IndiceCliente] = {}
+        self.colunas = ColunasTransacoes()
+        self.perfis = PerfisGastos()
+        self._lock = threading.Lock()
+
+    def append(self, transacao: Dict[str, Any], epoch: Optional[int] = None):
+        """Registra a transação; `epoch` (µs) evita reconverter a data quando já é conhecido."""
+        if epoch is None:
+            epoch = epoch_us(transacao["data"])
+        with self._lock:
+            self._inserir(transacao, epoch)
+
+    registrar = append
+
+    def extend(self, transacoes: List[Dict[str, Any]]):
+        """Registra um lote com uma única aquisição do lock; datas repetidas são convertidas uma vez."""
+        epochs: Dict[Any, int] = {}
+        pares = []
+        for transacao in transacoes:
+            data = transacao["data"]
+            epoch = epochs.get(data)
+            if epoch is None:
+                epoch = epochs[data] = epoch_us(data)
+            pares.append((transacao, epoch))
+        with self._lock:
+            for transacao, epoch in pares:
+                self._inserir(transacao, epoch)
+
+    def _inserir(self, transacao: Dict[str, Any], epoch: int):
+        seq = len(self._transacoes)
+        registro = Transacao(transacao, epoch)
+        self._transacoes.append(registro)
+        self.colunas.adicionar(transacao, epoch)
+        self.perfis.registrar(transacao)
+        for cliente_id in clientes_da_transacao(transacao):
+            cliente_id = _interno(cliente_id)
+            indice = self._indices.get(cliente_id)
+            if indice is None:
+                indice = self._indices[cliente_id] = _IndiceCliente()
+            indice.contar_no_mes(epoch)
+            if not indice.epochs or epoch >= indice.epochs[-1]:
+                # Caso comum: transações chegam em ordem de data
+                indice.epochs.append(epoch)
+                indice.seqs.append(seq)
+                indice.transacoes.append(registro)
+            else:
+                posicao = bisect_right(indice.epochs, epoch)
+                indice.epochs.insert(posicao, epoch)
+                indice.seqs.insert(posicao, seq)
+                indice.transacoes.insert(posicao, registro)
+
+    def ultimas(self, cliente_id: str, limite: int) -> List[Dict[str, Any]]:
+        """As `limite` transações mais recentes do cliente, da mais nova para a mais antiga."""
+        indice = self._indices.get(cliente_id)
+        if indice is None or limite <= 0:
+            return []
+        return _dicts(indice.transacoes[:-limite - 1:-1])
+
+    def periodo(self, cliente_id: str, inicio: Optional[int] = None, fim: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Transações do cliente com inicio <= data < fim (µs), em ordem de data."""
+        indice = self._indices.get(cliente_id)
+        if indice is None:
+            return []
+        with self._lock:
+            de = bisect_left(indice.epochs, inicio) if inicio is not None else 0
+            ate = bisect_left(indice.epochs, fim) if fim is not None else len(indice.epochs)
+            registros = indice.transacoes[de:ate]
+        return _dicts(registros)
+
+    def pagina(
+        self,
+        cliente_id: str,
+        limite: int,
+        inicio: Optional[int] = None,
+        fim: Optional[int] = None,
+        antes: Optional[Tuple[int, int]] = None,
+        filtro: Optional[Callable[[Transacao], bool]] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[Tuple[int, int]]]:
+        """Até `limite` transações com inicio <= data < fim (µs), da mais nova para a mais antiga.
+
+        `antes` é o cursor (epoch, seq) devolvido pela página anterior: a busca
+        começa por bisseção logo abaixo dele, então qualquer página custa
+        O(log n + transações lidas), seja a primeira ou a quingentésima.
+        `filtro` recebe o registro (Transacao.get lê os campos do dicionário).
+        Retorna a página e o cursor da próxima (None na última).
+        """
+        indice = self._indices.get(cliente_id)
+        if indice is None or limite <= 0:
+            return [], None
+        pagina = []
+        with self._lock:
+            de = bisect_left(indice.epochs, inicio) if inicio is not None else 0
+            ate = bisect_left(indice.epochs, fim) if fim is not None else len(indice.epochs)
+            if antes is not None:
+                ate = min(ate, indice.posicao(*antes))
+            for posicao in range(ate - 1, de - 1, -1):
+                registro = indice.transacoes[posicao]
+                if filtro is not None and not filtro(registro):
+                    continue
+                if len(pagina) == limite:
+                    # Há mais uma transação depois da página: o cursor é a última devolvida
+                    return _dicts(pagina), (indice.epochs[posicao_ultima], indice.seqs[posicao_ultima])
+                pagina.append(registro)
+                posicao_ultima = posicao
+        return _dicts(pagina), None
+
+    def iterar(
+        self, cliente_id: str, inicio: Optional[int] = None, fim: Optional[int] = None, lote: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """Transações do cliente com inicio <= data < fim (µs), em ordem de data, lidas em lotes.
+
+        Cada lote é copiado sob o lock a partir da chave (epoch, seq) da última
+        transação entregue, então o gerador não segura o lock enquanto o
+        consumidor trabalha e a memória usada não depende do tamanho do
+        histórico. Lançamentos feitos durante a leitura aparecem se caírem
+        depois da posição já entregue.
+        """
+        indice = self._indices.get(cliente_id)
+        if indice is None:
+            return
+        ultima = None
+        while True:
+            with self._lock:
+                if ultima is None:
+                    de = bisect_left(indice.epochs, inicio) if inicio is not None else 0
+                else:
+                    de = indice.posicao(*ultima) + 1
+                ate = bisect_left(indice.epochs, fim) if fim is not None else len(indice.epochs)
+                registros = indice.transacoes[de:min(de + lote, ate)]
+                if registros:
+                    fim_lote = de + len(registros) - 1
+                    ultima = (indice.epochs[fim_lote], indice.seqs[fim_lote])
+            if not registros:
+                return
+            for registro in registros:
+                yield registro.para_dict()
+
+    def do_cliente(self, cliente_id: str) -> List[Dict[str, Any]]:
+        """Todas as transações do cliente, em ordem de data."""
+        indice = self._indices.get(cliente_id)
+        return _dicts(indice.transacoes) if indice is not None else []
+
+    def quantidade(self, cliente_id: str) -> int:
+        indice = self._indices.get(cliente_id)
+        return len(indice.transacoes) if indice is not None else 0
+
+    def transacoes_no_mes(self, cliente_id: str, agora: int) -> int:
+        """Transações do cliente no mês de `agora` (µs), mantidas a cada lançamento: O(1)."""
+        indice = self._indices.get(cliente_id)
+        if indice is None or not indice.inicio_mes <= agora < indice.fim_mes:
+            return 0
+        return indice.no_mes
+
+    def clear(self):
+        with self._lock:
+            self._transacoes.clear()
+            self._indices.clear()
+            self.colunas.clear()
+            self.perfis.clear()
+
+    def __len__(self):
+        return len(self._transacoes)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return (registro.para_dict() for registro in self._transacoes)
+
+    def __getitem__(self, posicao):
+        if isinstance(posicao, slice):
+            return _dicts(self._transacoes[posicao])
+        return self._transacoes[posicao].para_dict()
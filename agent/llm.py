@@ -0,0 +1,11 @@
+from functools import lru_cache
+
+from langchain_groq import ChatGroq
+
+MODELO_PADRAO = "llama3-70b-8192"
+
+
+@lru_cache(maxsize=None)
+def obter_llm(model: str = MODELO_PADRAO, temperature: float = 0) -> ChatGroq:
+    """Retorna o cliente ChatGroq compartilhado por todas as sessões do processo."""
+    return ChatGroq(model=model, temperature=temperature)
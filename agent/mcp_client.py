@@ -1,113 +1,55 @@
-# agent/mcp_node_client.py
-import json
-import subprocess
-import sys
-import threading
-import queue
-from typing import Dict, Any, List, Optional
-from langchain_groq import ChatGroq
-from langchain_core.messages import AIMessage, HumanMessage
+# agent/mcp_client.py
+import logging
+from typing import Dict, Any, List, Tuple
+from langchain_core.messages import HumanMessage
 from agent.states import ChatState
+from agent.llm import obter_llm
+from agent.mcp_conexoes import ErroMCP, gerenciador
+from agent.nodes import intencao_do_turno, resposta_parcial
+from agent.tracing import span, registrar_tokens
+
+logger = logging.getLogger(__name__)
 
 class MCPAgent:
-    """Cliente simplificado para comunicação com o servidor MCP Node.js."""
+    """Cliente simplificado para comunicação com o servidor MCP Node.js.
+
+    O processo do servidor não pertence ao agente: vem do gerenciador de
+    conexões do processo, iniciado uma vez e compartilhado por todas as sessões.
+    """
     
-    def __init__(self, vectorstore=None, server_cmd=["npx", "-y", "node", "mcp_servers/banking-api-server.js"]):
-        self.server_cmd = server_cmd
-        self.server_process = None
-        self.response_queue = queue.Queue()
-        self.next_id = 1
-        self.llm = ChatGroq(model="llama3-70b-8192", temperature=0)
+    def __init__(self, vectorstore=None, servidor="banking", gerenciador_mcp=None):
+        self.servidor = servidor
+        self.gerenciador = gerenciador_mcp or gerenciador
+        self.llm = obter_llm()
         self.vectorstore = vectorstore
     
     def start_server(self):
-        """Inicia o processo do servidor MCP."""
-        if self.server_process is not None:
-            return
-        
+        """Garante que o servidor MCP compartilhado está rodando."""
         try:
-            print("Iniciando servidor MCP...")
-            self.server_process = subprocess.Popen(
-                self.server_cmd,
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,
-            )
-            
-            # Thread para ler as respostas do servidor
-            def read_output():
-                while self.server_process and self.server_process.poll() is None:
-                    line = self.server_process.stdout.readline()
-                    if not line:
-                        break
-                    try:
-                        response = json.loads(line)
-                        self.response_queue.put(response)
-                    except json.JSONDecodeError:
-                        continue
-            
-            # Thread para ler erros do servidor
-            def read_errors():
-                while self.server_process and self.server_process.poll() is None:
-                    line = self.server_process.stderr.readline()
-                    if not line:
-                        break
-                    print(f"MCP Server Error: {line.strip()}")
-            
-            threading.Thread(target=read_output, daemon=True).start()
-            threading.Thread(target=read_errors, daemon=True).start()
-            
-            print("Servidor MCP Node.js iniciado")
-        except Exception as e:
-            print(f"Erro ao iniciar servidor MCP: {e}")
-            self.stop_server()
+            self.gerenciador.obter(self.servidor)
+        except ErroMCP as e:
+            logger.error("Erro ao iniciar servidor MCP: %s", e)
     
     def stop_server(self):
-        """Para o processo do servidor MCP."""
-        if self.server_process:
-            self.server_process.terminate()
-            self.server_process = None
+        """Nada a fazer: o servidor é do processo e é encerrado pelo gerenciador."""
     
     def send_request(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """Envia uma requisição para o servidor e retorna a resposta."""
-        if not self.server_process:
-            self.start_server()
-        
-        request_id = self.next_id
-        self.next_id += 1
-        
-        request = {
-            "jsonrpc": "2.0",
-            "id": request_id,
-            "method": method,
-            "params": params
-        }
-        
         try:
-            request_str = json.dumps(request) + "\n"
-            self.server_process.stdin.write(request_str)
-            self.server_process.stdin.flush()
-            
-            # Aguardar a resposta
-            timeout = 10  # segundos
-            start_time = threading.current_thread().time()
-            while (threading.current_thread().time() - start_time) < timeout:
-                try:
-                    response = self.response_queue.get(timeout=1)
-                    if response.get("id") == request_id:
-                        if "error" in response:
-                            raise Exception(f"MCP Error: {response['error']}")
-                        return response.get("result", {})
-                except queue.Empty:
-                    continue
-            
-            raise TimeoutError("Tempo excedido aguardando resposta do servidor MCP")
-        except Exception as e:
-            print(f"Erro ao enviar requisição: {e}")
+            return self.gerenciador.requisitar(self.servidor, method, params)
+        except (ErroMCP, TimeoutError) as e:
+            logger.error("Erro ao enviar requisição MCP %s: %s", method, e)
             return {"error": str(e)}
     
+    def send_batch(self, requests: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Envia várias requisições (método, params) em um batch e retorna as respostas na mesma ordem."""
+        try:
+            respostas = self.gerenciador.obter(self.servidor).lote(requests)
+        except (ErroMCP, TimeoutError) as e:
+            logger.error("Erro ao enviar lote MCP: %s", e)
+            return [{"error": str(e)} for _ in requests]
+        return [{"error": str(r)} if isinstance(r, ErroMCP) else r for r in respostas]
+    
     def process_query(self, query: str, cliente_id: str) -> str:
         """Processo uma consulta usando alternativas quando o MCP falha."""
         # Fallback para resposta genérica
@@ -125,11 +67,13 @@ class MCPAgent:
         Se for sobre elegibilidade, você pode explicar os critérios gerais.
         """
         
-        response = self.llm.invoke(generic_prompt)
+        with span("llm", no="mcp") as s:
+            response = self.llm.invoke(generic_prompt)
+            registrar_tokens(s, response)
         return response.content
     
-    def process_state(self, state: ChatState) -> ChatState:
-        """Processa o estado do chat."""
+    def process_state(self, state: ChatState) -> Dict[str, Any]:
+        """Processa o estado do chat e retorna a resposta parcial do nó MCP."""
         # Extrair a última mensagem do usuário
         query = ""
         for msg in reversed(state["messages"]):
@@ -138,12 +82,9 @@ class MCPAgent:
                 break
         
         if not query:
-            return state
+            return {}
         
         # Tentar processar com MCP ou usar fallback
         response = self.process_query(query, state["cliente_id"])
         
-        # Adicionar a resposta ao estado
-        state["messages"].append(AIMessage(content=response))
-        
-        return state
\ No newline at end of file
+        return resposta_parcial(intencao_do_turno(state, "mcp"), response)
\ No newline at end of file
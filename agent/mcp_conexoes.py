@@ -0,0 +1,605 @@
+"""Conexões com os servidores MCP, compartilhadas por todas as sessões do processo.
+
+Cada servidor configurado em SERVIDORES é iniciado uma única vez, na primeira
+requisição, e atende todas as sessões enquanto o processo roda. O comando
+padrão chama o `node` diretamente; AGENT_MCP_<NOME> substitui o comando de um
+servidor, por exemplo:
+
+    AGENT_MCP_BANKING="npx -y node mcp_servers/banking-api-server.js"
+    AGENT_MCP_BANKING="python mcp_servers/banking_api_server.py"
+
+ClienteJsonRpc é a API asyncio, com muitas requisições em andamento no mesmo
+pipe, prazos por requisição, cancelamento e batches; ConexaoMCP é a mesma API
+síncrona, usada pelas threads do agente e pelo GerenciadorMCP.
+"""
+import asyncio
+import atexit
+import concurrent.futures
+import itertools
+import json
+import logging
+import os
+import shlex
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from agent.tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Diretório do projeto: os caminhos dos comandos são relativos a ele
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Comando padrão de cada servidor
+SERVIDORES = {
+    "banking": ["node", os.path.join("mcp_servers", "banking-api-server.js")],
+}
+
+TIMEOUT_REQUISICAO = float(os.getenv("AGENT_MCP_TIMEOUT", "10"))
+# Sem contato com o servidor há mais que isso, um ping confirma que ele responde antes do uso
+INTERVALO_SAUDE = float(os.getenv("AGENT_MCP_INTERVALO_SAUDE", "30"))
+# Espera após uma falha ao iniciar um servidor antes de tentar de novo
+ESPERA_REINICIO = float(os.getenv("AGENT_MCP_ESPERA_REINICIO", "5"))
+
+VERSAO_PROTOCOLO = "2024-11-05"
+
+# Latências recentes guardadas por conexão para os percentis
+AMOSTRAS_LATENCIA = 1000
+# Maior linha (mensagem JSON-RPC) aceita da saída do servidor
+LIMITE_LINHA = 16 * 1024 * 1024
+
+
+class ErroMCP(Exception):
+    """Erro devolvido pelo servidor MCP ou falha de comunicação com ele."""
+
+
+def comando_do_servidor(nome: str) -> List[str]:
+    comando = os.getenv(f"AGENT_MCP_{nome.upper()}")
+    if comando:
+        return shlex.split(comando)
+    if nome not in SERVIDORES:
+        raise ErroMCP(f"Servidor MCP não configurado: {nome}")
+    return list(SERVIDORES[nome])
+
+
+def _percentis(valores) -> Dict[str, Optional[float]]:
+    """p50/p95/p99 em ms de uma sequência de durações em segundos."""
+    if not valores:
+        return {"p50": None, "p95": None, "p99": None}
+    ordenados = sorted(valores)
+    return {
+        f"p{p}": ordenados[min(len(ordenados) - 1, len(ordenados) * p // 100)] * 1000
+        for p in (50, 95, 99)
+    }
+
+
+class _ClienteBase:
+    """Estado comum aos clientes: ids, requisições pendentes por id, despacho das respostas e contadores.
+
+    Cada requisição registra um future no seu id; quem lê a saída do servidor
+    entrega cada resposta ao future correspondente, então requisições
+    concorrentes não disputam respostas. Uma resposta sem future (a requisição
+    expirou ou foi cancelada) é descartada.
+    """
+
+    def __init__(self, nome: str, comando: List[str], timeout: Optional[float] = None):
+        self.nome = nome
+        self.comando = comando
+        self.timeout = timeout or TIMEOUT_REQUISICAO
+        self.processo = None
+        self.inicializacao_ms = None
+        self.ultimo_contato = 0.0
+        self._pendentes: Dict[int, Any] = {}
+        self._ids = itertools.count(1)
+        self._lock_contadores = threading.Lock()
+        self._contadores = {
+            "requisicoes": 0, "lotes": 0, "erros": 0, "expiradas": 0, "canceladas": 0, "descartadas": 0,
+            "pico_em_andamento": 0
+        }
+        self._latencias = deque(maxlen=AMOSTRAS_LATENCIA)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock_contadores:
+            contadores = dict(self._contadores)
+            latencias = list(self._latencias)
+        return {
+            "comando": " ".join(self.comando),
+            "pid": self.processo.pid if self.viva else None,
+            "viva": self.viva,
+            "inicializacao_ms": self.inicializacao_ms,
+            "em_andamento": len(self._pendentes),
+            **contadores,
+            "latencia_ms": _percentis(latencias)
+        }
+
+    def _contar(self, **incrementos):
+        with self._lock_contadores:
+            for chave, valor in incrementos.items():
+                self._contadores[chave] += valor
+
+    def _registrar(self, chamadas, criar_futuro):
+        """Um id e um future pendente por chamada; retorna (ids, mensagens, futures)."""
+        ids, mensagens, futuros = [], [], []
+        for metodo, params in chamadas:
+            requisicao_id = next(self._ids)
+            futuro = criar_futuro()
+            self._pendentes[requisicao_id] = futuro
+            ids.append(requisicao_id)
+            futuros.append(futuro)
+            mensagens.append({"jsonrpc": "2.0", "id": requisicao_id, "method": metodo, "params": params or {}})
+        with self._lock_contadores:
+            self._contadores["pico_em_andamento"] = max(self._contadores["pico_em_andamento"], len(self._pendentes))
+        return ids, mensagens, futuros
+
+    def _concluir(self, ids: List[int], inicio: float, respostas: List[Dict[str, Any]]):
+        erros = sum(1 for resposta in respostas if "error" in resposta)
+        with self._lock_contadores:
+            self._latencias.append(time.perf_counter() - inicio)
+            self._contadores["requisicoes"] += len(ids)
+            self._contadores["erros"] += erros
+
+    def _cancelamentos(self, ids: List[int], motivo: str) -> bytes:
+        """`notifications/cancelled` das requisições abandonadas que ainda não tiveram resposta."""
+        return b"".join(
+            _linha({"jsonrpc": "2.0", "method": "notifications/cancelled",
+                    "params": {"requestId": requisicao_id, "reason": motivo}})
+            for requisicao_id in ids if requisicao_id in self._pendentes
+        )
+
+    def _despachar(self, mensagem):
+        # Um batch volta como uma lista de respostas
+        for resposta in mensagem if isinstance(mensagem, list) else (mensagem,):
+            futuro = self._pendentes.pop(resposta.get("id"), None) if isinstance(resposta, dict) else None
+            if futuro is None or futuro.done():
+                self._contar(descartadas=1)
+                if isinstance(resposta, dict) and resposta.get("id") is None and "error" in resposta:
+                    logger.warning("Servidor MCP %s: %s", self.nome, resposta["error"])
+                continue
+            self.ultimo_contato = time.monotonic()
+            futuro.set_result(resposta)
+
+    def _falhar_pendentes(self):
+        """Fim da saída do servidor: as requisições pendentes falham com ErroMCP."""
+        erro = ErroMCP(f"Servidor MCP {self.nome} encerrou")
+        for requisicao_id in list(self._pendentes):
+            futuro = self._pendentes.pop(requisicao_id, None)
+            if futuro is not None and not futuro.done():
+                futuro.set_exception(erro)
+
+    def _mensagem_inicializacao(self) -> Dict[str, Any]:
+        return {
+            "protocolVersion": VERSAO_PROTOCOLO,
+            "capabilities": {},
+            "clientInfo": {"name": "fourbank-agent", "version": "0.1.0"}
+        }
+
+    @staticmethod
+    def _resultado(resposta: Dict[str, Any]) -> Dict[str, Any]:
+        if "error" in resposta:
+            raise ErroMCP(f"MCP Error: {resposta['error']}")
+        return resposta.get("result", {})
+
+    @staticmethod
+    def _resultados_lote(respostas: List[Dict[str, Any]]) -> List[Any]:
+        return [
+            ErroMCP(f"MCP Error: {resposta['error']}") if "error" in resposta else resposta.get("result", {})
+            for resposta in respostas
+        ]
+
+
+def _linha(mensagem) -> bytes:
+    return json.dumps(mensagem).encode("utf-8") + b"\n"
+
+
+class ClienteJsonRpc(_ClienteBase):
+    """Cliente JSON-RPC asyncio de um servidor MCP em stdio, com muitas requisições no mesmo pipe.
+
+    Uma tarefa lê a saída do servidor e resolve os futures. Cada requisição tem
+    o próprio prazo: quando ele vence, ou quando quem espera é cancelado, o
+    servidor recebe `notifications/cancelled`. Todas as chamadas devem vir do
+    event loop em que o cliente foi iniciado.
+    """
+
+    def __init__(self, nome: str, comando: List[str], timeout: Optional[float] = None):
+        super().__init__(nome, comando, timeout)
+        self._tarefas: List[asyncio.Task] = []
+
+    @property
+    def viva(self) -> bool:
+        # A tarefa leitora termina quando a saída do processo fecha
+        return (
+            self.processo is not None and self.processo.returncode is None
+            and bool(self._tarefas) and not self._tarefas[0].done()
+        )
+
+    async def iniciar(self):
+        """Inicia o processo e faz o handshake `initialize` do MCP."""
+        inicio = time.perf_counter()
+        with span("mcp.iniciar", servidor=self.nome, comando=" ".join(self.comando)):
+            logger.info("Iniciando servidor MCP %s: %s", self.nome, " ".join(self.comando))
+            self.processo = await asyncio.create_subprocess_exec(
+                *self.comando,
+                cwd=RAIZ,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                limit=LIMITE_LINHA,
+            )
+            self._tarefas = [
+                asyncio.create_task(self._ler_respostas(self.processo)),
+                asyncio.create_task(self._ler_erros(self.processo)),
+            ]
+            try:
+                await self.requisitar("initialize", self._mensagem_inicializacao())
+                await self.notificar("notifications/initialized")
+            except BaseException:
+                await self.encerrar()
+                raise
+        self.inicializacao_ms = (time.perf_counter() - inicio) * 1000
+        logger.info("Servidor MCP %s pronto em %.0f ms (pid %d)", self.nome, self.inicializacao_ms, self.processo.pid)
+
+    async def encerrar(self):
+        processo, self.processo = self.processo, None
+        if processo is None:
+            return
+        if processo.returncode is None:
+            processo.terminate()
+            try:
+                await asyncio.wait_for(processo.wait(), 2)
+            except asyncio.TimeoutError:
+                processo.kill()
+                await processo.wait()
+        # Um neto que herdou os pipes (npx -> node) pode mantê-los abertos
+        _, pendentes = await asyncio.wait(self._tarefas, timeout=2)
+        for tarefa in pendentes:
+            tarefa.cancel()
+
+    async def requisitar(self, metodo: str, params: Optional[Dict[str, Any]] = None,
+                         timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Envia uma requisição e retorna o `result` da resposta.
+
+        Levanta ErroMCP se o servidor responder com erro ou não estiver
+        rodando, e TimeoutError se a resposta não chegar em `timeout` segundos.
+        """
+        with span("mcp.requisicao", servidor=self.nome, metodo=metodo):
+            resposta, = await self._chamar([(metodo, params)], timeout, lote=False)
+            return self._resultado(resposta)
+
+    async def lote(self, chamadas: List[Tuple[str, Optional[Dict[str, Any]]]],
+                   timeout: Optional[float] = None) -> List[Any]:
+        """Envia as chamadas (método, params) em um único batch JSON-RPC.
+
+        Retorna, na ordem das chamadas, o `result` de cada uma ou um ErroMCP
+        para as que o servidor respondeu com erro. O prazo vale para o lote.
+        """
+        if not chamadas:
+            return []
+        with span("mcp.lote", servidor=self.nome, tamanho=len(chamadas)):
+            respostas = await self._chamar(chamadas, timeout, lote=True)
+        self._contar(lotes=1)
+        return self._resultados_lote(respostas)
+
+    async def notificar(self, metodo: str, params: Optional[Dict[str, Any]] = None):
+        """Envia uma notificação, que não tem resposta."""
+        await self._escrever(_linha({"jsonrpc": "2.0", "method": metodo, "params": params or {}}))
+
+    async def verificar(self, timeout: float = 2) -> bool:
+        """Health check: o processo está vivo e responde a um ping."""
+        try:
+            await self.requisitar("ping", timeout=timeout)
+            return True
+        except (ErroMCP, TimeoutError, OSError):
+            return False
+
+    async def _chamar(self, chamadas, timeout, lote: bool) -> List[Dict[str, Any]]:
+        """Registra um future por chamada, envia as mensagens e aguarda todas as respostas."""
+        if not self.viva:
+            self._contar(erros=len(chamadas))
+            raise ErroMCP(f"Servidor MCP {self.nome} não está rodando")
+        ids, mensagens, futuros = self._registrar(chamadas, asyncio.get_running_loop().create_future)
+        inicio = time.perf_counter()
+        try:
+            await self._escrever(_linha(mensagens if lote else mensagens[0]))
+            _, sem_resposta = await asyncio.wait(futuros, timeout=timeout or self.timeout)
+            if sem_resposta:
+                self._contar(expiradas=len(sem_resposta))
+                self._cancelar(ids, "Tempo excedido")
+                raise TimeoutError("Tempo excedido aguardando resposta do servidor MCP")
+            # Lê a exceção de todos os futures (o servidor encerrou) antes de levantar a primeira
+            erros = [futuro.exception() for futuro in futuros]
+            if any(erros):
+                raise next(erro for erro in erros if erro)
+            respostas = [futuro.result() for futuro in futuros]
+        except TimeoutError:
+            raise
+        except asyncio.CancelledError:
+            self._contar(canceladas=len(ids))
+            self._cancelar(ids, "Requisição cancelada")
+            raise
+        except Exception:
+            self._contar(erros=len(ids))
+            raise
+        finally:
+            for requisicao_id in ids:
+                self._pendentes.pop(requisicao_id, None)
+        self._concluir(ids, inicio, respostas)
+        return respostas
+
+    def _cancelar(self, ids: List[int], motivo: str):
+        if not self.viva:
+            return
+        try:
+            # Sem drain: pode rodar dentro de uma tarefa que está sendo cancelada
+            self.processo.stdin.write(self._cancelamentos(ids, motivo))
+        except (ConnectionError, RuntimeError):
+            pass
+
+    async def _escrever(self, dados: bytes):
+        processo = self.processo
+        if processo is None:
+            raise ErroMCP(f"Servidor MCP {self.nome} não está rodando")
+        try:
+            processo.stdin.write(dados)
+            await processo.stdin.drain()
+        except (ConnectionError, RuntimeError) as e:
+            raise ErroMCP(f"Servidor MCP {self.nome} fechou a conexão") from e
+
+    async def _ler_respostas(self, processo):
+        try:
+            while linha := await processo.stdout.readline():
+                try:
+                    mensagem = json.loads(linha)
+                except json.JSONDecodeError:
+                    logger.warning("Servidor MCP %s: saída inválida %r", self.nome, linha[:200])
+                    continue
+                self._despachar(mensagem)
+        except ValueError as e:
+            logger.error("Servidor MCP %s: resposta acima de %d bytes: %s", self.nome, LIMITE_LINHA, e)
+        finally:
+            self._falhar_pendentes()
+
+    async def _ler_erros(self, processo):
+        while linha := await processo.stderr.readline():
+            logger.warning("Servidor MCP %s: %s", self.nome, linha.decode("utf-8", "replace").strip())
+
+
+class ConexaoMCP(_ClienteBase):
+    """Versão síncrona do ClienteJsonRpc, para as threads do agente.
+
+    Qualquer thread pode chamar `requisitar` e `lote`: a requisição é escrita
+    direto no pipe e a thread bloqueia só até a própria resposta ou o próprio
+    prazo, enquanto uma thread leitora resolve os futures de todas.
+    """
+
+    def __init__(self, nome: str, comando: List[str], timeout: Optional[float] = None):
+        super().__init__(nome, comando, timeout)
+        self._leitores: List[threading.Thread] = []
+        self._lock_escrita = threading.Lock()
+
+    @property
+    def viva(self) -> bool:
+        return (
+            self.processo is not None and self.processo.poll() is None
+            and bool(self._leitores) and self._leitores[0].is_alive()
+        )
+
+    def iniciar(self):
+        """Inicia o processo e faz o handshake `initialize` do MCP."""
+        inicio = time.perf_counter()
+        with span("mcp.iniciar", servidor=self.nome, comando=" ".join(self.comando)):
+            logger.info("Iniciando servidor MCP %s: %s", self.nome, " ".join(self.comando))
+            self.processo = subprocess.Popen(
+                self.comando,
+                cwd=RAIZ,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+            self._leitores = [
+                threading.Thread(target=self._ler_respostas, args=(self.processo,), name=f"mcp-{self.nome}", daemon=True),
+                threading.Thread(target=self._ler_erros, args=(self.processo,), daemon=True),
+            ]
+            for leitor in self._leitores:
+                leitor.start()
+            try:
+                self.requisitar("initialize", self._mensagem_inicializacao())
+                self.notificar("notifications/initialized")
+            except BaseException:
+                self.encerrar()
+                raise
+        self.inicializacao_ms = (time.perf_counter() - inicio) * 1000
+        logger.info("Servidor MCP %s pronto em %.0f ms (pid %d)", self.nome, self.inicializacao_ms, self.processo.pid)
+
+    def encerrar(self):
+        processo, self.processo = self.processo, None
+        if processo is None:
+            return
+        processo.terminate()
+        try:
+            processo.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            processo.kill()
+            processo.wait()
+        for leitor in self._leitores:
+            leitor.join(timeout=2)
+        for pipe in (processo.stdin, processo.stdout, processo.stderr):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+    def requisitar(self, metodo: str, params: Optional[Dict[str, Any]] = None,
+                   timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Versão síncrona de ClienteJsonRpc.requisitar."""
+        with span("mcp.requisicao", servidor=self.nome, metodo=metodo):
+            resposta, = self._chamar([(metodo, params)], timeout, lote=False)
+            return self._resultado(resposta)
+
+    def lote(self, chamadas: List[Tuple[str, Optional[Dict[str, Any]]]],
+             timeout: Optional[float] = None) -> List[Any]:
+        """Versão síncrona de ClienteJsonRpc.lote."""
+        if not chamadas:
+            return []
+        with span("mcp.lote", servidor=self.nome, tamanho=len(chamadas)):
+            respostas = self._chamar(chamadas, timeout, lote=True)
+        self._contar(lotes=1)
+        return self._resultados_lote(respostas)
+
+    def notificar(self, metodo: str, params: Optional[Dict[str, Any]] = None):
+        self._escrever(_linha({"jsonrpc": "2.0", "method": metodo, "params": params or {}}))
+
+    def verificar(self, timeout: float = 2) -> bool:
+        """Health check: o processo está vivo e responde a um ping."""
+        try:
+            self.requisitar("ping", timeout=timeout)
+            return True
+        except (ErroMCP, TimeoutError, OSError):
+            return False
+
+    def _chamar(self, chamadas, timeout, lote: bool) -> List[Dict[str, Any]]:
+        if not self.viva:
+            self._contar(erros=len(chamadas))
+            raise ErroMCP(f"Servidor MCP {self.nome} não está rodando")
+        ids, mensagens, futuros = self._registrar(chamadas, concurrent.futures.Future)
+        inicio = time.perf_counter()
+        prazo = inicio + (timeout or self.timeout)
+        try:
+            self._escrever(_linha(mensagens if lote else mensagens[0]))
+            respostas = [futuro.result(timeout=max(0.0, prazo - time.perf_counter())) for futuro in futuros]
+        except concurrent.futures.TimeoutError:
+            self._contar(expiradas=sum(1 for futuro in futuros if not futuro.done()))
+            self._cancelar(ids, "Tempo excedido")
+            raise TimeoutError("Tempo excedido aguardando resposta do servidor MCP") from None
+        except Exception:
+            self._contar(erros=len(ids))
+            raise
+        finally:
+            for requisicao_id in ids:
+                self._pendentes.pop(requisicao_id, None)
+        self._concluir(ids, inicio, respostas)
+        return respostas
+
+    def _cancelar(self, ids: List[int], motivo: str):
+        try:
+            self._escrever(self._cancelamentos(ids, motivo))
+        except ErroMCP:
+            pass
+
+    def _escrever(self, dados: bytes):
+        processo = self.processo
+        if processo is None:
+            raise ErroMCP(f"Servidor MCP {self.nome} não está rodando")
+        try:
+            with self._lock_escrita:
+                processo.stdin.write(dados)
+                processo.stdin.flush()
+        except (BrokenPipeError, ValueError) as e:
+            raise ErroMCP(f"Servidor MCP {self.nome} fechou a conexão") from e
+
+    def _ler_respostas(self, processo):
+        try:
+            for linha in processo.stdout:
+                try:
+                    mensagem = json.loads(linha)
+                except json.JSONDecodeError:
+                    logger.warning("Servidor MCP %s: saída inválida %r", self.nome, linha[:200])
+                    continue
+                self._despachar(mensagem)
+        finally:
+            self._falhar_pendentes()
+
+    def _ler_erros(self, processo):
+        for linha in processo.stderr:
+            logger.warning("Servidor MCP %s: %s", self.nome, linha.decode("utf-8", "replace").strip())
+
+
+class GerenciadorMCP:
+    """As conexões MCP do processo: um processo por servidor, compartilhado por todas as sessões.
+
+    O servidor é iniciado na primeira requisição. Uma conexão sem contato há
+    mais de `intervalo_saude` segundos é verificada com um ping antes do uso,
+    e um processo morto ou que não responde é substituído por um novo.
+    """
+
+    def __init__(self, servidores: Optional[Dict[str, List[str]]] = None,
+                 intervalo_saude: Optional[float] = None, espera_reinicio: Optional[float] = None):
+        # Sem `servidores`, os comandos vêm de SERVIDORES e das variáveis AGENT_MCP_<NOME>
+        self.servidores = servidores
+        self.intervalo_saude = INTERVALO_SAUDE if intervalo_saude is None else intervalo_saude
+        self.espera_reinicio = ESPERA_REINICIO if espera_reinicio is None else espera_reinicio
+        self._conexoes: Dict[str, ConexaoMCP] = {}
+        self._falhas: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._contadores = {"processos_iniciados": 0, "reinicios": 0, "falhas_inicio": 0, "verificacoes": 0}
+
+    def comando(self, nome: str) -> List[str]:
+        if self.servidores is None:
+            return comando_do_servidor(nome)
+        if nome not in self.servidores:
+            raise ErroMCP(f"Servidor MCP não configurado: {nome}")
+        return list(self.servidores[nome])
+
+    def obter(self, nome: str = "banking") -> ConexaoMCP:
+        """A conexão do servidor, iniciando ou substituindo o processo se necessário."""
+        conexao = self._conexoes.get(nome)
+        if conexao is not None and conexao.viva and time.monotonic() - conexao.ultimo_contato < self.intervalo_saude:
+            return conexao
+        with self._lock:
+            conexao = self._conexoes.get(nome)
+            if conexao is not None and conexao.viva:
+                if time.monotonic() - conexao.ultimo_contato < self.intervalo_saude:
+                    return conexao
+                self._contadores["verificacoes"] += 1
+                if conexao.verificar():
+                    return conexao
+                logger.warning("Servidor MCP %s não respondeu ao health check; reiniciando", nome)
+            if conexao is not None:
+                conexao.encerrar()
+                del self._conexoes[nome]
+                self._contadores["reinicios"] += 1
+
+            falha = self._falhas.get(nome)
+            if falha is not None and time.monotonic() - falha < self.espera_reinicio:
+                raise ErroMCP(f"Servidor MCP {nome} indisponível")
+            conexao = ConexaoMCP(nome, self.comando(nome))
+            try:
+                conexao.iniciar()
+            except Exception as e:
+                self._falhas[nome] = time.monotonic()
+                self._contadores["falhas_inicio"] += 1
+                logger.error("Erro ao iniciar servidor MCP %s: %s", nome, e)
+                raise ErroMCP(f"Servidor MCP {nome} indisponível: {e}") from e
+            self._falhas.pop(nome, None)
+            self._contadores["processos_iniciados"] += 1
+            self._conexoes[nome] = conexao
+            return conexao
+
+    def requisitar(self, nome: str, metodo: str, params: Optional[Dict[str, Any]] = None,
+                   timeout: Optional[float] = None) -> Dict[str, Any]:
+        return self.obter(nome).requisitar(metodo, params, timeout)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            conexoes = dict(self._conexoes)
+            contadores = dict(self._contadores)
+        return {
+            **contadores,
+            "processos_vivos": sum(1 for conexao in conexoes.values() if conexao.viva),
+            "servidores": {nome: conexao.estatisticas() for nome, conexao in conexoes.items()}
+        }
+
+    def encerrar(self):
+        """Encerra os processos de todos os servidores."""
+        with self._lock:
+            conexoes = list(self._conexoes.values())
+            self._conexoes.clear()
+        for conexao in conexoes:
+            conexao.encerrar()
+
+
+# Gerenciador do processo, usado por todos os agentes
+gerenciador = GerenciadorMCP()
+atexit.register(gerenciador.encerrar)
@@ -0,0 +1,94 @@
+import os
+from collections import deque
+from collections.abc import Sequence as SequenciaAbstrata
+from typing import Any, Iterable, Optional, Sequence, Tuple
+
+from langchain_core.messages import HumanMessage
+
+# Quantidade de turnos mantidos por sessão; turnos mais antigos são compactados (descartados)
+MAX_TURNOS_RETIDOS = int(os.getenv("AGENT_MAX_TURNOS", "50"))
+
+
+class MessageLog:
+    """Log de mensagens de uma sessão, apenas com acréscimos.
+
+    Cada turno é gravado como uma tupla imutável em um deque limitado: o
+    acréscimo é O(1) e, ao ultrapassar a retenção, o turno mais antigo é
+    descartado. snapshot() devolve uma tupla imutável, montada uma vez por
+    acréscimo e reaproveitada até o próximo, que o grafo lê sem copiar (ver
+    Conversa).
+    """
+
+    def __init__(self, max_turnos: Optional[int] = None):
+        self.max_turnos = max_turnos or MAX_TURNOS_RETIDOS
+        self._turnos = deque(maxlen=self.max_turnos)
+        self._snapshot: Optional[Tuple[Any, ...]] = ()
+        self.total_turnos = 0
+
+    def registrar_turno(self, mensagens: Iterable[Any]):
+        """Acrescenta as mensagens de um turno concluído."""
+        self._turnos.append(tuple(mensagens))
+        self._snapshot = None
+        self.total_turnos += 1
+
+    def snapshot(self) -> Tuple[Any, ...]:
+        """Mensagens retidas, da mais antiga para a mais recente."""
+        if self._snapshot is None:
+            self._snapshot = tuple(m for turno in self._turnos for m in turno)
+        return self._snapshot
+
+    def __len__(self):
+        return len(self.snapshot())
+
+    @classmethod
+    def de_mensagens(cls, mensagens: Sequence[Any], max_turnos: Optional[int] = None) -> "MessageLog":
+        """Reconstrói o log a partir de uma lista plana; cada HumanMessage inicia um turno."""
+        log = cls(max_turnos)
+        turno = []
+        for mensagem in mensagens:
+            if isinstance(mensagem, HumanMessage) and turno:
+                log.registrar_turno(turno)
+                turno = []
+            turno.append(mensagem)
+        if turno:
+            log.registrar_turno(turno)
+        return log
+
+
+class Conversa(SequenciaAbstrata):
+    """Histórico retido mais as mensagens do turno em andamento, sem copiar o histórico.
+
+    É o valor de "messages" no estado do grafo: os nós o leem como uma
+    sequência comum e acrescentar() devolve uma nova Conversa que compartilha
+    a mesma tupla do histórico, então o custo do turno não cresce com ele.
+    """
+
+    __slots__ = ("historico", "turno")
+
+    def __init__(self, historico: Tuple[Any, ...] = (), turno: Tuple[Any, ...] = ()):
+        self.historico = historico
+        self.turno = turno
+
+    def acrescentar(self, *mensagens: Any) -> "Conversa":
+        return Conversa(self.historico, self.turno + mensagens)
+
+    def __len__(self):
+        return len(self.historico) + len(self.turno)
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            return [self[i] for i in range(*indice.indices(len(self)))]
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError("índice fora da conversa")
+        tamanho = len(self.historico)
+        return self.historico[indice] if indice < tamanho else self.turno[indice - tamanho]
+
+    def __iter__(self):
+        yield from self.historico
+        yield from self.turno
+
+    def __reversed__(self):
+        yield from reversed(self.turno)
+        yield from reversed(self.historico)
@@ -1,149 +1,204 @@
-import re
-import json
+import logging
 from typing import Dict, Any
-from datetime import datetime
-from langchain_core.messages import HumanMessage, AIMessage, FunctionMessage
-from langchain.chains import RetrievalQA
-from langchain_groq import ChatGroq
+from datetime import datetime, timedelta
+from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
 from agent.states import ChatState
+from agent.llm import obter_llm
+from agent.tracing import span, registrar_tokens
 from agent.services import (
     consultar_saldo, 
     realizar_transferencia, 
-    buscar_transacoes, 
+    consultar_extrato, 
     pagar_boleto, 
     pagar_cartao, 
-    analisar_comportamento
+    pagar_boletos_em_lote,
+    realizar_transferencias_em_lote,
+    analisar_comportamento,
+    obter_cliente
 )
+from agent.entidades import (
+    extrair_valor,
+    extrair_periodo,
+    extrair_quantidade_lote,
+    extrair_tipo_transacao,
+    indice_clientes
+)
+from agent.analise import analisar_mensagem, rotulo
+
+logger = logging.getLogger(__name__)
+
+# Intenções somente leitura, executadas em paralelo no grafo
+INTENCOES_LEITURA = ("consulta_saldo", "extrato", "perfil", "duvida", "mcp")
+# Intenções que alteram saldo ou fatura, executadas uma de cada vez na ordem da mensagem
+INTENCOES_OPERACAO = ("transferencia", "pagamento_boleto", "pagamento_cartao")
+# Operações que, pedidas em sequência na mesma mensagem, são executadas como um lote
+INTENCOES_LOTE = ("transferencia", "pagamento_boleto")
 
-def classificar_intencao(state: ChatState) -> ChatState:
-    """Versão aprimorada baseada em regras com melhor extração de entidades."""
-    # Obtém a última mensagem do usuário
-    mensagem = ""
+# Código de barras de exemplo por tipo de conta; "" é o boleto genérico
+CODIGOS_BOLETO = {
+    "agua": "76543210987654321098",
+    "luz": "89123456789012345678",
+    "internet": "45678901234567890123",
+    "telefone": "32109876543210987654",
+    "": "12345678901234567890"
+}
+ESTABELECIMENTOS = ["Restaurante", "Supermercado", "Farmácia", "Posto de Combustível"]
+# Como cada tipo de transação aparece no título do extrato filtrado
+TITULOS_EXTRATO = {
+    "transferência": "transferências",
+    "pagamento_boleto": "pagamentos de boleto",
+    "pagamento_cartao": "compras no cartão"
+}
+
+def analise_do_turno(state: ChatState) -> Dict[str, Any]:
+    """Análise da última mensagem do usuário; calculada aqui só se o turno não a trouxer."""
+    if state.get("analise"):
+        return state["analise"]
     for msg in reversed(state["messages"]):
         if isinstance(msg, HumanMessage):
-            mensagem = msg.content.lower()
-            break
-    
-    # Padrões mais sofisticados de dúvidas/perguntas
-    padrao_duvida = any(palavra in mensagem for palavra in [
-        "?", "como", "o que é", "explique", "qual", "quando", "por que", 
-        "dúvida", "pergunta", "pode me informar", "gostaria de saber",
-        "necessário", "necessarios", "documentos", "documentação"
-    ]) or mensagem.isupper()
+            return analisar_mensagem(msg.content)
+    return analisar_mensagem("")
+
+def _classificar_trecho(texto: str, rotulos) -> tuple:
+    """Escolhe a intenção de um trecho a partir dos rótulos da análise e extrai seus parâmetros."""
+    padrao_duvida = "duvida" in rotulos
     
-    # Regex mais precisos para extração de valores
-    valor_regex = r'R?\$?\s?(\d+(?:[.,]\d+)?)'
-    periodo_regex = r'últim[oa]s?\s+(\d+)'
+    # "pague estas 5 contas": o número anunciado não é valor de nenhum item
+    quantidade_anunciada, texto = extrair_quantidade_lote(texto)
     
     # Classificação baseada em padrões de linguagem natural
-    if any(palavra in mensagem for palavra in ["saldo", "quanto tenho", "disponível", "sobrou", "restante"]):
+    if "intencao:consulta_saldo" in rotulos:
         intencao = "consulta_saldo"
         parametros = {}
-    elif any(palavra in mensagem for palavra in ["transferir", "transferência", "enviar", "mandar", "depositar", "passar", "pix"]):
-        valor_match = re.search(valor_regex, mensagem)
-        valor = float(valor_match.group(1).replace(',', '.')) if valor_match else 100
+    elif "intencao:transferencia" in rotulos and not ("intencao:extrato" in rotulos and extrair_valor(texto) is None):
+        valor = extrair_valor(texto)
+        if valor is None:
+            valor = 100
         
-        # Busca por destinatário com melhor reconhecimento
-        destino_id = "2"  # Default: Maria
-        if "maria" in mensagem:
-            destino_id = "2"
-        elif "carlos" in mensagem or "oliveira" in mensagem:
-            destino_id = "3"
+        # Busca o destinatário pela conta ou pelo nome no índice de clientes
+        destino_id = indice_clientes().resolver(texto) or ""
         
         parametros = {"valor": valor, "destino_id": destino_id}
         intencao = "transferencia"
-    elif any(palavra in mensagem for palavra in ["transações", "extrato", "movimentações", "histórico", "atividade"]):
-        limite = 5
-        limite_match = re.search(periodo_regex, mensagem)
-        if limite_match:
-            limite = int(limite_match.group(1))
-        
-        parametros = {"limite": limite}
+    elif "intencao:extrato" in rotulos or "paginacao" in rotulos:
+        parametros = extrair_periodo(texto)
+        # "extrato das transferências para a Maria": filtros de tipo e contraparte
+        tipo = extrair_tipo_transacao(texto)
+        if tipo:
+            parametros["tipo"] = tipo
+        contraparte = indice_clientes().resolver(texto) if tipo == "transferência" else None
+        if contraparte:
+            parametros["contraparte"] = contraparte
+        if "paginacao" in rotulos:
+            parametros["continuar"] = True
         intencao = "extrato"
-    elif any(palavra in mensagem for palavra in ["boleto", "conta", "fatura", "água", "luz", "energia", "internet", "telefone"]) and not padrao_duvida:
-        valor_match = re.search(valor_regex, mensagem)
-        valor = float(valor_match.group(1).replace(',', '.')) if valor_match else 150
-        
-        # Identificação mais inteligente do tipo de boleto
-        codigo = "12345678901234567890"
-        if "água" in mensagem:
-            codigo = "76543210987654321098"
-        elif "luz" in mensagem or "energia" in mensagem:
-            codigo = "89123456789012345678"
-        elif "internet" in mensagem:
-            codigo = "45678901234567890123"
-        elif "telefone" in mensagem or "celular" in mensagem:
-            codigo = "32109876543210987654"
-        
-        parametros = {"valor": valor, "codigo_barras": codigo}
+    elif "intencao:pagamento_boleto" in rotulos and not padrao_duvida:
+        valor = extrair_valor(texto)
+        if valor is None:
+            valor = 150
+        
+        parametros = {"valor": valor, "codigo_barras": CODIGOS_BOLETO[rotulo(rotulos, "boleto", list(CODIGOS_BOLETO), "")]}
         intencao = "pagamento_boleto"
-    elif any(palavra in mensagem for palavra in ["cartão", "comprar", "compra", "crédito", "débito"]) and not padrao_duvida:
-        valor_match = re.search(valor_regex, mensagem)
-        valor = float(valor_match.group(1).replace(',', '.')) if valor_match else 80
-        
-        # Identificar estabelecimento com mais variações
-        estabelecimento = "Estabelecimento"
-        if any(palavra in mensagem for palavra in ["restaurante", "lanchonete", "comida"]):
-            estabelecimento = "Restaurante"
-        elif any(palavra in mensagem for palavra in ["mercado", "supermercado", "compras"]):
-            estabelecimento = "Supermercado"
-        elif any(palavra in mensagem for palavra in ["farmácia", "remédio", "medicamento"]):
-            estabelecimento = "Farmácia"
-        elif any(palavra in mensagem for palavra in ["posto", "gasolina", "combustível"]):
-            estabelecimento = "Posto de Combustível"
-        
-        parametros = {"valor": valor, "estabelecimento": estabelecimento, "cartao_id": "1"}
+    elif "intencao:pagamento_cartao" in rotulos and not padrao_duvida:
+        valor = extrair_valor(texto)
+        if valor is None:
+            valor = 80
+        
+        estabelecimento = rotulo(rotulos, "estabelecimento", ESTABELECIMENTOS, "Estabelecimento")
+        parametros = {"valor": valor, "estabelecimento": estabelecimento}
         intencao = "pagamento_cartao"
-    elif any(palavra in mensagem for palavra in ["perfil", "comportamento", "análise", "gastos", "financeiro"]):
+    elif "intencao:perfil" in rotulos:
         intencao = "perfil"
         parametros = {}
     # Priorizar dúvidas sobre outras intenções
     elif padrao_duvida:
         intencao = "duvida"
-        parametros = {"query": mensagem}
-    elif any(palavra in mensagem for palavra in [
-        "empréstimo consignado", "emprestimo consignado", "consignado", 
-        "taxas", "juros", "taxa de juros", "elegibilidade", 
-        "posso pegar empréstimo", "aprovação", "consultar", "consulta", 
-        "margem", "margem consignável", "disponibilidade"
-    ]):
+        parametros = {"query": texto}
+    elif "intencao:mcp" in rotulos:
         intencao = "mcp"  # Intenção para processamento via MCP
-        parametros = {"query": mensagem}
+        parametros = {"query": texto}
     else:
         intencao = "outro"
         parametros = {}
     
-    # Adiciona o resultado ao estado
-    result = {"intencao": intencao, "parametros": parametros}
-    state["messages"].append(
-        FunctionMessage(
-            content=json.dumps(result),
-            name="classificador_intencao"
-        )
-    )
-    
-    # Define o próximo nó
-    state["next"] = intencao
-    
-    # Adicionar logs para debugging
-    print(f"MENSAGEM CLASSIFICADA: '{mensagem}'")
-    print(f"INTENÇÃO DETECTADA: {intencao} com parametros: {parametros}")
+    if quantidade_anunciada is not None and intencao in INTENCOES_LOTE:
+        parametros["quantidade_anunciada"] = quantidade_anunciada
     
-    return state
+    return intencao, parametros
+
+def _continuacao(texto: str, rotulos, anterior: str) -> tuple:
+    """Trecho sem palavra-chave após uma operação ("... e 50 para Carlos"): herda a operação.
+
+    Só é aceito se o trecho traz um valor e, nas transferências, um destinatário.
+    """
+    if anterior not in INTENCOES_LOTE or extrair_valor(texto) is None:
+        return "outro", {}
+    intencao, parametros = _classificar_trecho(texto, set(rotulos) | {f"intencao:{anterior}"})
+    if intencao == "transferencia" and not parametros["destino_id"]:
+        return "outro", {}
+    return intencao, parametros
 
-def processar_saldo(state: ChatState) -> ChatState:
+def classificar_intencao(state: ChatState) -> Dict[str, Any]:
+    """Versão aprimorada baseada em regras com melhor extração de entidades.
+
+    Usa a análise da mensagem feita uma vez por turno (state["analise"]).
+    Mensagens com vários pedidos geram uma intenção por pedido, na ordem em que
+    aparecem; cada uma recebe um campo "ordem" usado para montar a resposta.
+    """
+    analise = analise_do_turno(state)
+    
+    intencao, parametros = _classificar_trecho(analise["texto"], analise["rotulos"])
+    intencoes = [{"intencao": intencao, "parametros": parametros, "ordem": 0}]
+    
+    if len(analise["trechos"]) > 1:
+        encontradas = []
+        for trecho in analise["trechos"]:
+            intencao_trecho, parametros_trecho = _classificar_trecho(trecho["texto"], trecho["rotulos"])
+            if intencao_trecho == "outro" and encontradas:
+                intencao_trecho, parametros_trecho = _continuacao(trecho["texto"], trecho["rotulos"], encontradas[-1]["intencao"])
+            if intencao_trecho == "outro":
+                continue
+            # Consultas repetidas não precisam rodar duas vezes; operações sim
+            if intencao_trecho in INTENCOES_LEITURA and any(e["intencao"] == intencao_trecho for e in encontradas):
+                continue
+            encontradas.append({"intencao": intencao_trecho, "parametros": parametros_trecho, "ordem": len(encontradas)})
+        if len(encontradas) > 1:
+            intencoes = encontradas
+    
+    # Só rótulos: o texto normalizado, sem acentos, escaparia do mascaramento de PII
+    logger.debug("Mensagem classificada", extra={
+        "intencoes": [e["intencao"] for e in intencoes],
+        "entidades": sorted({chave for e in intencoes for chave in e["parametros"]})
+    })
+    
+    # Define as intenções do turno; a primeira também é registrada como próxima etapa
+    return {
+        "intencao": intencoes[0]["intencao"],
+        "intencoes": intencoes,
+        "next": intencoes[0]["intencao"]
+    }
+
+def intencao_do_turno(state: ChatState, intencao: str) -> Dict[str, Any]:
+    """Retorna a entrada da intenção tratada por um nó no turno atual."""
+    for entrada in state.get("intencoes") or []:
+        if entrada["intencao"] == intencao:
+            return entrada
+    return {"intencao": intencao, "parametros": {}, "ordem": 0}
+
+def resposta_parcial(entrada: Dict[str, Any], resposta: str, resultados: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Atualização de estado de um nó: a resposta (com a ordem da intenção) e os resultados de serviço."""
+    return {"respostas": [(entrada["ordem"], resposta)], "resultados": resultados or {}}
+
+def processar_saldo(state: ChatState, entrada: Dict[str, Any] = None) -> Dict[str, Any]:
     """Processa consultas de saldo com personalização."""
+    entrada = entrada or intencao_do_turno(state, "consulta_saldo")
     cliente_id = state["cliente_id"]
-    resultado = consultar_saldo(cliente_id)
+    with span("servico.consultar_saldo"):
+        resultado = consultar_saldo(cliente_id)
     
-    state["messages"].append(
-        FunctionMessage(
-            content=json.dumps(resultado),
-            name="consultar_saldo"
-        )
-    )
+    resultados = {"consultar_saldo": resultado}
     
     # Gera resposta personalizada com base no resultado
     if resultado["status"] == "sucesso":
@@ -158,100 +213,118 @@ def processar_saldo(state: ChatState) -> ChatState:
     else:
         resposta = f"Desculpe, não foi possível consultar o saldo: {resultado['mensagem']}"
     
-    state["messages"].append(AIMessage(content=resposta))
-    
-    return state
+    return resposta_parcial(entrada, resposta, resultados)
 
-def processar_transferencia(state: ChatState) -> ChatState:
+def processar_transferencia(state: ChatState, entrada: Dict[str, Any] = None) -> Dict[str, Any]:
     """Processa transferências com validações aprimoradas."""
-    messages = state["messages"]
+    entrada = entrada or intencao_do_turno(state, "transferencia")
     cliente_id = state["cliente_id"]
     
-    # Extrai parâmetros da classificação de intenção
-    for msg in reversed(messages):
-        if isinstance(msg, FunctionMessage) and msg.name == "classificador_intencao":
-            dados = json.loads(msg.content)
-            parametros = dados["parametros"]
-            break
+    # Parâmetros extraídos pelo classificador de intenção
+    parametros = entrada["parametros"]
     
     valor = float(parametros.get("valor", 0))
     destino_id = parametros.get("destino_id", "")
     
     # Validações adicionais
     if valor <= 0:
-        state["messages"].append(AIMessage(
-            content="Por favor, informe um valor válido para a transferência maior que zero."
-        ))
-        return state
+        return resposta_parcial(entrada, "Por favor, informe um valor válido para a transferência maior que zero.")
     
     # Verificar se o destino existe
-    from agent.services import clientes
-    if destino_id not in clientes:
-        state["messages"].append(AIMessage(
-            content="Desculpe, não encontrei o destinatário especificado. Por favor, verifique se o nome está correto."
-        ))
-        return state
+    destino = obter_cliente(destino_id)
+    if destino is None:
+        return resposta_parcial(entrada, "Desculpe, não encontrei o destinatário especificado. Por favor, verifique se o nome está correto.")
     
     # Realiza a transferência
-    resultado = realizar_transferencia(cliente_id, destino_id, valor)
+    with span("servico.realizar_transferencia"):
+        resultado = realizar_transferencia(cliente_id, destino_id, valor)
     
-    state["messages"].append(
-        FunctionMessage(
-            content=json.dumps(resultado),
-            name="realizar_transferencia"
-        )
-    )
+    resultados = {"realizar_transferencia": resultado}
     
     # Gera resposta final com base no resultado
     if resultado["status"] == "sucesso":
-        nome_destino = clientes.get(destino_id, {}).get("nome", "destinatário")
+        nome_destino = destino.get("nome", "destinatário")
         resposta = f"Transferência de R$ {valor:.2f} para {nome_destino} realizada com sucesso. Seu novo saldo é R$ {resultado['novo_saldo']:.2f}."
     else:
         resposta = f"Desculpe, não foi possível realizar a transferência: {resultado['mensagem']}"
     
-    state["messages"].append(AIMessage(content=resposta))
-    
-    return state
+    return resposta_parcial(entrada, resposta, resultados)
 
-def processar_extrato(state: ChatState) -> ChatState:
-    """Processa consultas de extrato com melhor formatação."""
-    messages = state["messages"]
+def _data_extrato(iso: str, exclusiva: bool = False) -> str:
+    """Data do período em dd/mm/aaaa; o fim do período é exclusivo, então mostra o instante anterior."""
+    data = datetime.fromisoformat(iso)
+    if exclusiva:
+        data -= timedelta(microseconds=1)
+    return data.strftime("%d/%m/%Y")
+
+def processar_extrato(state: ChatState, entrada: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Processa consultas de extrato com melhor formatação.
+
+    O extrato é paginado: quando há mais transações, os filtros e o cursor
+    da próxima página ficam no contexto da sessão e "mostrar mais" continua
+    de onde a página anterior parou.
+    """
+    entrada = entrada or intencao_do_turno(state, "extrato")
     cliente_id = state["cliente_id"]
+    contexto = dict(state.get("context") or {})
     
-    # Extrai parâmetros da classificação de intenção
-    for msg in reversed(messages):
-        if isinstance(msg, FunctionMessage) and msg.name == "classificador_intencao":
-            dados = json.loads(msg.content)
-            parametros = dados["parametros"]
-            break
+    # Parâmetros extraídos pelo classificador de intenção
+    parametros = entrada["parametros"]
     
-    limite = int(parametros.get("limite", 5))
+    continuacao = contexto.get("extrato") if parametros.get("continuar") else None
+    if parametros.get("continuar") and continuacao is None:
+        return resposta_parcial(entrada, "Não há mais transações para mostrar. Peça, por exemplo, \"extrato de março\" para uma nova consulta.")
     
-    # Busca as transações
-    resultado = buscar_transacoes(cliente_id, limite)
+    if continuacao is not None:
+        filtros, limite, cursor = continuacao["filtros"], continuacao["limite"], continuacao["cursor"]
+    else:
+        filtros = {chave: parametros[chave] for chave in ("inicio", "fim", "tipo", "contraparte") if parametros.get(chave)}
+        limite = int(parametros.get("limite", 10 if "inicio" in filtros else 5))
+        cursor = None
     
-    state["messages"].append(
-        FunctionMessage(
-            content=json.dumps(resultado),
-            name="buscar_transacoes"
-        )
-    )
+    # Busca a página de transações
+    with span("servico.consultar_extrato"):
+        resultado = consultar_extrato(cliente_id, limite=limite, cursor=cursor, **filtros)
+    
+    resultados = {"consultar_extrato": resultado}
+    
+    # Guarda onde a próxima página começa, ou encerra a paginação
+    contexto["extrato"] = None
+    if resultado.get("cursor"):
+        contexto["extrato"] = {"filtros": filtros, "limite": limite, "cursor": resultado["cursor"]}
+    
+    # Título com os filtros aplicados
+    titulo = TITULOS_EXTRATO.get(filtros.get("tipo"), "transações")
+    if filtros.get("contraparte"):
+        outro = obter_cliente(filtros["contraparte"])
+        titulo += f" com {outro['nome'] if outro else filtros['contraparte']}"
+    if "inicio" in filtros:
+        titulo += f" de {_data_extrato(filtros['inicio'])} a {_data_extrato(filtros.get('fim') or datetime.now().isoformat(), exclusiva=True)}"
     
     # Gera resposta final com base no resultado
     if resultado["status"] == "sucesso" and resultado["transacoes"]:
         transacoes = resultado["transacoes"]
         num_transacoes = len(transacoes)
         
-        resposta = f"Aqui estão suas últimas {num_transacoes} transações:\n\n"
+        if continuacao is not None:
+            resposta = f"Mais {titulo}:\n\n"
+        elif filtros:
+            resposta = f"Extrato de {titulo}, das mais recentes para as mais antigas:\n\n"
+        else:
+            resposta = f"Aqui estão suas últimas {num_transacoes} {titulo}:\n\n"
         
         # Função para formatar transações de forma mais clara
         def formatar_transacao(t):
             data = datetime.fromisoformat(t["data"]).strftime("%d/%m/%Y %H:%M")
             
-            if t.get("tipo") == "transferência" and "destino" in t and "valor" in t:
-                from agent.services import clientes
-                if t["destino"] in clientes:
-                    return f"- {data}: Transferência de R$ {t['valor']:.2f} para {clientes[t['destino']]['nome']}"
+            if t.get("tipo") == "transferência" and t.get("destino") == cliente_id and t.get("origem") != cliente_id and "valor" in t:
+                origem = obter_cliente(t.get("origem"))
+                nome_origem = origem["nome"] if origem is not None else "conta não identificada"
+                return f"- {data}: Transferência de R$ {t['valor']:.2f} recebida de {nome_origem}"
+            elif t.get("tipo") == "transferência" and "destino" in t and "valor" in t:
+                destino = obter_cliente(t["destino"])
+                if destino is not None:
+                    return f"- {data}: Transferência de R$ {t['valor']:.2f} para {destino['nome']}"
                 else:
                     return f"- {data}: Transferência de R$ {t['valor']:.2f} para conta não identificada"
             elif t.get("tipo") == "pagamento_boleto" and "valor" in t:
@@ -271,57 +344,54 @@ def processar_extrato(state: ChatState) -> ChatState:
         # Adicionar resumo
         total_gastos = sum(t.get("valor", 0) for t in transacoes)
         resposta += f"\n\nTotal movimentado: R$ {total_gastos:.2f}"
-        
-    elif resultado["status"] == "sucesso" and not resultado["transacoes"]:
+        if resultado["cursor"]:
+            resposta += "\n\nHá mais transações. Diga \"mostrar mais\" para ver a próxima página."
+        
+    elif resultado["status"] == "sucesso" and continuacao is not None:
+        resposta = "Não há mais transações para mostrar."
+    elif resultado["status"] == "sucesso" and filtros:
+        resposta = f"Não encontrei {titulo}."
+    elif resultado["status"] == "sucesso":
         resposta = "Você ainda não possui transações registradas."
     else:
         resposta = "Desculpe, não foi possível recuperar seu extrato."
     
-    state["messages"].append(AIMessage(content=resposta))
-    
-    return state
+    return {**resposta_parcial(entrada, resposta, resultados), "context": contexto}
 
-def processar_pagamento_boleto(state: ChatState) -> ChatState:
-    messages = state["messages"]
+def _tipo_conta(codigo_barras: str) -> str:
+    """Tipo de conta indicado pelo prefixo do código de barras."""
+    if codigo_barras.startswith("765"):
+        return "água"
+    elif codigo_barras.startswith("891"):
+        return "energia"
+    elif codigo_barras.startswith("456"):
+        return "internet"
+    elif codigo_barras.startswith("321"):
+        return "telefone"
+    return "boleto"
+
+def processar_pagamento_boleto(state: ChatState, entrada: Dict[str, Any] = None) -> Dict[str, Any]:
+    entrada = entrada or intencao_do_turno(state, "pagamento_boleto")
     cliente_id = state["cliente_id"]
     
-    # Extrai parâmetros da classificação de intenção
-    for msg in reversed(messages):
-        if isinstance(msg, FunctionMessage) and msg.name == "classificador_intencao":
-            dados = json.loads(msg.content)
-            parametros = dados["parametros"]
-            break
+    # Parâmetros extraídos pelo classificador de intenção
+    parametros = entrada["parametros"]
     
     codigo_barras = parametros.get("codigo_barras", "")
     valor = float(parametros.get("valor", 0))
     
     # Validações adicionais
     if valor <= 0:
-        state["messages"].append(AIMessage(
-            content="Por favor, informe um valor válido para o pagamento maior que zero."
-        ))
-        return state
+        return resposta_parcial(entrada, "Por favor, informe um valor válido para o pagamento maior que zero.")
     
     # Determinar o tipo de conta a partir do código de barras
-    tipo_conta = "boleto"
-    if codigo_barras.startswith("765"):
-        tipo_conta = "água"
-    elif codigo_barras.startswith("891"):
-        tipo_conta = "energia"
-    elif codigo_barras.startswith("456"):
-        tipo_conta = "internet"
-    elif codigo_barras.startswith("321"):
-        tipo_conta = "telefone"
+    tipo_conta = _tipo_conta(codigo_barras)
     
     # Realiza o pagamento
-    resultado = pagar_boleto(cliente_id, codigo_barras, valor)
+    with span("servico.pagar_boleto"):
+        resultado = pagar_boleto(cliente_id, codigo_barras, valor)
     
-    state["messages"].append(
-        FunctionMessage(
-            content=json.dumps(resultado),
-            name="pagar_boleto"
-        )
-    )
+    resultados = {"pagar_boleto": resultado}
     
     # Gera resposta final com base no resultado
     if resultado["status"] == "sucesso":
@@ -329,83 +399,51 @@ def processar_pagamento_boleto(state: ChatState) -> ChatState:
     else:
         resposta = f"Desculpe, não foi possível realizar o pagamento: {resultado['mensagem']}"
     
-    state["messages"].append(AIMessage(content=resposta))
-    
-    return state
+    return resposta_parcial(entrada, resposta, resultados)
 
-def processar_pagamento_cartao(state: ChatState) -> ChatState:
-    messages = state["messages"]
+def processar_pagamento_cartao(state: ChatState, entrada: Dict[str, Any] = None) -> Dict[str, Any]:
+    entrada = entrada or intencao_do_turno(state, "pagamento_cartao")
     cliente_id = state["cliente_id"]
     
-    # Extrai parâmetros da classificação de intenção
-    for msg in reversed(messages):
-        if isinstance(msg, FunctionMessage) and msg.name == "classificador_intencao":
-            dados = json.loads(msg.content)
-            parametros = dados["parametros"]
-            break
+    # Parâmetros extraídos pelo classificador de intenção
+    parametros = entrada["parametros"]
     
     estabelecimento = parametros.get("estabelecimento", "")
     valor = float(parametros.get("valor", 0))
-    cartao_id = parametros.get("cartao_id", "1")  # Default para o primeiro cartão
+    cartao_id = parametros.get("cartao_id", cliente_id)  # Default para o cartão do próprio cliente
     
     # Validações adicionais
     if valor <= 0:
-        state["messages"].append(AIMessage(
-            content="Por favor, informe um valor válido para a compra maior que zero."
-        ))
-        return state
-    
-    # Verifica limite do cartão
-    from agent.services import cartoes
-    cartao = cartoes.get(cartao_id, {})
-    limite_disponivel = cartao.get("limite", 0) - cartao.get("fatura_atual", 0)
-    
-    if valor > limite_disponivel:
-        state["messages"].append(AIMessage(
-            content=f"Desculpe, seu limite disponível de R$ {limite_disponivel:.2f} é insuficiente para esta compra de R$ {valor:.2f}."
-        ))
-        return state
+        return resposta_parcial(entrada, "Por favor, informe um valor válido para a compra maior que zero.")
     
-    # Realiza o pagamento
-    resultado = pagar_cartao(cliente_id, estabelecimento, valor, cartao_id)
+    # Realiza o pagamento (o limite é conferido pelo serviço, sob a trava do cartão)
+    with span("servico.pagar_cartao"):
+        resultado = pagar_cartao(cliente_id, estabelecimento, valor, cartao_id)
     
-    state["messages"].append(
-        FunctionMessage(
-            content=json.dumps(resultado),
-            name="pagar_cartao"
-        )
-    )
+    resultados = {"pagar_cartao": resultado}
     
     # Gera resposta final com base no resultado
     if resultado["status"] == "sucesso":
-        # Calcular novo limite disponível
-        novo_limite_disponivel = cartao.get("limite", 0) - resultado["fatura_atual"]
-        
         resposta = (
             f"Compra de R$ {valor:.2f} em {estabelecimento} realizada com sucesso.\n"
             f"Sua fatura atual é de R$ {resultado['fatura_atual']:.2f}.\n"
-            f"Limite disponível: R$ {novo_limite_disponivel:.2f}"
+            f"Limite disponível: R$ {resultado['limite_disponivel']:.2f}"
         )
     else:
         resposta = f"Desculpe, não foi possível realizar o pagamento: {resultado['mensagem']}"
     
-    state["messages"].append(AIMessage(content=resposta))
-    
-    return state
+    return resposta_parcial(entrada, resposta, resultados)
 
-def processar_perfil(state: ChatState) -> ChatState:
+def processar_perfil(state: ChatState, entrada: Dict[str, Any] = None) -> Dict[str, Any]:
     """Processa análise de perfil com recomendações personalizadas."""
+    entrada = entrada or intencao_do_turno(state, "perfil")
     cliente_id = state["cliente_id"]
     
     # Analisa o comportamento do cliente
-    resultado = analisar_comportamento(cliente_id)
+    with span("servico.analisar_comportamento"):
+        resultado = analisar_comportamento(cliente_id)
     
-    state["messages"].append(
-        FunctionMessage(
-            content=json.dumps(resultado),
-            name="analisar_comportamento"
-        )
-    )
+    resultados = {"analisar_comportamento": resultado}
     
     # Gera resposta final com base no resultado
     if resultado["status"] == "sucesso":
@@ -454,24 +492,20 @@ def processar_perfil(state: ChatState) -> ChatState:
     else:
         resposta = resultado["mensagem"]
     
-    state["messages"].append(AIMessage(content=resposta))
-    
-    return state
+    return resposta_parcial(entrada, resposta, resultados)
 
 # Esta é uma versão parcial do arquivo nodes.py focada apenas na correção da função processar_duvida
 # Substitua apenas esta função, mantendo o resto do arquivo como está
 
-def processar_duvida(state: ChatState, vectorstore=None) -> ChatState:
+def processar_duvida(state: ChatState, vectorstore=None, entrada: Dict[str, Any] = None) -> Dict[str, Any]:
     """Processa dúvidas usando RAG aprimorado com a base de FAQs."""
-    from langchain.chains import RetrievalQA
-    from langchain_core.prompts import ChatPromptTemplate
+    entrada = entrada or intencao_do_turno(state, "duvida")
     
     messages = state["messages"]
     cliente_id = state["cliente_id"]
     
     # Obter informações do cliente para personalização
-    from agent.services import clientes
-    cliente_info = clientes.get(cliente_id, {})
+    cliente_info = obter_cliente(cliente_id) or {}
     
     # Extrai a última mensagem do usuário para usar como query
     query = ""
@@ -480,14 +514,11 @@ def processar_duvida(state: ChatState, vectorstore=None) -> ChatState:
             query = msg.content
             break
     
-    # Log detalhado para debugging
-    print(f"QUERY PARA RAG: '{query}'")
-    print(f"VECTORSTORE DISPONÍVEL: {vectorstore is not None}")
+    logger.debug("Query para RAG: %s", query)
     
     try:
         # Verificar se o vectorstore existe
         if vectorstore is None:
-            print("Vectorstore não disponível - não é possível processar a consulta")
             raise ValueError("Vectorstore não disponível")
         
         # Configurar o retriever com mais documentos e filtro de similaridade mais baixo
@@ -519,76 +550,53 @@ def processar_duvida(state: ChatState, vectorstore=None) -> ChatState:
         Resposta:
         """)
         
-        # Usar o modelo Groq para processamento
-        llm = ChatGroq(model="llama3-70b-8192", temperature=0)
-        
-        # Criar chain de QA configurada para forçar o uso dos documentos
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=llm,
-            chain_type="stuff",
-            retriever=retriever,
-            chain_type_kwargs={
-                "prompt": custom_prompt,
-                "verbose": True
-            },
-            return_source_documents=True
-        )
+        # Usar o modelo Groq compartilhado pelo processo
+        llm = obter_llm()
         
-        # Executar a consulta com parâmetros explícitos
-        resultado = qa_chain.invoke({
-            "question": query,
-            "nome": cliente_info.get("nome", "Cliente"),
-            "conta": cliente_info.get("conta", "")
-        })
+        # Recupera os documentos e gera a resposta em etapas separadas para medir cada uma
+        with span("retrieval", k=5) as s:
+            docs = retriever.invoke(query)
+            s.set(documentos=len(docs))
         
-        # Verificar e formatar o resultado
-        if isinstance(resultado, dict) and "result" in resultado:
-            resposta = resultado["result"]
+        if docs:
+            logger.debug("Documentos recuperados: %d", len(docs))
             
-            # Verificar se documentos foram retornados
-            docs = resultado.get("source_documents", [])
-            if docs:
-                # Log dos documentos recuperados
-                print(f"DOCUMENTOS RECUPERADOS: {len(docs)}")
-                for i, doc in enumerate(docs[:3]):
-                    print(f"DOC {i+1}: {doc.page_content[:100]}...")
-                
-                # Adicionar referência mais explícita
-                if not "não encontrei informações" in resposta.lower():
-                    resposta += "\n\nEsta resposta foi baseada em documentos oficiais do banco."
-            else:
-                print("NENHUM DOCUMENTO RELEVANTE ENCONTRADO")
-                resposta = "Não encontrei informações específicas sobre isso nos documentos disponíveis. Recomendo entrar em contato com um de nossos gerentes para obter orientações precisas."
+            with span("llm", no="duvida") as s:
+                mensagem = llm.invoke(custom_prompt.format_messages(
+                    context_str="\n\n".join(doc.page_content for doc in docs),
+                    question=query,
+                    nome=cliente_info.get("nome", "Cliente"),
+                    conta=cliente_info.get("conta", "")
+                ))
+                registrar_tokens(s, mensagem)
+            resposta = mensagem.content
+            
+            # Adicionar referência mais explícita
+            if not "não encontrei informações" in resposta.lower():
+                resposta += "\n\nEsta resposta foi baseada em documentos oficiais do banco."
         else:
-            resposta = "Não consegui encontrar informações relevantes sobre sua pergunta. Por favor, entre em contato com um de nossos atendentes para obter orientações específicas."
+            logger.info("Nenhum documento relevante encontrado")
+            resposta = "Não encontrei informações específicas sobre isso nos documentos disponíveis. Recomendo entrar em contato com um de nossos gerentes para obter orientações precisas."
     
     except Exception as e:
-        import traceback
-        print(f"ERRO AO PROCESSAR DÚVIDA: {e}")
-        print(traceback.format_exc())
+        logger.error("Erro ao processar dúvida: %s", e, exc_info=True)
         resposta = (
             "Desculpe, ocorreu um erro técnico ao processar sua consulta. "
             "Por favor, reformule sua pergunta ou entre em contato com o suporte."
         )
     
-    # Adicionar resposta ao estado
-    state["messages"].append(AIMessage(content=resposta))
-    
-    # Log da resposta final
-    print(f"RESPOSTA FINAL RAG: {resposta[:150]}...")
-    
-    return state
+    return resposta_parcial(entrada, resposta)
 
-def responder_generico(state: ChatState) -> ChatState:
+def responder_generico(state: ChatState) -> Dict[str, Any]:
     """Responde a perguntas gerais que não são tratadas por outras funções, com mais personalização."""
+    entrada = intencao_do_turno(state, "outro")
     messages = state["messages"]
     cliente_id = state["cliente_id"]
     
     # Obter informações do cliente para personalização
-    from agent.services import clientes
-    cliente_info = clientes.get(cliente_id, {})
+    cliente_info = obter_cliente(cliente_id) or {}
     
-    llm = ChatGroq(model="llama3-70b-8192", temperature=0)
+    llm = obter_llm()
     
     # Prompt aprimorado com mais contexto e personalização
     generic_prompt = ChatPromptTemplate.from_messages([
@@ -627,18 +635,9 @@ def responder_generico(state: ChatState) -> ChatState:
             ultima_mensagem = msg.content
             break
     
-    # Analisa o contexto das mensagens recentes para personalização
-    temas_recentes = []
-    for msg in messages[-5:]:
-        if isinstance(msg, HumanMessage) and hasattr(msg, 'content'):
-            content = msg.content.lower()
-            # Identificar temas na conversa
-            if any(word in content for word in ["investir", "investimento", "aplicar", "rendimento"]):
-                temas_recentes.append("investimentos")
-            elif any(word in content for word in ["empréstimo", "crédito", "financiamento", "emprestar"]):
-                temas_recentes.append("empréstimos")
-            elif any(word in content for word in ["cartão", "crédito", "comprar", "compra"]):
-                temas_recentes.append("cartões")
+    # Temas das últimas mensagens, acumulados turno a turno pela sessão
+    contexto = state.get("context") or {}
+    temas_recentes = contexto.get("temas_recentes") or [analise_do_turno(state)["tema"]]
     
     if ultima_mensagem:
         # Filtra as mensagens anteriores para histórico
@@ -650,15 +649,17 @@ def responder_generico(state: ChatState) -> ChatState:
                 history.append(("ai", msg.content))
         
         # Invoca o modelo para gerar uma resposta
-        resposta = generic_prompt.format_messages(
-            history=history,
-            input=ultima_mensagem
-        ) | llm
+        with span("llm", no="outro") as s:
+            resposta = llm.invoke(generic_prompt.format_messages(
+                history=history,
+                input=ultima_mensagem
+            ))
+            registrar_tokens(s, resposta)
         
         conteudo_resposta = resposta.content
         
         # Adicionar sugestões personalizadas com base nos temas detectados
-        if temas_recentes:
+        if any(temas_recentes):
             sugestoes = "\n\nBaseado no nosso diálogo, talvez você queira saber mais sobre:"
             
             if "investimentos" in temas_recentes:
@@ -670,7 +671,111 @@ def responder_generico(state: ChatState) -> ChatState:
                 
             conteudo_resposta += sugestoes
         
-        # Adiciona a resposta ao estado
-        state["messages"].append(AIMessage(content=conteudo_resposta))
+        return resposta_parcial(entrada, conteudo_resposta)
     
-    return state
\ No newline at end of file
+    return {}
+
+# Nós das intenções que alteram saldo ou fatura
+OPERACOES = {
+    "transferencia": processar_transferencia,
+    "pagamento_boleto": processar_pagamento_boleto,
+    "pagamento_cartao": processar_pagamento_cartao
+}
+
+def _resposta_lote(resultado: Dict[str, Any], descricoes: list, acao: str) -> str:
+    """Uma linha por item do lote, com o motivo dos itens não executados."""
+    linhas = []
+    for item, descricao in zip(resultado.get("resultados") or [], descricoes):
+        if item["status"] == "sucesso":
+            linhas.append(f"- {descricao}: ok")
+        else:
+            linhas.append(f"- {descricao}: {item['mensagem']}")
+    if resultado["status"] == "erro":
+        resposta = f"Desculpe, não foi possível realizar {acao}: {resultado['mensagem']}."
+    elif resultado["status"] == "parcial":
+        resposta = f"Lote executado parcialmente: {resultado['mensagem']}."
+    else:
+        resposta = f"Lote executado com sucesso: {resultado['mensagem']}."
+    if linhas:
+        resposta += "\n\n" + "\n".join(linhas)
+    if "novo_saldo" in resultado:
+        resposta += f"\n\nSeu novo saldo é R$ {resultado['novo_saldo']:.2f}."
+    return resposta
+
+def processar_lote_boletos(state: ChatState, entradas: list) -> Dict[str, Any]:
+    """Paga os boletos pedidos na mesma mensagem com uma única chamada ao serviço."""
+    boletos = [
+        {"codigo_barras": e["parametros"].get("codigo_barras", ""), "valor": float(e["parametros"].get("valor", 0))}
+        for e in entradas
+    ]
+    with span("servico.pagar_boletos_em_lote", itens=len(boletos)):
+        resultado = pagar_boletos_em_lote(state["cliente_id"], boletos)
+    
+    descricoes = [f"conta de {_tipo_conta(b['codigo_barras'])} de R$ {b['valor']:.2f}" for b in boletos]
+    resposta = _resposta_lote(resultado, descricoes, "os pagamentos")
+    return resposta_parcial(entradas[0], resposta, {"pagar_boletos_em_lote": resultado})
+
+def processar_lote_transferencias(state: ChatState, entradas: list) -> Dict[str, Any]:
+    """Realiza as transferências pedidas na mesma mensagem com uma única chamada ao serviço."""
+    transferencias = [
+        {"destino_id": e["parametros"].get("destino_id", ""), "valor": float(e["parametros"].get("valor", 0))}
+        for e in entradas
+    ]
+    with span("servico.realizar_transferencias_em_lote", itens=len(transferencias)):
+        resultado = realizar_transferencias_em_lote(state["cliente_id"], transferencias)
+    
+    descricoes = []
+    for t in transferencias:
+        destino = obter_cliente(t["destino_id"]) if t["destino_id"] else None
+        nome = destino["nome"] if destino is not None else "destinatário não identificado"
+        descricoes.append(f"R$ {t['valor']:.2f} para {nome}")
+    resposta = _resposta_lote(resultado, descricoes, "as transferências")
+    return resposta_parcial(entradas[0], resposta, {"realizar_transferencias_em_lote": resultado})
+
+# Lotes das operações pedidas em sequência (ver INTENCOES_LOTE)
+LOTES = {
+    "transferencia": processar_lote_transferencias,
+    "pagamento_boleto": processar_lote_boletos
+}
+
+def executar_operacoes(state: ChatState) -> Dict[str, Any]:
+    """Executa as operações do turno uma de cada vez, na ordem em que foram pedidas.
+
+    Transferências ou pagamentos de boleto seguidos viram um lote: validados
+    juntos e aplicados de uma vez, tudo ou nada. Se a mensagem anunciou uma
+    quantidade ("pague estas 5 contas") diferente da encontrada, nada é executado.
+    """
+    operacoes = [e for e in state["intencoes"] if e["intencao"] in OPERACOES]
+    respostas = []
+    resultados = {}
+    inicio = 0
+    while inicio < len(operacoes):
+        entrada = operacoes[inicio]
+        fim = inicio + 1
+        if entrada["intencao"] in LOTES:
+            while fim < len(operacoes) and operacoes[fim]["intencao"] == entrada["intencao"]:
+                fim += 1
+        grupo = operacoes[inicio:fim]
+        inicio = fim
+        
+        anunciada = entrada["parametros"].get("quantidade_anunciada")
+        if anunciada is not None and anunciada != len(grupo):
+            parcial = resposta_parcial(
+                entrada,
+                f"Você mencionou {anunciada} itens, mas identifiquei {len(grupo)} na mensagem. "
+                "Para evitar um pagamento errado, nada foi executado; por favor, envie os itens novamente com os valores."
+            )
+        elif len(grupo) > 1:
+            parcial = LOTES[entrada["intencao"]](state, grupo)
+        else:
+            parcial = OPERACOES[entrada["intencao"]](state, entrada)
+        respostas.extend(parcial["respostas"])
+        resultados.update(parcial["resultados"])
+    return {"respostas": respostas, "resultados": resultados}
+
+def consolidar_respostas(state: ChatState) -> Dict[str, Any]:
+    """Junta as respostas dos nós do turno, na ordem dos pedidos, em uma única mensagem."""
+    respostas = [texto for _, texto in sorted(state.get("respostas") or [], key=lambda r: r[0])]
+    if not respostas:
+        return {}
+    return {"messages": state["messages"].acrescentar(AIMessage(content="\n\n".join(respostas)))}
\ No newline at end of file
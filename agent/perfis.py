@@ -0,0 +1,143 @@
+import threading
+from typing import Any, Dict, List, Optional
+
+from agent.colunas import BOLETO, CARTAO, CATEGORIAS_BOLETO, categoria_boleto, centavos, pagador, resumo_gastos
+
+TOP_CATEGORIAS = 3
+
+
+class _Ranking:
+    """Quantidade e valor por categoria, com as `limite` maiores em valor sempre ordenadas.
+
+    Como gastos só somam, o valor de uma categoria só cresce: basta comparar a
+    categoria alterada com a última do top. Empates ficam na ordem da primeira
+    ocorrência, como na ordenação estável da análise completa.
+    """
+
+    __slots__ = ("categorias", "top", "limite")
+
+    def __init__(self, limite: int):
+        self.categorias: Dict[str, List[int]] = {}  # nome -> [quantidade, centavos, ordem]
+        self.top: List[str] = []
+        self.limite = limite
+
+    def _chave(self, nome):
+        _, valor, ordem = self.categorias[nome]
+        return -valor, ordem
+
+    def registrar(self, nome: str, valor: int):
+        item = self.categorias.get(nome)
+        if item is None:
+            item = self.categorias[nome] = [0, 0, len(self.categorias)]
+        item[0] += 1
+        item[1] += valor
+
+        if valor < 0:
+            # Estorno: o valor diminuiu e outra categoria pode passar à frente
+            self.top = sorted(self.categorias, key=self._chave)[:self.limite]
+            return
+        if nome not in self.top:
+            if len(self.top) < self.limite:
+                self.top.append(nome)
+            elif self._chave(nome) < self._chave(self.top[-1]):
+                self.top[-1] = nome
+            else:
+                return
+        self.top.sort(key=self._chave)
+
+    def principais(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            nome: {"quantidade": self.categorias[nome][0], "valor": self.categorias[nome][1] / 100}
+            for nome in self.top
+        }
+
+
+class _Perfil:
+    __slots__ = ("total", "quantidade", "boletos", "estabelecimentos", "resumo")
+
+    def __init__(self, limite: int):
+        self.total = 0
+        self.quantidade = 0
+        self.boletos = _Ranking(limite)
+        self.estabelecimentos = _Ranking(limite)
+        self.resumo: Optional[Dict[str, Any]] = None
+
+
+class PerfisGastos:
+    """Agregados de gastos por cliente, atualizados a cada transação registrada.
+
+    Guarda total e quantidade em centavos e o ranking de categorias de boletos
+    e de estabelecimentos. O resumo de cada cliente é remontado na escrita
+    (O(top)), então a consulta do perfil só devolve o último resumo pronto.
+    """
+
+    def __init__(self, top: int = TOP_CATEGORIAS):
+        self.top = top
+        self._perfis: Dict[str, _Perfil] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, transacao: Dict[str, Any]):
+        tipo, dono = pagador(transacao)
+        if tipo < 0 or dono is None:
+            return
+        valor = centavos(transacao.get("valor", 0))
+        with self._lock:
+            perfil = self._perfis.get(dono)
+            if perfil is None:
+                perfil = self._perfis[dono] = _Perfil(self.top)
+            perfil.total += valor
+            perfil.quantidade += 1
+            if tipo == BOLETO:
+                perfil.boletos.registrar(
+                    CATEGORIAS_BOLETO[categoria_boleto(transacao.get("codigo_barras", ""))], valor
+                )
+            elif tipo == CARTAO:
+                perfil.estabelecimentos.registrar(transacao.get("estabelecimento", "Desconhecido"), valor)
+
+            total_gastos = perfil.total / 100
+            perfil.resumo = {
+                "total_gastos": total_gastos,
+                "num_transacoes": perfil.quantidade,
+                "principais_categorias_boletos": perfil.boletos.principais(),
+                "principais_categorias_estabelecimentos": perfil.estabelecimentos.principais(),
+                "valor_medio_transacao": total_gastos / perfil.quantidade
+            }
+
+    def resumo(self, cliente_id: str) -> Optional[Dict[str, Any]]:
+        """Último resumo do cliente (não altere o dicionário); None se não houver transações."""
+        perfil = self._perfis.get(cliente_id)
+        return perfil.resumo if perfil is not None else None
+
+    def clientes(self) -> List[str]:
+        return list(self._perfis)
+
+    def clear(self):
+        with self._lock:
+            self._perfis.clear()
+
+    def __len__(self):
+        return len(self._perfis)
+
+
+def _comparavel(resumo):
+    """Resumo com os rankings como listas, para que a ordem das categorias também seja comparada."""
+    if resumo is None:
+        return None
+    return {chave: list(valor.items()) if isinstance(valor, dict) else valor for chave, valor in resumo.items()}
+
+
+def verificar_perfis(perfis: PerfisGastos, colunas, clientes=None) -> List[Dict[str, Any]]:
+    """Compara os agregados incrementais com a análise completa sobre as colunas.
+
+    Retorna uma entrada por cliente divergente, com os dois resumos; a lista
+    vazia significa que os agregados conferem.
+    """
+    if clientes is None:
+        clientes = set(perfis.clientes()) | set(colunas.clientes())
+    divergencias = []
+    for cliente_id in clientes:
+        incremental = perfis.resumo(cliente_id)
+        completo = resumo_gastos(colunas.do_cliente(cliente_id), colunas.estabelecimentos)
+        if _comparavel(incremental) != _comparavel(completo):
+            divergencias.append({"cliente_id": cliente_id, "incremental": incremental, "completo": completo})
+    return divergencias
@@ -0,0 +1,600 @@
+import copy
+import os
+import queue
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from agent.colunas import BOLETO, CARTAO, CATEGORIAS_BOLETO, categoria_boleto, centavos, pagador
+from agent.ledger import Ledger, clientes_da_transacao, contraparte_da_transacao, epoch_us, mes_de
+from agent.perfis import TOP_CATEGORIAS, verificar_perfis
+
+# Dados simulados - Na implementação real, seriam APIs do banco
+CLIENTES_INICIAIS = {
+    "1": {"nome": "João Silva", "saldo": 5000.00, "conta": "12345-6", "tipo": "Conta Corrente"},
+    "2": {"nome": "Maria Santos", "saldo": 8500.00, "conta": "65432-1", "tipo": "Conta Premium"},
+    "3": {"nome": "Carlos Oliveira", "saldo": 2300.00, "conta": "98765-4", "tipo": "Conta Básica"}
+}
+
+CARTOES_INICIAIS = {
+    "1": {"numero": "**** **** **** 1234", "limite": 10000.00, "fatura_atual": 1200.00},
+    "2": {"numero": "**** **** **** 5678", "limite": 15000.00, "fatura_atual": 3500.00},
+    "3": {"numero": "**** **** **** 9012", "limite": 5000.00, "fatura_atual": 800.00}
+}
+
+
+class Repositorio(ABC):
+    """Interface de acesso aos dados do banco usada por agent.services.
+
+    Uma mudança de estado é um registro {"movimentos": {cliente_id: delta},
+    "faturas": {cartao_id: delta}, "transacao": {...}} aplicado de uma vez por
+    efetivar(); operações em lote trazem "transacoes": [...] no lugar de
+    "transacao", com os movimentos já somados por conta. Os serviços verificam saldo e limite com as contas
+    travadas; efetivar() ainda recusa qualquer movimento que deixaria um saldo
+    negativo ou uma fatura acima do limite.
+
+    Nos dados simulados cada cliente tem um cartão, com o mesmo id do cliente.
+    """
+
+    @abstractmethod
+    def obter_cliente(self, cliente_id: str) -> Optional[Dict[str, Any]]:
+        """{"nome", "saldo", "conta", "tipo"} ou None se o cliente não existir."""
+
+    @abstractmethod
+    def listar_clientes(self) -> List[Tuple[str, Dict[str, Any]]]:
+        ...
+
+    @abstractmethod
+    def obter_cartao(self, cartao_id: str) -> Optional[Dict[str, Any]]:
+        """{"numero", "limite", "fatura_atual"} ou None se o cartão não existir."""
+
+    @abstractmethod
+    def efetivar(self, registro: Dict[str, Any]) -> bool:
+        """Aplica a mudança inteira ou nada; False se algum saldo ficaria negativo ou fatura passaria do limite."""
+
+    @abstractmethod
+    def ultimas_transacoes(self, cliente_id: str, limite: int) -> List[Dict[str, Any]]:
+        """As `limite` transações mais recentes do cliente, da mais nova para a mais antiga."""
+
+    @abstractmethod
+    def extrato(
+        self,
+        cliente_id: str,
+        limite: int,
+        inicio: Optional[int] = None,
+        fim: Optional[int] = None,
+        tipo: Optional[str] = None,
+        contraparte: Optional[str] = None,
+        antes: Optional[Tuple[int, int]] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[Tuple[int, int]]]:
+        """Página do extrato com inicio <= data < fim (µs), da mais nova para a mais antiga.
+
+        `antes` é o cursor (epoch, seq) devolvido pela página anterior; o
+        retorno traz a página e o cursor da próxima (None na última). Os
+        cursores só valem no repositório que os gerou.
+        """
+
+    @abstractmethod
+    def iterar_transacoes(
+        self, cliente_id: str, inicio: Optional[int] = None, fim: Optional[int] = None, lote: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """Todas as transações do cliente com inicio <= data < fim (µs), da mais antiga para a mais nova.
+
+        Lê `lote` transações por vez a partir da última entregue, sem montar o
+        histórico inteiro: serve às exportações (ver agent.exportacao).
+        """
+
+    @abstractmethod
+    def resumo_gastos(self, cliente_id: str) -> Optional[Dict[str, Any]]:
+        """Totais e principais categorias (ver agent.colunas.resumo_gastos); None sem transações."""
+
+    @abstractmethod
+    def resumo_conta(self, cliente_id: str, agora: int) -> Optional[Dict[str, Any]]:
+        """Saldo, fatura e limite disponível do cartão e transações no mês de `agora` (µs).
+
+        Tudo vem de valores mantidos a cada efetivar(), sem percorrer o
+        histórico; None se o cliente não existir. Sem cartão, fatura e limite
+        ficam None.
+        """
+
+    @abstractmethod
+    def importar(self, clientes: Iterable = (), cartoes: Iterable = (), transacoes: Iterable = ()):
+        """Carga em lote de pares (id, dados) de clientes e cartões e de transações já ocorridas."""
+
+    def verificar_consistencia(self) -> List[Dict[str, Any]]:
+        """Divergências entre agregados mantidos e um recálculo completo (vazia se conferem)."""
+        return []
+
+    def fechar(self):
+        pass
+
+
+def _resumo_conta(saldo, fatura, limite, transacoes_no_mes) -> Dict[str, Any]:
+    return {
+        "saldo": saldo,
+        "fatura_atual": fatura,
+        "limite_disponivel": limite - fatura if limite is not None else None,
+        "transacoes_no_mes": transacoes_no_mes
+    }
+
+
+class RepositorioMemoria(Repositorio):
+    """Dados em dicionários e no Ledger do processo; é o padrão e o usado com o diário (agent.wal)."""
+
+    def __init__(self, clientes=None, cartoes=None, transacoes=None):
+        self.clientes = copy.deepcopy(CLIENTES_INICIAIS) if clientes is None else clientes
+        self.cartoes = copy.deepcopy(CARTOES_INICIAIS) if cartoes is None else cartoes
+        self.transacoes = Ledger() if transacoes is None else transacoes
+
+    def obter_cliente(self, cliente_id):
+        return self.clientes.get(cliente_id)
+
+    def listar_clientes(self):
+        return list(self.clientes.items())
+
+    def obter_cartao(self, cartao_id):
+        return self.cartoes.get(cartao_id)
+
+    def efetivar(self, registro):
+        movimentos = registro.get("movimentos", {})
+        for cliente_id, delta in movimentos.items():
+            if delta < 0 and self.clientes[cliente_id]["saldo"] + delta < 0:
+                return False
+        faturas = registro.get("faturas", {})
+        for cartao_id, delta in faturas.items():
+            cartao = self.cartoes[cartao_id]
+            if delta > 0 and cartao["fatura_atual"] + delta > cartao["limite"]:
+                return False
+        for cliente_id, delta in movimentos.items():
+            self.clientes[cliente_id]["saldo"] += delta
+        for cartao_id, delta in faturas.items():
+            self.cartoes[cartao_id]["fatura_atual"] += delta
+        if "transacoes" in registro:
+            self.transacoes.extend(registro["transacoes"])
+        else:
+            self.transacoes.append(registro["transacao"])
+        return True
+
+    def ultimas_transacoes(self, cliente_id, limite):
+        return self.transacoes.ultimas(cliente_id, limite)
+
+    def extrato(self, cliente_id, limite, inicio=None, fim=None, tipo=None, contraparte=None, antes=None):
+        filtro = None
+        if tipo is not None or contraparte is not None:
+            def filtro(transacao):
+                return (
+                    (tipo is None or transacao.get("tipo") == tipo)
+                    and (contraparte is None or contraparte_da_transacao(transacao, cliente_id) == contraparte)
+                )
+        return self.transacoes.pagina(cliente_id, limite, inicio, fim, antes, filtro)
+
+    def iterar_transacoes(self, cliente_id, inicio=None, fim=None, lote=1000):
+        return self.transacoes.iterar(cliente_id, inicio, fim, lote)
+
+    def resumo_gastos(self, cliente_id):
+        return self.transacoes.perfis.resumo(cliente_id)
+
+    def resumo_conta(self, cliente_id, agora):
+        cliente = self.clientes.get(cliente_id)
+        if cliente is None:
+            return None
+        cartao = self.cartoes.get(cliente_id)
+        return _resumo_conta(
+            cliente["saldo"],
+            cartao["fatura_atual"] if cartao is not None else None,
+            cartao["limite"] if cartao is not None else None,
+            self.transacoes.transacoes_no_mes(cliente_id, agora)
+        )
+
+    def importar(self, clientes=(), cartoes=(), transacoes=()):
+        self.clientes.update(clientes)
+        self.cartoes.update(cartoes)
+        self.transacoes.extend(transacoes)
+
+    def verificar_consistencia(self):
+        return verificar_perfis(self.transacoes.perfis, self.transacoes.colunas)
+
+    def capturar(self) -> Dict[str, Any]:
+        return self.preparar_captura()()
+
+    def preparar_captura(self):
+        """Copia saldos e faturas e marca o tamanho do histórico; retorna a função que monta o estado.
+
+        O Ledger só cresce, então as primeiras `total` transações não mudam
+        depois da marca: a conversão do histórico, que é a parte cara, pode
+        rodar mais tarde e sem travar os commits.
+        """
+        clientes = {cliente_id: dict(dados) for cliente_id, dados in self.clientes.items()}
+        cartoes = {cartao_id: dict(dados) for cartao_id, dados in self.cartoes.items()}
+        total = len(self.transacoes)
+
+        def montar() -> Dict[str, Any]:
+            return {"clientes": clientes, "cartoes": cartoes, "transacoes": self.transacoes[:total]}
+        return montar
+
+    def restaurar(self, estado: Dict[str, Any]):
+        self.clientes.clear()
+        self.clientes.update(estado["clientes"])
+        self.cartoes.clear()
+        self.cartoes.update(estado["cartoes"])
+        self.transacoes.clear()
+        self.transacoes.extend(estado["transacoes"])
+
+
+# Campos opcionais da transação, na ordem em que aparecem nos dicionários dos serviços
+_CAMPOS_TRANSACAO = ("origem", "destino", "cliente_id", "cartao_id", "estabelecimento", "codigo_barras")
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS clientes (
+    id TEXT PRIMARY KEY,
+    nome TEXT NOT NULL,
+    conta TEXT NOT NULL,
+    tipo TEXT,
+    saldo INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cartoes (
+    id TEXT PRIMARY KEY,
+    numero TEXT NOT NULL,
+    limite INTEGER NOT NULL,
+    fatura INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transacoes (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    data TEXT NOT NULL,
+    epoch INTEGER NOT NULL,
+    tipo TEXT NOT NULL,
+    origem TEXT,
+    destino TEXT,
+    cliente_id TEXT,
+    cartao_id TEXT,
+    estabelecimento TEXT,
+    codigo_barras TEXT,
+    valor INTEGER NOT NULL,
+    pagador TEXT,
+    categoria TEXT
+);
+-- Análise de gastos: cobre o agrupamento por categoria das transações pagas pelo cliente
+CREATE INDEX IF NOT EXISTS idx_transacoes_pagador ON transacoes (pagador, tipo, categoria, valor);
+-- Extrato: uma linha por cliente envolvido, em ordem de (cliente, data)
+CREATE TABLE IF NOT EXISTS extrato (
+    cliente_id TEXT NOT NULL,
+    epoch INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (cliente_id, epoch, seq)
+) WITHOUT ROWID;
+-- Resumo da conta: transações do cliente no mês [inicio_mes, fim_mes) da mais recente
+CREATE TABLE IF NOT EXISTS resumos (
+    cliente_id TEXT PRIMARY KEY,
+    inicio_mes INTEGER NOT NULL,
+    fim_mes INTEGER NOT NULL,
+    transacoes_mes INTEGER NOT NULL
+);
+"""
+
+# Comandos fixos: o sqlite3 mantém cada um preparado no cache de statements da conexão
+_SQL_CLIENTE = "SELECT nome, saldo, conta, tipo FROM clientes WHERE id = ?"
+_SQL_CLIENTES = "SELECT id, nome, saldo, conta, tipo FROM clientes ORDER BY rowid"
+_SQL_CARTAO = "SELECT numero, limite, fatura FROM cartoes WHERE id = ?"
+_SQL_INSERIR_CLIENTE = "INSERT OR REPLACE INTO clientes (id, nome, conta, tipo, saldo) VALUES (?, ?, ?, ?, ?)"
+_SQL_INSERIR_CARTAO = "INSERT OR REPLACE INTO cartoes (id, numero, limite, fatura) VALUES (?, ?, ?, ?)"
+_SQL_MOVIMENTAR = "UPDATE clientes SET saldo = saldo + ? WHERE id = ? AND saldo + ? >= 0"
+_SQL_FATURAR = "UPDATE cartoes SET fatura = fatura + ? WHERE id = ? AND (? <= 0 OR fatura + ? <= limite)"
+_SQL_INSERIR_TRANSACAO = (
+    "INSERT INTO transacoes (id, data, epoch, tipo, origem, destino, cliente_id, cartao_id, estabelecimento, "
+    "codigo_barras, valor, pagador, categoria) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_SQL_INSERIR_EXTRATO = "INSERT INTO extrato (cliente_id, epoch, seq) VALUES (?, ?, ?)"
+# Conta a transação no mês dela; um mês mais novo reinicia a contagem e um mais antigo não a altera
+_SQL_CONTAR_NO_MES = (
+    "INSERT INTO resumos (cliente_id, inicio_mes, fim_mes, transacoes_mes) VALUES (?, ?, ?, 1) "
+    "ON CONFLICT (cliente_id) DO UPDATE SET "
+    "transacoes_mes = CASE WHEN excluded.inicio_mes = resumos.inicio_mes THEN resumos.transacoes_mes + 1 ELSE 1 END, "
+    "inicio_mes = excluded.inicio_mes, fim_mes = excluded.fim_mes "
+    "WHERE excluded.inicio_mes >= resumos.inicio_mes"
+)
+_SQL_RESUMO_CONTA = (
+    "SELECT c.saldo, k.fatura, k.limite, r.inicio_mes, r.fim_mes, r.transacoes_mes FROM clientes c "
+    "LEFT JOIN cartoes k ON k.id = c.id LEFT JOIN resumos r ON r.cliente_id = c.id WHERE c.id = ?"
+)
+_SQL_ULTIMAS = (
+    "SELECT t.id, t.data, t.tipo, t.origem, t.destino, t.cliente_id, t.cartao_id, t.estabelecimento, "
+    "t.codigo_barras, t.valor FROM extrato e JOIN transacoes t ON t.seq = e.seq "
+    "WHERE e.cliente_id = ? ORDER BY e.epoch DESC, e.seq DESC LIMIT ?"
+)
+# Página do extrato: intervalo da chave primária (cliente, epoch, seq) abaixo do cursor, da mais nova
+# para a mais antiga; os filtros de tipo e contraparte só descartam linhas já lidas em ordem
+_SQL_PAGINA_EXTRATO = (
+    "SELECT t.id, t.data, t.tipo, t.origem, t.destino, t.cliente_id, t.cartao_id, t.estabelecimento, "
+    "t.codigo_barras, t.valor, e.epoch, e.seq FROM extrato e JOIN transacoes t ON t.seq = e.seq "
+    "WHERE e.cliente_id = :cliente AND e.epoch >= :inicio AND (e.epoch, e.seq) < (:epoch, :seq) "
+    "AND (:tipo IS NULL OR t.tipo = :tipo) "
+    "AND (:contraparte IS NULL OR CASE "
+    "WHEN t.origem = e.cliente_id AND t.destino IS NOT NULL THEN t.destino "
+    "WHEN t.destino = e.cliente_id THEN t.origem ELSE t.estabelecimento END = :contraparte) "
+    "ORDER BY e.epoch DESC, e.seq DESC LIMIT :limite"
+)
+# Exportação: um lote do extrato em ordem de data, a partir da chave da última linha entregue
+_SQL_LOTE_EXPORTACAO = (
+    "SELECT t.id, t.data, t.tipo, t.origem, t.destino, t.cliente_id, t.cartao_id, t.estabelecimento, "
+    "t.codigo_barras, t.valor, e.epoch, e.seq FROM extrato e JOIN transacoes t ON t.seq = e.seq "
+    "WHERE e.cliente_id = ? AND (e.epoch, e.seq) > (?, ?) AND e.epoch < ? "
+    "ORDER BY e.epoch, e.seq LIMIT ?"
+)
+_MENOR_INTEIRO = -2 ** 63
+_MAIOR_INTEIRO = 2 ** 63 - 1
+_SQL_CATEGORIAS = (
+    "SELECT tipo, categoria, COUNT(*), SUM(valor), MIN(seq) FROM transacoes "
+    "WHERE pagador = ? GROUP BY tipo, categoria"
+)
+
+
+def _transacao_de_linha(linha) -> Dict[str, Any]:
+    transacao = {"id": linha[0], "data": linha[1], "tipo": linha[2]}
+    for campo, valor in zip(_CAMPOS_TRANSACAO, linha[3:9]):
+        if valor is not None:
+            transacao[campo] = valor
+    transacao["valor"] = linha[9] / 100
+    return transacao
+
+
+def _linha_de_transacao(transacao: Dict[str, Any]) -> Tuple[Tuple, int]:
+    tipo, dono = pagador(transacao)
+    if tipo == BOLETO:
+        categoria = CATEGORIAS_BOLETO[categoria_boleto(transacao.get("codigo_barras", ""))]
+    elif tipo == CARTAO:
+        categoria = transacao.get("estabelecimento", "Desconhecido")
+    else:
+        categoria = None
+    epoch = epoch_us(transacao["data"])
+    linha = (
+        str(transacao["id"]), transacao["data"], epoch, transacao["tipo"],
+        *(transacao.get(campo) for campo in _CAMPOS_TRANSACAO),
+        centavos(transacao.get("valor", 0)), dono if tipo >= 0 else None, categoria
+    )
+    return linha, epoch
+
+
+class RepositorioSQLite(Repositorio):
+    """Dados em SQLite (modo WAL), compartilhados por todos os processos que abrem o mesmo arquivo.
+
+    Valores ficam em centavos. Um pool de `tamanho_pool` conexões atende os
+    threads; cada conexão mantém os comandos preparados. O extrato lê o índice
+    (cliente, data) e a análise de gastos agrupa pelo índice de pagador, então
+    nenhuma consulta percorre o banco inteiro. Movimentos de saldo e de fatura
+    são incrementos condicionados (saldo não negativo, fatura até o limite)
+    dentro de BEGIN IMMEDIATE, seguros mesmo com vários processos gravando.
+
+    Use um arquivo: cada conexão a ":memory:" seria um banco separado.
+    """
+
+    def __init__(self, caminho: str = "banco.db", tamanho_pool: int = 4, semear: bool = True):
+        self.caminho = caminho
+        self._livres: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._todas: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        for _ in range(tamanho_pool):
+            conexao = self._conectar()
+            self._todas.append(conexao)
+            self._livres.put(conexao)
+        with self._conexao() as conexao:
+            conexao.executescript(_ESQUEMA)
+            if (
+                conexao.execute("SELECT 1 FROM resumos LIMIT 1").fetchone() is None
+                and conexao.execute("SELECT 1 FROM extrato LIMIT 1").fetchone() is not None
+            ):
+                self._preencher_resumos(conexao)
+            if semear and conexao.execute("SELECT 1 FROM clientes LIMIT 1").fetchone() is None:
+                self._importar(conexao, CLIENTES_INICIAIS.items(), CARTOES_INICIAIS.items(), ())
+
+    def _conectar(self) -> sqlite3.Connection:
+        conexao = sqlite3.connect(
+            self.caminho, timeout=30, check_same_thread=False, isolation_level=None, cached_statements=64
+        )
+        conexao.execute("PRAGMA journal_mode=WAL")
+        conexao.execute("PRAGMA synchronous=NORMAL")
+        return conexao
+
+    @contextmanager
+    def _conexao(self):
+        conexao = self._livres.get()
+        try:
+            yield conexao
+        finally:
+            self._livres.put(conexao)
+
+    def obter_cliente(self, cliente_id):
+        with self._conexao() as conexao:
+            linha = conexao.execute(_SQL_CLIENTE, (cliente_id,)).fetchone()
+        if linha is None:
+            return None
+        return {"nome": linha[0], "saldo": linha[1] / 100, "conta": linha[2], "tipo": linha[3]}
+
+    def listar_clientes(self):
+        with self._conexao() as conexao:
+            linhas = conexao.execute(_SQL_CLIENTES).fetchall()
+        return [
+            (cliente_id, {"nome": nome, "saldo": saldo / 100, "conta": conta, "tipo": tipo})
+            for cliente_id, nome, saldo, conta, tipo in linhas
+        ]
+
+    def obter_cartao(self, cartao_id):
+        with self._conexao() as conexao:
+            linha = conexao.execute(_SQL_CARTAO, (cartao_id,)).fetchone()
+        if linha is None:
+            return None
+        return {"numero": linha[0], "limite": linha[1] / 100, "fatura_atual": linha[2] / 100}
+
+    def _inserir_transacao(self, conexao, transacao):
+        linha, epoch = _linha_de_transacao(transacao)
+        seq = conexao.execute(_SQL_INSERIR_TRANSACAO, linha).lastrowid
+        clientes = clientes_da_transacao(transacao)
+        conexao.executemany(_SQL_INSERIR_EXTRATO, [(cliente_id, epoch, seq) for cliente_id in clientes])
+        inicio_mes, fim_mes = mes_de(epoch)
+        conexao.executemany(_SQL_CONTAR_NO_MES, [(cliente_id, inicio_mes, fim_mes) for cliente_id in clientes])
+
+    def efetivar(self, registro):
+        with self._conexao() as conexao:
+            conexao.execute("BEGIN IMMEDIATE")
+            try:
+                for cliente_id, delta in registro.get("movimentos", {}).items():
+                    delta = centavos(delta)
+                    if conexao.execute(_SQL_MOVIMENTAR, (delta, cliente_id, delta)).rowcount != 1:
+                        conexao.execute("ROLLBACK")
+                        return False
+                for cartao_id, delta in registro.get("faturas", {}).items():
+                    delta = centavos(delta)
+                    if conexao.execute(_SQL_FATURAR, (delta, cartao_id, delta, delta)).rowcount != 1:
+                        conexao.execute("ROLLBACK")
+                        return False
+                for transacao in registro.get("transacoes") or [registro["transacao"]]:
+                    self._inserir_transacao(conexao, transacao)
+                conexao.execute("COMMIT")
+            except BaseException:
+                if conexao.in_transaction:
+                    conexao.execute("ROLLBACK")
+                raise
+        return True
+
+    def ultimas_transacoes(self, cliente_id, limite):
+        if limite <= 0:
+            return []
+        with self._conexao() as conexao:
+            linhas = conexao.execute(_SQL_ULTIMAS, (cliente_id, limite)).fetchall()
+        return [_transacao_de_linha(linha) for linha in linhas]
+
+    def extrato(self, cliente_id, limite, inicio=None, fim=None, tipo=None, contraparte=None, antes=None):
+        # fim vira parte do limite superior da chave: data < fim equivale a (epoch, seq) < (fim, -inf)
+        limite_superior = (fim, _MENOR_INTEIRO) if fim is not None else (_MAIOR_INTEIRO, _MAIOR_INTEIRO)
+        if antes is not None:
+            limite_superior = min(limite_superior, tuple(antes))
+        parametros = {
+            "cliente": cliente_id,
+            "inicio": inicio if inicio is not None else _MENOR_INTEIRO,
+            "epoch": limite_superior[0],
+            "seq": limite_superior[1],
+            "tipo": tipo,
+            "contraparte": contraparte,
+            "limite": limite + 1
+        }
+        with self._conexao() as conexao:
+            linhas = conexao.execute(_SQL_PAGINA_EXTRATO, parametros).fetchall()
+        if len(linhas) <= limite:
+            return [_transacao_de_linha(linha) for linha in linhas], None
+        ultima = linhas[limite - 1]
+        return [_transacao_de_linha(linha) for linha in linhas[:limite]], (ultima[10], ultima[11])
+
+    def iterar_transacoes(self, cliente_id, inicio=None, fim=None, lote=1000):
+        # Cada lote usa uma conexão do pool só durante a consulta: um download lento não prende o pool
+        epoch, seq = (inicio, _MENOR_INTEIRO) if inicio is not None else (_MENOR_INTEIRO, _MENOR_INTEIRO)
+        fim = fim if fim is not None else _MAIOR_INTEIRO
+        while True:
+            with self._conexao() as conexao:
+                linhas = conexao.execute(_SQL_LOTE_EXPORTACAO, (cliente_id, epoch, seq, fim, lote)).fetchall()
+            for linha in linhas:
+                yield _transacao_de_linha(linha)
+            if len(linhas) < lote:
+                return
+            epoch, seq = linhas[-1][10], linhas[-1][11]
+
+    def resumo_conta(self, cliente_id, agora):
+        with self._conexao() as conexao:
+            linha = conexao.execute(_SQL_RESUMO_CONTA, (cliente_id,)).fetchone()
+        if linha is None:
+            return None
+        saldo, fatura, limite, inicio_mes, fim_mes, transacoes_mes = linha
+        no_mes = transacoes_mes if inicio_mes is not None and inicio_mes <= agora < fim_mes else 0
+        return _resumo_conta(
+            saldo / 100, fatura / 100 if fatura is not None else None, limite / 100 if limite is not None else None, no_mes
+        )
+
+    def _preencher_resumos(self, conexao):
+        """Conta as transações do mês de cada cliente em um banco criado antes da tabela de resumos."""
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            if conexao.execute("SELECT 1 FROM resumos LIMIT 1").fetchone() is None:
+                ultimas = conexao.execute("SELECT cliente_id, MAX(epoch) FROM extrato GROUP BY cliente_id").fetchall()
+                for cliente_id, ultima in ultimas:
+                    inicio_mes, fim_mes = mes_de(ultima)
+                    quantidade = conexao.execute(
+                        "SELECT COUNT(*) FROM extrato WHERE cliente_id = ? AND epoch >= ? AND epoch < ?",
+                        (cliente_id, inicio_mes, fim_mes)
+                    ).fetchone()[0]
+                    conexao.execute(
+                        "INSERT INTO resumos (cliente_id, inicio_mes, fim_mes, transacoes_mes) VALUES (?, ?, ?, ?)",
+                        (cliente_id, inicio_mes, fim_mes, quantidade)
+                    )
+            conexao.execute("COMMIT")
+        except BaseException:
+            if conexao.in_transaction:
+                conexao.execute("ROLLBACK")
+            raise
+
+    def resumo_gastos(self, cliente_id):
+        with self._conexao() as conexao:
+            grupos = conexao.execute(_SQL_CATEGORIAS, (cliente_id,)).fetchall()
+        if not grupos:
+            return None
+        quantidade = sum(grupo[2] for grupo in grupos)
+        total_gastos = sum(grupo[3] for grupo in grupos) / 100
+
+        def principais(tipo):
+            categorias = sorted(
+                (grupo for grupo in grupos if grupo[0] == tipo and grupo[1] is not None),
+                key=lambda grupo: (-grupo[3], grupo[4])
+            )
+            return {
+                categoria: {"quantidade": contagem, "valor": soma / 100}
+                for _, categoria, contagem, soma, _ in categorias[:TOP_CATEGORIAS]
+            }
+
+        return {
+            "total_gastos": total_gastos,
+            "num_transacoes": quantidade,
+            "principais_categorias_boletos": principais("pagamento_boleto"),
+            "principais_categorias_estabelecimentos": principais("pagamento_cartao"),
+            "valor_medio_transacao": total_gastos / quantidade
+        }
+
+    def _importar(self, conexao, clientes, cartoes, transacoes):
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            conexao.executemany(_SQL_INSERIR_CLIENTE, (
+                (cliente_id, dados["nome"], dados["conta"], dados.get("tipo"), centavos(dados.get("saldo", 0)))
+                for cliente_id, dados in clientes
+            ))
+            conexao.executemany(_SQL_INSERIR_CARTAO, (
+                (cartao_id, dados["numero"], centavos(dados["limite"]), centavos(dados.get("fatura_atual", 0)))
+                for cartao_id, dados in cartoes
+            ))
+            for transacao in transacoes:
+                self._inserir_transacao(conexao, transacao)
+            conexao.execute("COMMIT")
+        except BaseException:
+            if conexao.in_transaction:
+                conexao.execute("ROLLBACK")
+            raise
+
+    def importar(self, clientes=(), cartoes=(), transacoes=()):
+        with self._conexao() as conexao:
+            self._importar(conexao, clientes, cartoes, transacoes)
+
+    def fechar(self):
+        with self._lock:
+            for conexao in self._todas:
+                conexao.close()
+            self._todas.clear()
+
+
+def criar_repositorio(tipo: Optional[str] = None, caminho: Optional[str] = None) -> Repositorio:
+    """Repositório escolhido por AGENT_REPOSITORIO ("memoria" ou "sqlite", arquivo em AGENT_DB)."""
+    tipo = tipo or os.getenv("AGENT_REPOSITORIO", "memoria")
+    if tipo == "sqlite":
+        return RepositorioSQLite(
+            caminho or os.getenv("AGENT_DB", "banco.db"), tamanho_pool=int(os.getenv("AGENT_DB_POOL", "4"))
+        )
+    if tipo == "memoria":
+        return RepositorioMemoria()
+    raise ValueError(f"Repositório desconhecido: {tipo}")
@@ -1,217 +1,526 @@
+import atexit
+import logging
+import math
+import os
 import uuid
 from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
-# Dados simulados - Na implementação real, seriam APIs do banco
-clientes = {
-    "1": {"nome": "João Silva", "saldo": 5000.00, "conta": "12345-6"},
-    "2": {"nome": "Maria Santos", "saldo": 8500.00, "conta": "65432-1"},
-    "3": {"nome": "Carlos Oliveira", "saldo": 2300.00, "conta": "98765-4"}
-}
+from agent.exportacao import FORMATOS, TIPO_GZIP, exportar
+from agent.ledger import epoch_us
+from agent.repositorio import Repositorio, RepositorioMemoria, criar_repositorio
+from agent.travas import TravasContas
+from agent.wal import DiarioTransacoes
 
-transacoes = []
+logger = logging.getLogger(__name__)
 
-cartoes = {
-    "1": {"numero": "**** **** **** 1234", "limite": 10000.00, "fatura_atual": 1200.00},
-    "2": {"numero": "**** **** **** 5678", "limite": 15000.00, "fatura_atual": 3500.00},
-    "3": {"numero": "**** **** **** 9012", "limite": 5000.00, "fatura_atual": 800.00}
-}
+# Fonte dos dados de clientes, cartões e transações; criada no primeiro uso (ver obter_repositorio)
+repositorio: Optional[Repositorio] = None
+
+# Locks por conta: saldos e faturas só são verificados e alterados com a conta travada
+travas = TravasContas()
+
+# Write-ahead log das mudanças de estado; None mantém tudo só em memória (ver ativar_diario)
+diario: Optional[DiarioTransacoes] = None
+
+# Itens aceitos em uma chamada de pagamento ou transferência em lote
+MAX_ITENS_LOTE = 1000
+
+# Menor valor aceito por item de lote (um centavo)
+VALOR_MINIMO = 0.01
+
+# Transações por página do extrato paginado
+MAX_PAGINA_EXTRATO = 100
+
+
+def obter_repositorio() -> Repositorio:
+    """Repositório do processo, escolhido por AGENT_REPOSITORIO na primeira chamada."""
+    global repositorio
+    if repositorio is None:
+        repositorio = criar_repositorio()
+    return repositorio
+
+
+def obter_cliente(cliente_id: str) -> Optional[Dict[str, Any]]:
+    """Dados cadastrais e saldo do cliente, ou None (não altere o dicionário retornado)."""
+    return obter_repositorio().obter_cliente(cliente_id)
+
+
+def listar_clientes() -> List[Tuple[str, Dict[str, Any]]]:
+    return obter_repositorio().listar_clientes()
+
+
+def obter_cartao(cartao_id: str) -> Optional[Dict[str, Any]]:
+    return obter_repositorio().obter_cartao(cartao_id)
+
+
+def _aplicar(registro: dict) -> bool:
+    return obter_repositorio().efetivar(registro)
+
+
+def _capturar() -> dict:
+    return obter_repositorio().capturar()
+
+
+def _preparar_captura():
+    return obter_repositorio().preparar_captura()
+
+
+def _restaurar(estado: dict):
+    obter_repositorio().restaurar(estado)
+
+
+def _efetivar(registro: dict) -> Optional[int]:
+    """Aplica a mudança (passando pelo diário, se ativo); chamar com as contas travadas.
+
+    Retorna a sequência a aguardar no diário (0 sem diário) ou None se o
+    repositório recusou a mudança por saldo insuficiente.
+    """
+    if diario is None:
+        return 0 if _aplicar(registro) else None
+    return diario.efetivar(registro) or None
+
+
+def _aguardar_gravacao(seq: int):
+    """Espera o fsync do registro; chamar depois de liberar as contas, para o lote crescer."""
+    if diario is not None and seq:
+        diario.aguardar(seq)
+
+
+def ativar_diario(diretorio: Optional[str] = None, janela: Optional[float] = None, snapshot_a_cada: Optional[int] = None):
+    """Recupera o estado do diário em `diretorio` (ou AGENT_WAL_DIR) e passa a gravar nele.
+
+    Sem diretório configurado o banco continua só em memória. O diário só se
+    aplica ao repositório em memória; o SQLite já grava cada operação. Idempotente.
+    """
+    global diario
+    diretorio = diretorio or os.getenv("AGENT_WAL_DIR")
+    if diario is not None or not diretorio:
+        return diario
+    if not isinstance(obter_repositorio(), RepositorioMemoria):
+        logger.info("Diário de transações ignorado: o repositório %s já é durável", type(repositorio).__name__)
+        return None
+    diario = DiarioTransacoes(
+        diretorio,
+        _aplicar,
+        _preparar_captura,
+        _restaurar,
+        janela=janela if janela is not None else float(os.getenv("AGENT_WAL_JANELA_MS", "1")) / 1000,
+        snapshot_a_cada=snapshot_a_cada or int(os.getenv("AGENT_WAL_SNAPSHOT", "50000"))
+    ).iniciar()
+    atexit.register(desativar_diario)
+    return diario
+
+
+def desativar_diario():
+    """Grava o que estiver pendente e volta a operar só em memória."""
+    global diario
+    if diario is not None:
+        diario.fechar()
+        diario = None
 
 def consultar_saldo(cliente_id: str) -> dict:
     """Consulta o saldo da conta do cliente."""
-    if cliente_id in clientes:
+    cliente = obter_cliente(cliente_id)
+    if cliente is not None:
         return {
             "status": "sucesso",
-            "saldo": clientes[cliente_id]["saldo"],
-            "conta": clientes[cliente_id]["conta"],
-            "nome": clientes[cliente_id]["nome"]
+            "saldo": cliente["saldo"],
+            "conta": cliente["conta"],
+            "nome": cliente["nome"]
         }
     return {"status": "erro", "mensagem": "Cliente não encontrado"}
 
+def resumo_conta(cliente_id: str) -> dict:
+    """Resumo financeiro da ficha do cliente: saldo, fatura e limite disponível do cartão e transações no mês.
+
+    Lê valores mantidos a cada lançamento, sem percorrer o histórico: pode ser
+    chamado a cada renderização da interface.
+    """
+    resumo = obter_repositorio().resumo_conta(cliente_id, epoch_us(datetime.now()))
+    if resumo is None:
+        return {"status": "erro", "mensagem": "Cliente não encontrado"}
+    return {"status": "sucesso", **resumo}
+
 def realizar_transferencia(cliente_id: str, destino_id: str, valor: float) -> dict:
     """Realiza transferência entre contas."""
-    if cliente_id not in clientes or destino_id not in clientes:
+    if obter_cliente(cliente_id) is None or obter_cliente(destino_id) is None:
         return {"status": "erro", "mensagem": "Cliente de origem ou destino não encontrado"}
-    
-    if clientes[cliente_id]["saldo"] < valor:
-        return {"status": "erro", "mensagem": "Saldo insuficiente"}
-    
-    # Realiza a transferência
-    clientes[cliente_id]["saldo"] -= valor
-    clientes[destino_id]["saldo"] += valor
-    
-    # Registra a transação
-    transacao = {
-        "id": str(uuid.uuid4()),
-        "data": datetime.now().isoformat(),
-        "tipo": "transferência",
-        "origem": cliente_id,
-        "destino": destino_id,
-        "valor": valor
-    }
-    transacoes.append(transacao)
-    
+
+    transacao_id = str(uuid.uuid4())
+
+    # Verificação, débito, crédito e registro acontecem com as duas contas travadas
+    with travas.travar(("cliente", cliente_id), ("cliente", destino_id)):
+        if obter_cliente(cliente_id)["saldo"] < valor:
+            return {"status": "erro", "mensagem": "Saldo insuficiente"}
+
+        # Realiza a transferência e registra a transação
+        movimentos = {cliente_id: -valor}
+        movimentos[destino_id] = movimentos.get(destino_id, 0) + valor
+        seq = _efetivar({
+            "movimentos": movimentos,
+            "transacao": {
+                "id": transacao_id,
+                "data": datetime.now().isoformat(),
+                "tipo": "transferência",
+                "origem": cliente_id,
+                "destino": destino_id,
+                "valor": valor
+            }
+        })
+        if seq is None:
+            return {"status": "erro", "mensagem": "Saldo insuficiente"}
+        novo_saldo = obter_cliente(cliente_id)["saldo"]
+    _aguardar_gravacao(seq)
+
     return {
         "status": "sucesso",
         "mensagem": f"Transferência de R$ {valor:.2f} realizada com sucesso",
-        "novo_saldo": clientes[cliente_id]["saldo"],
-        "transacao_id": transacao["id"]
+        "novo_saldo": novo_saldo,
+        "transacao_id": transacao_id
     }
 
+def _executar_lote(cliente_id: str, itens: List[dict], destinos: List[Optional[str]], erros: List[Optional[str]],
+                   montar, atomico: bool) -> dict:
+    """Debita `itens` da conta do cliente em uma única mudança de estado.
+
+    `erros` traz o resultado da validação prévia de cada item e `destinos` a
+    conta creditada (None para pagamentos). As contas envolvidas são travadas
+    uma vez; os movimentos são somados por conta e todas as transações vão
+    para o repositório (e para o diário) em um só registro. Com `atomico`, um
+    item inválido ou sem saldo recusa o lote inteiro; sem ele, só o item é
+    recusado e os demais seguem.
+    """
+    resultados = [
+        {"indice": indice, "status": "erro", "mensagem": erro} if erro else None
+        for indice, erro in enumerate(erros)
+    ]
+    if atomico and any(resultados):
+        return _resultado_lote(
+            "erro", "Lote recusado: há itens inválidos",
+            [r or {"indice": i, "status": "erro", "mensagem": "Não executado: lote recusado"} for i, r in enumerate(resultados)]
+        )
+
+    lote_id = str(uuid.uuid4())
+    data = datetime.now().isoformat()
+    contas = {("cliente", cliente_id)} | {("cliente", destino) for destino in destinos if destino is not None}
+
+    with travas.travar(*contas):
+        disponivel = obter_cliente(cliente_id)["saldo"]
+        movimentos: Dict[str, float] = {}
+        transacoes = []
+        for indice, (item, destino) in enumerate(zip(itens, destinos)):
+            if resultados[indice] is not None:
+                continue
+            valor = item["valor"]
+            if disponivel < valor:
+                if atomico:
+                    return _resultado_lote(
+                        "erro", "Saldo insuficiente para o lote",
+                        [{"indice": i, "status": "erro", "mensagem": "Saldo insuficiente" if i == indice else "Não executado: lote recusado"}
+                         for i in range(len(itens))]
+                    )
+                resultados[indice] = {"indice": indice, "status": "erro", "mensagem": "Saldo insuficiente"}
+                continue
+            disponivel -= valor
+            movimentos[cliente_id] = movimentos.get(cliente_id, 0) - valor
+            if destino is not None:
+                movimentos[destino] = movimentos.get(destino, 0) + valor
+                if destino == cliente_id:
+                    disponivel += valor
+            transacao = montar(item, f"{lote_id}-{indice}", data)
+            transacoes.append(transacao)
+            resultados[indice] = {
+                "indice": indice, "status": "sucesso", "mensagem": f"R$ {valor:.2f}", "transacao_id": transacao["id"]
+            }
+
+        seq = 0
+        if transacoes:
+            seq = _efetivar({"movimentos": movimentos, "transacoes": transacoes})
+            if seq is None:
+                return _resultado_lote(
+                    "erro", "Saldo insuficiente para o lote",
+                    [{"indice": i, "status": "erro", "mensagem": "Não executado: lote recusado"} for i in range(len(itens))]
+                )
+        novo_saldo = obter_cliente(cliente_id)["saldo"]
+    _aguardar_gravacao(seq)
+
+    total = sum(item["valor"] for item, r in zip(itens, resultados) if r["status"] == "sucesso")
+    executados = len(transacoes)
+    if executados == len(itens):
+        status, mensagem = "sucesso", f"{executados} itens executados, total de R$ {total:.2f}"
+    elif executados:
+        status, mensagem = "parcial", f"{executados} de {len(itens)} itens executados, total de R$ {total:.2f}"
+    else:
+        status, mensagem = "erro", "Nenhum item do lote foi executado"
+    return {**_resultado_lote(status, mensagem, resultados), "total": total, "novo_saldo": novo_saldo, "lote_id": lote_id}
+
+
+def _resultado_lote(status: str, mensagem: str, resultados: List[dict]) -> dict:
+    return {"status": status, "mensagem": mensagem, "resultados": resultados}
+
+
+def _validar_lote(cliente_id: str, itens: List[dict]) -> Optional[str]:
+    if obter_cliente(cliente_id) is None:
+        return "Cliente não encontrado"
+    if not itens:
+        return "Lote vazio"
+    if len(itens) > MAX_ITENS_LOTE:
+        return f"Lote com {len(itens)} itens excede o máximo de {MAX_ITENS_LOTE}"
+    return None
+
+
+def _erro_valor(item: dict) -> Optional[str]:
+    valor = item.get("valor")
+    # bool é subclasse de int; nan e inf passariam pelas comparações
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)) or not math.isfinite(valor):
+        return "Valor inválido"
+    if valor < VALOR_MINIMO:
+        return f"Valor abaixo do mínimo de R$ {VALOR_MINIMO:.2f}"
+    return None
+
+
+def pagar_boletos_em_lote(cliente_id: str, boletos: List[dict], atomico: bool = True) -> dict:
+    """Paga vários boletos ({"codigo_barras", "valor"}) com um único débito e um único registro."""
+    erro = _validar_lote(cliente_id, boletos)
+    if erro:
+        return {"status": "erro", "mensagem": erro}
+
+    erros = [_erro_valor(boleto) or (None if boleto.get("codigo_barras") else "Código de barras ausente") for boleto in boletos]
+
+    def montar(boleto, transacao_id, data):
+        return {
+            "id": transacao_id,
+            "data": data,
+            "tipo": "pagamento_boleto",
+            "origem": cliente_id,
+            "codigo_barras": boleto["codigo_barras"],
+            "valor": boleto["valor"]
+        }
+
+    return _executar_lote(cliente_id, boletos, [None] * len(boletos), erros, montar, atomico)
+
+
+def realizar_transferencias_em_lote(cliente_id: str, transferencias: List[dict], atomico: bool = True) -> dict:
+    """Realiza várias transferências ({"destino_id", "valor"}) da conta do cliente de uma vez."""
+    erro = _validar_lote(cliente_id, transferencias)
+    if erro:
+        return {"status": "erro", "mensagem": erro}
+
+    # Cada destino distinto é consultado uma vez, mesmo em folhas com centenas de itens
+    existentes = {destino: obter_cliente(destino) is not None for destino in {t.get("destino_id") for t in transferencias}}
+    erros = [
+        _erro_valor(transferencia) or (None if existentes[transferencia.get("destino_id")] else "Cliente de destino não encontrado")
+        for transferencia in transferencias
+    ]
+    destinos = [transferencia.get("destino_id") if erro is None else None for transferencia, erro in zip(transferencias, erros)]
+
+    def montar(transferencia, transacao_id, data):
+        return {
+            "id": transacao_id,
+            "data": data,
+            "tipo": "transferência",
+            "origem": cliente_id,
+            "destino": transferencia["destino_id"],
+            "valor": transferencia["valor"]
+        }
+
+    return _executar_lote(cliente_id, transferencias, destinos, erros, montar, atomico)
+
 def buscar_transacoes(cliente_id: str, limite: int = 5) -> dict:
     """Busca as últimas transações do cliente."""
-    transacoes_cliente = []
-    
-    for t in transacoes:
-        # Verifica diferentes tipos de transações
-        if (("origem" in t and t["origem"] == cliente_id) or 
-            ("destino" in t and t["destino"] == cliente_id) or 
-            ("cliente_id" in t and t["cliente_id"] == cliente_id)):
-            transacoes_cliente.append(t)
-            
-    transacoes_cliente.sort(key=lambda x: x["data"], reverse=True)
-    
     return {
         "status": "sucesso",
-        "transacoes": transacoes_cliente[:limite]
+        "transacoes": obter_repositorio().ultimas_transacoes(cliente_id, limite)
+    }
+
+def _ler_cursor(cursor: str) -> Tuple[int, int]:
+    epoch, seq = cursor.split(":")
+    return int(epoch), int(seq)
+
+def consultar_extrato(
+    cliente_id: str,
+    inicio=None,
+    fim=None,
+    tipo: Optional[str] = None,
+    contraparte: Optional[str] = None,
+    limite: int = 10,
+    cursor: Optional[str] = None
+) -> dict:
+    """Extrato paginado do cliente, da transação mais nova para a mais antiga.
+
+    `inicio` e `fim` (ISO ou datetime) limitam o período (inicio <= data < fim);
+    `tipo` e `contraparte` (a outra conta ou o estabelecimento) filtram as
+    transações. Para a próxima página, repita os filtros com o "cursor"
+    retornado; cursor None indica a última página.
+    """
+    if obter_cliente(cliente_id) is None:
+        return {"status": "erro", "mensagem": "Cliente não encontrado"}
+    try:
+        antes = _ler_cursor(cursor) if cursor else None
+    except ValueError:
+        return {"status": "erro", "mensagem": "Cursor inválido"}
+    try:
+        inicio = epoch_us(inicio) if inicio else None
+        fim = epoch_us(fim) if fim else None
+    except ValueError:
+        return {"status": "erro", "mensagem": "Data inválida"}
+    limite = max(1, min(int(limite), MAX_PAGINA_EXTRATO))
+
+    transacoes, proximo = obter_repositorio().extrato(
+        cliente_id,
+        limite,
+        inicio=inicio,
+        fim=fim,
+        tipo=tipo,
+        contraparte=contraparte,
+        antes=antes
+    )
+    return {
+        "status": "sucesso",
+        "transacoes": transacoes,
+        "cursor": f"{proximo[0]}:{proximo[1]}" if proximo else None
+    }
+
+
+def exportar_extrato(cliente_id: str, formato: str = "csv", inicio=None, fim=None, compactar: bool = False) -> dict:
+    """Extrato completo do cliente (inicio <= data < fim) em CSV ou JSON Lines, da mais antiga para a mais nova.
+
+    "conteudo" é um gerador de bytes: as transações são lidas do repositório
+    em lotes enquanto o arquivo é consumido, então históricos de anos saem
+    com memória constante. `compactar` gera o arquivo em gzip.
+    """
+    if obter_cliente(cliente_id) is None:
+        return {"status": "erro", "mensagem": "Cliente não encontrado"}
+    if formato not in FORMATOS:
+        return {"status": "erro", "mensagem": f"Formato inválido; use {' ou '.join(FORMATOS)}"}
+    try:
+        inicio = epoch_us(inicio) if inicio else None
+        fim = epoch_us(fim) if fim else None
+    except ValueError:
+        return {"status": "erro", "mensagem": "Data inválida"}
+
+    transacoes = obter_repositorio().iterar_transacoes(cliente_id, inicio, fim)
+    arquivo = f"extrato-{cliente_id}.{formato}" + (".gz" if compactar else "")
+    return {
+        "status": "sucesso",
+        "arquivo": arquivo,
+        "tipo_conteudo": TIPO_GZIP if compactar else FORMATOS[formato],
+        "conteudo": exportar(transacoes, formato, compactar)
     }
 
 def pagar_boleto(cliente_id: str, codigo_barras: str, valor: float) -> dict:
     """Simula o pagamento de um boleto."""
-    if cliente_id not in clientes:
+    if obter_cliente(cliente_id) is None:
         return {"status": "erro", "mensagem": "Cliente não encontrado"}
-    
-    if clientes[cliente_id]["saldo"] < valor:
-        return {"status": "erro", "mensagem": "Saldo insuficiente"}
-    
-    # Realiza o pagamento
-    clientes[cliente_id]["saldo"] -= valor
-    
-    # Registra a transação
-    transacao = {
-        "id": str(uuid.uuid4()),
-        "data": datetime.now().isoformat(),
-        "tipo": "pagamento_boleto",
-        "origem": cliente_id,
-        "codigo_barras": codigo_barras,
-        "valor": valor
-    }
-    transacoes.append(transacao)
-    
+
+    transacao_id = str(uuid.uuid4())
+
+    with travas.travar(("cliente", cliente_id)):
+        if obter_cliente(cliente_id)["saldo"] < valor:
+            return {"status": "erro", "mensagem": "Saldo insuficiente"}
+
+        # Realiza o pagamento e registra a transação
+        seq = _efetivar({
+            "movimentos": {cliente_id: -valor},
+            "transacao": {
+                "id": transacao_id,
+                "data": datetime.now().isoformat(),
+                "tipo": "pagamento_boleto",
+                "origem": cliente_id,
+                "codigo_barras": codigo_barras,
+                "valor": valor
+            }
+        })
+        if seq is None:
+            return {"status": "erro", "mensagem": "Saldo insuficiente"}
+        novo_saldo = obter_cliente(cliente_id)["saldo"]
+    _aguardar_gravacao(seq)
+
     return {
         "status": "sucesso",
         "mensagem": f"Pagamento de R$ {valor:.2f} realizado com sucesso",
-        "novo_saldo": clientes[cliente_id]["saldo"],
-        "transacao_id": transacao["id"]
+        "novo_saldo": novo_saldo,
+        "transacao_id": transacao_id
     }
 
 def pagar_cartao(cliente_id: str, estabelecimento: str, valor: float, cartao_id: str) -> dict:
     """Simula um pagamento com cartão."""
-    if cliente_id not in clientes or cartao_id not in cartoes:
+    if obter_cliente(cliente_id) is None or obter_cartao(cartao_id) is None:
         return {"status": "erro", "mensagem": "Cliente ou cartão não encontrado"}
-    
-    # Adiciona à fatura do cartão
-    cartoes[cartao_id]["fatura_atual"] += valor
-    
-    # Registra a transação
-    transacao = {
-        "id": str(uuid.uuid4()),
-        "data": datetime.now().isoformat(),
-        "tipo": "pagamento_cartao",
-        "cliente_id": cliente_id,
-        "cartao_id": cartao_id,
-        "estabelecimento": estabelecimento,
-        "valor": valor
-    }
-    transacoes.append(transacao)
-    
+
+    transacao_id = str(uuid.uuid4())
+
+    with travas.travar(("cartao", cartao_id)):
+        # Limite conferido sob a trava: compras concorrentes não passam do limite juntas
+        cartao = obter_cartao(cartao_id)
+        limite_disponivel = cartao["limite"] - cartao["fatura_atual"]
+        if valor > limite_disponivel:
+            return {
+                "status": "erro",
+                "mensagem": f"Limite disponível de R$ {limite_disponivel:.2f} insuficiente para esta compra de R$ {valor:.2f}",
+                "limite_disponivel": limite_disponivel
+            }
+
+        # Adiciona à fatura do cartão e registra a transação
+        seq = _efetivar({
+            "faturas": {cartao_id: valor},
+            "transacao": {
+                "id": transacao_id,
+                "data": datetime.now().isoformat(),
+                "tipo": "pagamento_cartao",
+                "cliente_id": cliente_id,
+                "cartao_id": cartao_id,
+                "estabelecimento": estabelecimento,
+                "valor": valor
+            }
+        })
+        if seq is None:
+            # Outro worker usou o limite entre a verificação e a gravação (SQLite compartilhado)
+            return {"status": "erro", "mensagem": "Limite disponível insuficiente para esta compra"}
+        fatura_atual = obter_cartao(cartao_id)["fatura_atual"]
+    _aguardar_gravacao(seq)
+
     return {
         "status": "sucesso",
         "mensagem": f"Pagamento de R$ {valor:.2f} em {estabelecimento} realizado com sucesso",
-        "fatura_atual": cartoes[cartao_id]["fatura_atual"],
-        "transacao_id": transacao["id"]
+        "fatura_atual": fatura_atual,
+        "limite_disponivel": cartao["limite"] - fatura_atual,
+        "transacao_id": transacao_id
     }
 
 def analisar_comportamento(cliente_id: str) -> dict:
     """Analisa o comportamento do cliente com base nas transações."""
-    # Filtro mais seguro para transações
-    transacoes_cliente = []
-    for t in transacoes:
-        # Verifica transações com origem
-        if t.get("tipo") in ["transferência", "pagamento_boleto"] and t.get("origem") == cliente_id:
-            transacoes_cliente.append(t)
-        # Verifica transações com cliente_id
-        elif t.get("tipo") == "pagamento_cartao" and t.get("cliente_id") == cliente_id:
-            transacoes_cliente.append(t)
-    
-    if not transacoes_cliente:
+    # Agregados do repositório: mantidos a cada transação (memória) ou agrupados pelo índice (SQLite)
+    resumo = obter_repositorio().resumo_gastos(cliente_id)
+
+    if resumo is None:
         return {
             "status": "info",
             "mensagem": "Não há transações suficientes para análise."
         }
-    
-    # Cálculo de totais
-    total_gastos = 0
-    categorias_boletos = {}
-    categorias_estabelecimentos = {}
-    
-    # Processa cada transação
-    for t in transacoes_cliente:
-        valor = t.get("valor", 0)
-        total_gastos += valor
-        
-        if t.get("tipo") == "pagamento_boleto":
-            # Identifica a categoria do boleto (simulado)
-            categoria = "Outros"
-            codigo = t.get("codigo_barras", "")
-            if codigo.startswith("765"):
-                categoria = "Água"
-            elif codigo.startswith("891"):
-                categoria = "Energia"
-            
-            if categoria not in categorias_boletos:
-                categorias_boletos[categoria] = {"quantidade": 0, "valor": 0}
-            
-            categorias_boletos[categoria]["quantidade"] += 1
-            categorias_boletos[categoria]["valor"] += valor
-            
-        elif t.get("tipo") == "pagamento_cartao":
-            estabelecimento = t.get("estabelecimento", "Desconhecido")
-            
-            if estabelecimento not in categorias_estabelecimentos:
-                categorias_estabelecimentos[estabelecimento] = {"quantidade": 0, "valor": 0}
-            
-            categorias_estabelecimentos[estabelecimento]["quantidade"] += 1
-            categorias_estabelecimentos[estabelecimento]["valor"] += valor
-    
-    # Cálculo de médias
-    valor_medio = total_gastos / len(transacoes_cliente) if transacoes_cliente else 0
-    
-    # Classificação para ordenação
-    categorias_boletos_sorted = sorted(
-        categorias_boletos.items(),
-        key=lambda x: x[1]["valor"],
-        reverse=True
-    )
-    
-    categorias_estabelecimentos_sorted = sorted(
-        categorias_estabelecimentos.items(),
-        key=lambda x: x[1]["valor"],
-        reverse=True
-    )
-    
+
     # Perfil descritivo (simulado)
+    total_gastos = resumo["total_gastos"]
     perfil_descritivo = "Cliente com perfil de gastos moderado."
     if total_gastos > 1000:
         perfil_descritivo = "Cliente com perfil de gastos elevado."
     elif total_gastos < 200:
         perfil_descritivo = "Cliente com perfil de gastos conservador."
-    
+
     return {
         "status": "sucesso",
-        "total_gastos": total_gastos,
-        "num_transacoes": len(transacoes_cliente),
-        "principais_categorias_boletos": dict(categorias_boletos_sorted[:3]),
-        "principais_categorias_estabelecimentos": dict(categorias_estabelecimentos_sorted[:3]),
-        "valor_medio_transacao": valor_medio,
+        **resumo,
         "perfil_descritivo": perfil_descritivo
-    }
\ No newline at end of file
+    }
+
+def verificar_consistencia_perfis() -> dict:
+    """Confere os agregados de perfil de todos os clientes contra um recálculo completo."""
+    divergencias = obter_repositorio().verificar_consistencia()
+    if divergencias:
+        return {
+            "status": "erro",
+            "mensagem": f"{len(divergencias)} perfis divergem do recálculo",
+            "divergencias": divergencias
+        }
+    return {"status": "sucesso", "mensagem": "Agregados de perfil conferem com o recálculo"}
@@ -0,0 +1,185 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from agent.graph import create_agent
+
+# Limites padrão do processo
+MAX_SESSOES = int(os.getenv("AGENT_MAX_SESSOES", "1000"))
+TTL_SESSAO = float(os.getenv("AGENT_TTL_SESSAO", "1800"))
+ORCAMENTO_BYTES = int(os.getenv("AGENT_ORCAMENTO_MB", "256")) * 1024 * 1024
+
+# Custo aproximado de um objeto de mensagem além do texto (objeto, dicts de metadados)
+_BYTES_POR_MENSAGEM = 1200
+
+
+def estimar_bytes(agent) -> int:
+    """Estimativa da memória retida por uma sessão: mensagens do log mais o contexto."""
+    total = sys.getsizeof(agent.context)
+    for chave, valor in agent.context.items():
+        total += sys.getsizeof(chave) + sys.getsizeof(valor)
+    for mensagem in agent.log.snapshot():
+        total += _BYTES_POR_MENSAGEM + sys.getsizeof(mensagem.content)
+    return total
+
+
+class _Entrada:
+    __slots__ = ("agent", "ultimo_acesso", "bytes")
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.ultimo_acesso = time.monotonic()
+        self.bytes = estimar_bytes(agent)
+
+
+class SessionManager:
+    """Sessões de chat vivas no processo, com despejo por TTL e LRU.
+
+    As entradas ficam em um OrderedDict na ordem do último acesso: as ociosas
+    há mais de `ttl` segundos e, acima de `max_sessoes` ou do orçamento de
+    memória, as menos usadas recentemente são despejadas. Com um session_store,
+    a sessão despejada é gravada antes de sair da memória e restaurada no
+    próximo acesso; sem ele, é descartada.
+    """
+
+    def __init__(self, vectorstore=None, session_store=None, max_sessoes: Optional[int] = None,
+                 ttl: Optional[float] = None, orcamento_bytes: Optional[int] = None):
+        self.vectorstore = vectorstore
+        self.session_store = session_store
+        self.max_sessoes = MAX_SESSOES if max_sessoes is None else max_sessoes
+        self.ttl = TTL_SESSAO if ttl is None else ttl
+        self.orcamento_bytes = ORCAMENTO_BYTES if orcamento_bytes is None else orcamento_bytes
+        self._sessoes: "OrderedDict[str, _Entrada]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._contadores = {"criadas": 0, "restauradas": 0, "despejadas_ttl": 0, "despejadas_lru": 0}
+
+    def criar(self, cliente_id: str, session_id: Optional[str] = None):
+        """Cria (ou restaura do session store) uma sessão e passa a rastreá-la."""
+        agent = create_agent(cliente_id, self.vectorstore, session_store=self.session_store, session_id=session_id)
+        agent.salvar()
+        with self._lock:
+            self._contadores["criadas"] += 1
+            despejadas = self._inserir(agent)
+        self._gravar(despejadas)
+        return agent
+
+    def obter(self, session_id: str):
+        """Retorna a sessão viva, restaurando-a do session store se necessário; None se não existir.
+
+        Com um session_store compartilhado entre workers, a cópia em memória é
+        descartada quando outro worker gravou turnos mais novos.
+        """
+        with self._lock:
+            despejadas = self._expirar()
+            entrada = self._sessoes.get(session_id)
+            if entrada is not None:
+                self._sessoes.move_to_end(session_id)
+                entrada.ultimo_acesso = time.monotonic()
+        self._gravar(despejadas)
+        if entrada is not None:
+            if self.session_store is None or self.session_store.versao(session_id) == entrada.agent.versao:
+                return entrada.agent
+        if self.session_store is None:
+            return None
+
+        estado = self.session_store.carregar(session_id)
+        if estado is None:
+            return None
+        agent = create_agent(
+            estado["cliente_id"], self.vectorstore, session_store=self.session_store, session_id=session_id,
+            estado=estado
+        )
+        with self._lock:
+            self._contadores["restauradas"] += 1
+            despejadas = self._inserir(agent)
+        self._gravar(despejadas)
+        return agent
+
+    def atualizar(self, agent):
+        """Recalcula a memória estimada da sessão após um turno e aplica os limites."""
+        with self._lock:
+            entrada = self._sessoes.get(agent.session_id)
+            if entrada is None or entrada.agent is not agent:
+                return
+            novo = estimar_bytes(agent)
+            self._bytes += novo - entrada.bytes
+            entrada.bytes = novo
+            entrada.ultimo_acesso = time.monotonic()
+            self._sessoes.move_to_end(agent.session_id)
+            despejadas = self._aplicar_limites()
+        self._gravar(despejadas)
+
+    def remover(self, session_id: str):
+        with self._lock:
+            entrada = self._sessoes.pop(session_id, None)
+            if entrada is not None:
+                self._bytes -= entrada.bytes
+        if self.session_store is not None:
+            self.session_store.remover(session_id)
+
+    def expirar(self):
+        """Despeja as sessões ociosas há mais de `ttl` segundos."""
+        with self._lock:
+            despejadas = self._expirar()
+        self._gravar(despejadas)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessoes": len(self._sessoes),
+                "bytes_estimados": self._bytes,
+                "orcamento_bytes": self.orcamento_bytes,
+                "max_sessoes": self.max_sessoes,
+                **self._contadores,
+                "por_sessao": {session_id: entrada.bytes for session_id, entrada in self._sessoes.items()}
+            }
+
+    def __len__(self):
+        return len(self._sessoes)
+
+    def _inserir(self, agent):
+        anterior = self._sessoes.pop(agent.session_id, None)
+        if anterior is not None:
+            self._bytes -= anterior.bytes
+        entrada = _Entrada(agent)
+        self._sessoes[agent.session_id] = entrada
+        self._bytes += entrada.bytes
+        return self._aplicar_limites()
+
+    # _expirar, _aplicar_limites e _despejar rodam sob self._lock e retornam as
+    # sessões despejadas; quem chamou as grava com _gravar depois de soltar o lock
+
+    def _expirar(self) -> list:
+        # Ordem de acesso: as expiradas estão sempre no início
+        limite = time.monotonic() - self.ttl
+        despejadas = []
+        while self._sessoes:
+            session_id, entrada = next(iter(self._sessoes.items()))
+            if entrada.ultimo_acesso > limite:
+                break
+            despejadas.append(self._despejar(session_id, "despejadas_ttl"))
+        return despejadas
+
+    def _aplicar_limites(self) -> list:
+        # Mantém sempre a sessão mais recente, mesmo que sozinha passe do orçamento
+        despejadas = []
+        while len(self._sessoes) > 1 and (
+            len(self._sessoes) > self.max_sessoes or self._bytes > self.orcamento_bytes
+        ):
+            despejadas.append(self._despejar(next(iter(self._sessoes)), "despejadas_lru"))
+        return despejadas
+
+    def _despejar(self, session_id, motivo):
+        entrada = self._sessoes.pop(session_id)
+        self._bytes -= entrada.bytes
+        self._contadores[motivo] += 1
+        return entrada.agent
+
+    def _gravar(self, despejadas):
+        if self.session_store is not None:
+            for agent in despejadas:
+                agent.salvar()
@@ -0,0 +1,232 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict, Any, List, Optional, Sequence
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from agent.message_log import MAX_TURNOS_RETIDOS, MessageLog
+
+# Códigos curtos dos tipos de mensagem na serialização
+_CODIGOS = {"human": "h", "ai": "a", "system": "s"}
+_CLASSES = {"h": HumanMessage, "a": AIMessage, "s": SystemMessage}
+
+
+def codificar_turno(mensagens: Sequence[Any], contexto: Dict[str, Any]) -> bytes:
+    """Serializa as mensagens novas e o contexto alterado de um turno em binário compacto."""
+    dados = {
+        "m": [[_CODIGOS.get(m.type, "a"), m.content] for m in mensagens],
+        "c": contexto
+    }
+    return zlib.compress(json.dumps(dados, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def decodificar_turno(dados: bytes):
+    """Inverso de codificar_turno: retorna (mensagens, contexto)."""
+    bruto = json.loads(zlib.decompress(dados).decode("utf-8"))
+    return [_CLASSES[codigo](content=conteudo) for codigo, conteudo in bruto["m"]], bruto["c"]
+
+
+class SessionStore(ABC):
+    """Interface de armazenamento das sessões de chat.
+
+    Cada turno grava apenas as mensagens novas e as chaves do contexto que
+    mudaram; carregar() reconstrói o estado completo da sessão.
+    """
+
+    @abstractmethod
+    def salvar_turno(self, session_id: str, cliente_id: str, mensagens: Sequence[Any], contexto: Dict[str, Any]) -> int:
+        """Grava um turno e retorna a nova versão (número do turno) da sessão."""
+
+    @abstractmethod
+    def carregar(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Retorna {"cliente_id", "messages", "context", "versao"} ou None se a sessão não existir."""
+
+    @abstractmethod
+    def versao(self, session_id: str) -> Optional[int]:
+        """Número do último turno gravado, para detectar cópias em memória desatualizadas."""
+
+    @abstractmethod
+    def remover(self, session_id: str):
+        ...
+
+
+class MemorySessionStore(SessionStore):
+    """Armazenamento em memória, útil para um único worker e para testes.
+
+    Como no SQLiteSessionStore, a cada `snapshot_a_cada` turnos os diffs são
+    fundidos em um snapshot com os últimos `max_turnos` turnos.
+    """
+
+    def __init__(self, snapshot_a_cada: int = 50, max_turnos: int = MAX_TURNOS_RETIDOS):
+        self.snapshot_a_cada = snapshot_a_cada
+        self.max_turnos = max_turnos
+        self._sessoes: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def salvar_turno(self, session_id, cliente_id, mensagens, contexto):
+        dados = codificar_turno(mensagens, contexto)
+        with self._lock:
+            sessao = self._sessoes.setdefault(
+                session_id, {"cliente_id": cliente_id, "versao": 0, "snapshot": None, "turnos": []}
+            )
+            sessao["turnos"].append(dados)
+            sessao["versao"] += 1
+            if len(sessao["turnos"]) >= self.snapshot_a_cada:
+                sessao["snapshot"] = _consolidar(sessao["snapshot"], sessao["turnos"], self.max_turnos)
+                sessao["turnos"] = []
+            return sessao["versao"]
+
+    def carregar(self, session_id):
+        with self._lock:
+            sessao = self._sessoes.get(session_id)
+            if sessao is None:
+                return None
+            snapshot, turnos, versao = sessao["snapshot"], list(sessao["turnos"]), sessao["versao"]
+        return _reconstruir(sessao["cliente_id"], snapshot, turnos, versao)
+
+    def versao(self, session_id):
+        with self._lock:
+            sessao = self._sessoes.get(session_id)
+            return sessao["versao"] if sessao else None
+
+    def remover(self, session_id):
+        with self._lock:
+            self._sessoes.pop(session_id, None)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Armazenamento de sessões em SQLite, compartilhável entre workers da mesma máquina.
+
+    A cada `snapshot_a_cada` turnos os diffs são consolidados em um snapshot
+    que retém apenas os últimos `max_turnos` turnos, de modo que carregar uma
+    conversa longa lê um snapshot limitado e poucos diffs.
+    """
+
+    def __init__(self, caminho: str = "sessoes.db", snapshot_a_cada: int = 50, max_turnos: int = MAX_TURNOS_RETIDOS):
+        self.caminho = caminho
+        self.snapshot_a_cada = snapshot_a_cada
+        self.max_turnos = max_turnos
+        self._local = threading.local()
+        conn = self._conexao()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessoes (
+                session_id TEXT PRIMARY KEY,
+                cliente_id TEXT NOT NULL,
+                ultimo_turno INTEGER NOT NULL,
+                snapshot BLOB,
+                snapshot_turno INTEGER NOT NULL DEFAULT 0,
+                atualizado_em REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS turnos (
+                session_id TEXT NOT NULL,
+                turno INTEGER NOT NULL,
+                dados BLOB NOT NULL,
+                PRIMARY KEY (session_id, turno)
+            ) WITHOUT ROWID;
+        """)
+
+    def _conexao(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.caminho, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def salvar_turno(self, session_id, cliente_id, mensagens, contexto):
+        conn = self._conexao()
+        dados = codificar_turno(mensagens, contexto)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            linha = conn.execute(
+                "SELECT ultimo_turno, snapshot_turno FROM sessoes WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            turno = (linha[0] if linha else 0) + 1
+            conn.execute(
+                "INSERT INTO sessoes (session_id, cliente_id, ultimo_turno, atualizado_em) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET ultimo_turno = excluded.ultimo_turno, "
+                "atualizado_em = excluded.atualizado_em",
+                (session_id, cliente_id, turno, time.time())
+            )
+            conn.execute(
+                "INSERT INTO turnos (session_id, turno, dados) VALUES (?, ?, ?)", (session_id, turno, dados)
+            )
+            if turno - (linha[1] if linha else 0) >= self.snapshot_a_cada:
+                self._consolidar(conn, session_id, turno)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return turno
+
+    def _consolidar(self, conn, session_id, turno):
+        """Funde o snapshot anterior e os diffs até `turno` em um novo snapshot."""
+        snapshot, turnos = self._ler(conn, session_id)
+        conn.execute(
+            "UPDATE sessoes SET snapshot = ?, snapshot_turno = ? WHERE session_id = ?",
+            (_consolidar(snapshot, turnos, self.max_turnos), turno, session_id)
+        )
+        conn.execute("DELETE FROM turnos WHERE session_id = ? AND turno <= ?", (session_id, turno))
+
+    def _ler(self, conn, session_id):
+        linha = conn.execute(
+            "SELECT snapshot, snapshot_turno FROM sessoes WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if linha is None:
+            return None, None
+        turnos = [
+            dados for (dados,) in conn.execute(
+                "SELECT dados FROM turnos WHERE session_id = ? AND turno > ? ORDER BY turno",
+                (session_id, linha[1])
+            )
+        ]
+        return linha[0], turnos
+
+    def carregar(self, session_id):
+        conn = self._conexao()
+        # Lê a sessão em uma única transação para que a versão corresponda aos turnos lidos
+        conn.execute("BEGIN")
+        try:
+            linha = conn.execute(
+                "SELECT cliente_id, ultimo_turno FROM sessoes WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if linha is None:
+                return None
+            snapshot, turnos = self._ler(conn, session_id)
+        finally:
+            conn.execute("COMMIT")
+        return _reconstruir(linha[0], snapshot, turnos, linha[1])
+
+    def versao(self, session_id):
+        linha = self._conexao().execute(
+            "SELECT ultimo_turno FROM sessoes WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return linha[0] if linha else None
+
+    def remover(self, session_id):
+        conn = self._conexao()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM turnos WHERE session_id = ?", (session_id,))
+        conn.execute("DELETE FROM sessoes WHERE session_id = ?", (session_id,))
+        conn.execute("COMMIT")
+
+
+def _consolidar(snapshot: Optional[bytes], turnos: List[bytes], max_turnos: int) -> bytes:
+    """Snapshot com o estado após `turnos`, retendo só as mensagens dos últimos `max_turnos` turnos."""
+    estado = _reconstruir(None, snapshot, turnos)
+    mensagens = MessageLog.de_mensagens(estado["messages"], max_turnos).snapshot()
+    return codificar_turno(mensagens, estado["context"])
+
+
+def _reconstruir(cliente_id: Optional[str], snapshot: Optional[bytes], turnos: List[bytes], versao: int = 0) -> Dict[str, Any]:
+    mensagens, contexto = decodificar_turno(snapshot) if snapshot else ([], {})
+    for dados in turnos:
+        novas, alterado = decodificar_turno(dados)
+        mensagens.extend(novas)
+        contexto.update(alterado)
+    return {"cliente_id": cliente_id, "messages": mensagens, "context": contexto, "versao": versao}
@@ -1,8 +1,18 @@
-from typing import TypedDict, Annotated, Sequence, Any, Dict, Optional
+import operator
+from typing import TypedDict, Annotated, Sequence, Any, Dict, List, Optional, Tuple
+
+def mesclar_resultados(atual: Dict[str, Any], novo: Dict[str, Any]) -> Dict[str, Any]:
+    """Combina os resultados de serviço gravados por nós executados em paralelo."""
+    return {**(atual or {}), **(novo or {})}
 
 class ChatState(TypedDict):
     """Estado do grafo do agente de chat bancário."""
     messages: Annotated[Sequence[Any], "Mensagens na conversa"]
     cliente_id: Annotated[str, "ID do cliente ativo"]
     next: Annotated[str, "Próximo nó para execução"]
-    context: Annotated[Optional[Dict[str, Any]], "Contexto adicional da conversa"] = None
\ No newline at end of file
+    context: Annotated[Optional[Dict[str, Any]], "Contexto adicional da conversa"] = None
+    analise: Annotated[Dict[str, Any], "Análise da mensagem do turno (texto normalizado, rótulos, tópicos, tema)"]
+    intencao: Annotated[str, "Intenção principal detectada no turno atual"]
+    intencoes: Annotated[List[Dict[str, Any]], "Intenções do turno com parâmetros e ordem na mensagem"]
+    resultados: Annotated[Dict[str, Any], "Resultados das chamadas de serviço do turno, por função", mesclar_resultados]
+    respostas: Annotated[List[Tuple[int, str]], "Respostas (ordem, texto) dos nós do turno", operator.add]
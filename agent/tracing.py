@@ -0,0 +1,214 @@
+"""Spans por turno e por nó do agente, exportados em JSONL no formato de campos do OTLP.
+
+Ative definindo AGENT_TRACE_FILE=traces.jsonl. Para resumir as latências:
+
+    python -m agent.tracing traces.jsonl
+"""
+import argparse
+import atexit
+import contextvars
+import functools
+import json
+import math
+import os
+import queue
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+_span_atual: contextvars.ContextVar = contextvars.ContextVar("span_atual", default=None)
+
+
+class Span:
+    """Intervalo de execução com atributos (intenção, cache, tokens...)."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "nome", "inicio_ns", "fim_ns", "atributos")
+
+    def __init__(self, nome: str, parent: Optional["Span"], atributos: Dict[str, Any]):
+        self.nome = nome
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else None
+        self.atributos = atributos
+        self.inicio_ns = time.time_ns()
+        self.fim_ns = None
+
+    def set(self, **atributos):
+        self.atributos.update(atributos)
+
+    def para_dict(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.nome,
+            "startTimeUnixNano": self.inicio_ns,
+            "endTimeUnixNano": self.fim_ns,
+            "attributes": self.atributos
+        }
+
+
+class _SpanNulo:
+    """Span usado quando o tracing está desligado; não registra nada."""
+
+    def set(self, **atributos):
+        pass
+
+
+_SPAN_NULO = _SpanNulo()
+
+
+class JsonlExporter:
+    """Grava um span por linha em um arquivo local.
+
+    O thread da requisição só enfileira o span; um thread em segundo plano
+    serializa, grava com o arquivo sempre aberto e faz um flush por lote do
+    que estiver na fila, como o QueueListener de utils.logs.
+    """
+
+    def __init__(self, caminho: str):
+        self.caminho = caminho
+        self._fila: "queue.SimpleQueue[Optional[Span]]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def exportar(self, span: Span):
+        if self._thread is None:
+            self._iniciar()
+        self._fila.put(span)
+
+    def _iniciar(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._gravar, name="tracing-exporter", daemon=True)
+                self._thread.start()
+                atexit.register(self.encerrar)
+
+    def _gravar(self):
+        with open(self.caminho, "a", encoding="utf-8") as arquivo:
+            while True:
+                lote = [self._fila.get()]
+                while True:
+                    try:
+                        lote.append(self._fila.get_nowait())
+                    except queue.Empty:
+                        break
+                fim = None in lote
+                arquivo.writelines(
+                    json.dumps(span.para_dict(), ensure_ascii=False, default=str) + "\n"
+                    for span in lote if span is not None
+                )
+                arquivo.flush()
+                if fim:
+                    return
+
+    def encerrar(self):
+        """Grava os spans ainda na fila e para o thread de escrita."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._fila.put(None)
+            thread.join()
+
+
+class Tracer:
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+
+    @contextmanager
+    def span(self, nome: str, **atributos):
+        if self.exporter is None:
+            yield _SPAN_NULO
+            return
+        span = Span(nome, _span_atual.get(), atributos)
+        token = _span_atual.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.set(erro=type(e).__name__)
+            raise
+        finally:
+            span.fim_ns = time.time_ns()
+            _span_atual.reset(token)
+            self.exporter.exportar(span)
+
+
+tracer = Tracer(JsonlExporter(os.environ["AGENT_TRACE_FILE"]) if os.getenv("AGENT_TRACE_FILE") else None)
+
+
+def span(nome: str, **atributos):
+    """Abre um span no tracer do processo: `with span("llm", modelo=...) as s: ...`."""
+    return tracer.span(nome, **atributos)
+
+
+def rastrear_no(nome: str, funcao):
+    """Envolve um nó do grafo em um span "no.<nome>" com as intenções do turno."""
+    @functools.wraps(funcao)
+    def no(state):
+        with span(f"no.{nome}", intencao=state.get("intencao") or nome) as s:
+            atualizacao = funcao(state)
+            if isinstance(atualizacao, dict) and atualizacao.get("intencoes"):
+                s.set(intencoes=[e["intencao"] for e in atualizacao["intencoes"]])
+            return atualizacao
+    return no
+
+
+def registrar_tokens(s, mensagem):
+    """Copia a contagem de tokens de uma resposta do LLM para o span."""
+    uso = getattr(mensagem, "usage_metadata", None)
+    if not uso:
+        uso = (getattr(mensagem, "response_metadata", None) or {}).get("token_usage") or {}
+    s.set(
+        tokens_entrada=uso.get("input_tokens", uso.get("prompt_tokens")),
+        tokens_saida=uso.get("output_tokens", uso.get("completion_tokens")),
+        tokens_total=uso.get("total_tokens")
+    )
+
+
+def _percentil(valores, p):
+    indice = max(0, min(len(valores) - 1, math.ceil(p / 100 * len(valores)) - 1))
+    return valores[indice]
+
+
+def resumir(caminho: str) -> Dict[str, Dict[str, float]]:
+    """Calcula contagem e p50/p95/p99 (ms) por nome de span."""
+    duracoes = defaultdict(list)
+    with open(caminho, encoding="utf-8") as arquivo:
+        for linha in arquivo:
+            if not linha.strip():
+                continue
+            registro = json.loads(linha)
+            duracoes[registro["name"]].append(
+                (registro["endTimeUnixNano"] - registro["startTimeUnixNano"]) / 1e6
+            )
+    resumo = {}
+    for nome, valores in duracoes.items():
+        valores.sort()
+        resumo[nome] = {
+            "n": len(valores),
+            "p50": _percentil(valores, 50),
+            "p95": _percentil(valores, 95),
+            "p99": _percentil(valores, 99)
+        }
+    return resumo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumo de latência por span (ms).")
+    parser.add_argument("arquivo", nargs="?", default=os.getenv("AGENT_TRACE_FILE", "traces.jsonl"))
+    args = parser.parse_args()
+
+    resumo = resumir(args.arquivo)
+    print(f"{'span':<32}{'n':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for nome, estatisticas in sorted(resumo.items(), key=lambda item: -item[1]["p50"]):
+        print(
+            f"{nome:<32}{estatisticas['n']:>8}{estatisticas['p50']:>10.2f}"
+            f"{estatisticas['p95']:>10.2f}{estatisticas['p99']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
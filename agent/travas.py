@@ -0,0 +1,40 @@
+import threading
+from contextlib import contextmanager
+from typing import Dict, Hashable
+
+
+class TravasContas:
+    """Um lock por conta (saldo de cliente ou fatura de cartão).
+
+    Operações que tocam várias contas adquirem os locks sempre em ordem
+    crescente de chave, o que impede deadlock entre, por exemplo, A->B e B->A.
+    Operações sobre contas independentes não esperam umas pelas outras.
+    """
+
+    def __init__(self):
+        self._travas: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _trava(self, chave) -> threading.Lock:
+        trava = self._travas.get(chave)
+        if trava is None:
+            with self._lock:
+                trava = self._travas.setdefault(chave, threading.Lock())
+        return trava
+
+    @contextmanager
+    def travar(self, *chaves):
+        """Mantém as contas travadas durante o bloco: `with travas.travar(("cliente", "1"), ("cliente", "2")):`."""
+        travas = [self._trava(chave) for chave in sorted(set(chaves))]
+        adquiridas = []
+        try:
+            for trava in travas:
+                trava.acquire()
+                adquiridas.append(trava)
+            yield
+        finally:
+            for trava in reversed(adquiridas):
+                trava.release()
+
+    def __len__(self):
+        return len(self._travas)
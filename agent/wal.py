@@ -0,0 +1,259 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_PREFIXO_SEGMENTO = "wal-"
+_SNAPSHOT = "snapshot.json"
+
+
+def _fsync_diretorio(diretorio: str):
+    """Garante que criações, renomeações e remoções no diretório sobrevivam a uma queda."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(diretorio, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class DiarioTransacoes:
+    """Write-ahead log das mudanças de estado do banco, com group commit e snapshots.
+
+    Cada mudança (transação e movimentos de saldos e faturas) vira uma linha
+    JSON com número de sequência. efetivar() aplica a mudança em memória e grava
+    a linha no buffer na mesma seção crítica, então a ordem do log é a ordem em
+    que o estado mudou e cada registro é reaplicado exatamente uma vez; aguardar() bloqueia até a linha estar no disco. Um único
+    thread grava o buffer e faz um fsync por lote: commits concorrentes que
+    chegam dentro de `janela` segundos dividem o mesmo fsync. A janela só é
+    esperada quando o lote anterior teve mais de um registro, então um único
+    cliente sequencial não paga a espera a cada commit.
+
+    A cada `snapshot_a_cada` registros o estado completo vai para snapshot.json
+    e o log passa para um segmento novo (wal-<primeira sequência>.log); os
+    segmentos já cobertos pelo snapshot são apagados. recuperar() carrega o
+    snapshot e reaplica só os registros posteriores a ele. `preparar_captura`
+    roda sob o lock dos commits e só deve copiar o barato (saldos, tamanho do
+    histórico); a função que ela retorna monta o estado completo depois, fora
+    do lock, no thread do snapshot.
+
+    Se um fsync falhar, o diário entra em falha: os commits que aguardavam
+    recebem RuntimeError e novos efetivar() são recusados, para que o estado
+    em memória não avance mais sobre o que está no disco. Os registros já
+    aplicados e não gravados se perdem no próximo recuperar().
+
+    O diário pertence a um único processo: workers diferentes precisam de
+    diretórios diferentes.
+    """
+
+    def __init__(
+        self,
+        diretorio: str,
+        aplicar: Callable[[Dict[str, Any]], None],
+        preparar_captura: Callable[[], Callable[[], Dict[str, Any]]],
+        restaurar: Callable[[Dict[str, Any]], None],
+        janela: float = 0.001,
+        snapshot_a_cada: int = 50_000
+    ):
+        self.diretorio = diretorio
+        self.aplicar = aplicar
+        self.preparar_captura = preparar_captura
+        self.restaurar = restaurar
+        self.janela = janela
+        self.snapshot_a_cada = snapshot_a_cada
+        os.makedirs(diretorio, exist_ok=True)
+
+        self.seq = 0              # último registro efetivado em memória
+        self.seq_duravel = 0      # último registro com fsync concluído
+        self.seq_snapshot = 0     # último registro coberto pelo snapshot em disco
+        self.fsyncs = 0
+        self.gravados = 0
+        self._ultimo_lote = 0
+        self._pendentes: List[str] = []
+        self._arquivo = None
+        self._lock = threading.Lock()
+        self._gravado = threading.Condition(self._lock)
+        self._ha_pendentes = threading.Condition(self._lock)
+        self._fechando = False
+        self._falha: Optional[BaseException] = None
+        self._thread: Optional[threading.Thread] = None
+        self._thread_snapshot: Optional[threading.Thread] = None
+
+    # ---- recuperação ----
+
+    def _segmentos(self) -> List[str]:
+        nomes = [n for n in os.listdir(self.diretorio) if n.startswith(_PREFIXO_SEGMENTO) and n.endswith(".log")]
+        return [os.path.join(self.diretorio, n) for n in sorted(nomes)]
+
+    def recuperar(self) -> Dict[str, Any]:
+        """Restaura o snapshot, reaplica o log e abre um segmento novo para as próximas gravações."""
+        inicio = time.perf_counter()
+        caminho_snapshot = os.path.join(self.diretorio, _SNAPSHOT)
+        if os.path.exists(caminho_snapshot):
+            with open(caminho_snapshot, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self.restaurar(snapshot["estado"])
+            self.seq = self.seq_snapshot = snapshot["seq"]
+
+        reaplicados = 0
+        for caminho in self._segmentos():
+            with open(caminho, encoding="utf-8") as f:
+                for linha in f:
+                    try:
+                        registro = json.loads(linha)
+                    except json.JSONDecodeError:
+                        # Linha cortada por uma queda no meio da gravação: nunca foi confirmada
+                        logger.warning("Registro incompleto ignorado em %s após a sequência %d", caminho, self.seq)
+                        break
+                    if registro["seq"] <= self.seq:
+                        continue
+                    self.aplicar(registro)
+                    self.seq = registro["seq"]
+                    reaplicados += 1
+
+        self.seq_duravel = self.seq
+        self._abrir_segmento(self.seq + 1)
+        duracao = time.perf_counter() - inicio
+        logger.info("Diário recuperado até a sequência %d (%d registros reaplicados em %.2fs)", self.seq, reaplicados, duracao)
+        return {"seq": self.seq, "snapshot": self.seq_snapshot, "reaplicados": reaplicados, "duracao": duracao}
+
+    def _abrir_segmento(self, primeira_seq: int):
+        if self._arquivo is not None:
+            self._arquivo.close()
+        caminho = os.path.join(self.diretorio, f"{_PREFIXO_SEGMENTO}{primeira_seq:020d}.log")
+        self._arquivo = open(caminho, "a", encoding="utf-8")
+        _fsync_diretorio(self.diretorio)
+
+    # ---- gravação ----
+
+    def iniciar(self):
+        if self._arquivo is None:
+            self.recuperar()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._gravar, name="diario-transacoes", daemon=True)
+            self._thread.start()
+        return self
+
+    def efetivar(self, registro: Dict[str, Any]) -> int:
+        """Numera, aplica e enfileira a mudança; retorna a sequência para aguardar().
+
+        Se `aplicar` recusar a mudança (retornar False), nada é gravado e o retorno é 0.
+        """
+        with self._lock:
+            if self._fechando:
+                raise RuntimeError("Diário de transações encerrado")
+            if self._falha is not None:
+                raise RuntimeError("Diário de transações em falha; operações suspensas") from self._falha
+            registro["seq"] = self.seq + 1
+            if self.aplicar(registro) is False:
+                return 0
+            self.seq += 1
+            self._pendentes.append(json.dumps(registro, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self._ha_pendentes.notify()
+            return self.seq
+
+    def aguardar(self, seq: int):
+        """Bloqueia até o registro `seq` estar no disco."""
+        with self._lock:
+            while self.seq_duravel < seq:
+                if self._falha is not None:
+                    raise RuntimeError("Falha ao gravar o registro no diário de transações") from self._falha
+                if self._thread is None or not self._thread.is_alive():
+                    raise RuntimeError("Diário de transações parado antes de gravar o registro")
+                self._gravado.wait(0.5)
+
+    def _gravar(self):
+        while True:
+            with self._lock:
+                while not self._pendentes and not self._fechando:
+                    self._ha_pendentes.wait()
+                if self._fechando and not self._pendentes:
+                    return
+            # Espera a janela para juntar os commits que estão chegando no mesmo fsync
+            if self.janela and self._ultimo_lote > 1:
+                time.sleep(self.janela)
+            with self._lock:
+                lote, self._pendentes = self._pendentes, []
+                ate = self.seq
+                arquivo = self._arquivo
+                snapshot = (
+                    ate - self.seq_snapshot >= self.snapshot_a_cada
+                    and (self._thread_snapshot is None or not self._thread_snapshot.is_alive())
+                )
+                if snapshot:
+                    # Só o barato sob o lock: nenhum registro é efetivado entre a captura e `ate`
+                    montar_estado = self.preparar_captura()
+            try:
+                arquivo.writelines(lote)
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
+            except Exception as e:
+                logger.critical("Falha ao gravar o diário de transações; novos commits serão recusados", exc_info=True)
+                with self._lock:
+                    self._falha = e
+                    self._pendentes = []
+                    self._gravado.notify_all()
+                return
+            with self._lock:
+                self.fsyncs += 1
+                self.gravados += len(lote)
+                self._ultimo_lote = len(lote)
+                self.seq_duravel = ate
+                self._gravado.notify_all()
+                if snapshot:
+                    self._abrir_segmento(ate + 1)
+            if snapshot:
+                self._thread_snapshot = threading.Thread(
+                    target=self._gravar_snapshot, args=(montar_estado, ate), name="diario-snapshot", daemon=True
+                )
+                self._thread_snapshot.start()
+
+    def _gravar_snapshot(self, montar_estado: Callable[[], Dict[str, Any]], seq: int):
+        inicio = time.perf_counter()
+        estado = montar_estado()
+        caminho = os.path.join(self.diretorio, _SNAPSHOT)
+        temporario = caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump({"seq": seq, "estado": estado}, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, caminho)
+        _fsync_diretorio(self.diretorio)
+        with self._lock:
+            self.seq_snapshot = seq
+
+        # Segmentos cujos registros terminam antes do snapshot não são mais necessários
+        segmentos = self._segmentos()
+        for atual, seguinte in zip(segmentos, segmentos[1:]):
+            primeira_seguinte = int(os.path.basename(seguinte)[len(_PREFIXO_SEGMENTO):-len(".log")])
+            if primeira_seguinte <= seq + 1:
+                os.remove(atual)
+        logger.info("Snapshot do diário na sequência %d gravado em %.2fs", seq, time.perf_counter() - inicio)
+
+    def fechar(self):
+        """Grava o que estiver pendente e encerra os threads do diário."""
+        with self._lock:
+            self._fechando = True
+            self._ha_pendentes.notify()
+        if self._thread is not None:
+            self._thread.join()
+        if self._thread_snapshot is not None:
+            self._thread_snapshot.join()
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "seq": self.seq,
+            "seq_duravel": self.seq_duravel,
+            "seq_snapshot": self.seq_snapshot,
+            "em_falha": self._falha is not None,
+            "fsyncs": self.fsyncs,
+            "registros_por_fsync": self.gravados / self.fsyncs if self.fsyncs else 0
+        }
@@ -0,0 +1,344 @@
+"""API HTTP/WebSocket do agente de chat, sem navegador no caminho.
+
+As sessões ficam no session store (SQLite por padrão), então qualquer worker
+atende qualquer sessão e o balanceador não precisa de afinidade:
+
+    uvicorn api:app --workers 4 --timeout-graceful-shutdown 30
+
+As sessões vivas de cada worker são limitadas pelo SessionManager
+(AGENT_MAX_SESSOES, AGENT_TTL_SESSAO, AGENT_ORCAMENTO_MB).
+
+Variáveis de ambiente:
+    SESSION_DB               arquivo SQLite das sessões (sessoes.db)
+    API_MAX_TURNOS           turnos executados ao mesmo tempo por worker (8)
+    API_ESPERA_FILA          segundos aguardando vaga antes de responder 503 (10)
+    API_CARREGAR_FAQ         "0" para subir sem o vectorstore dos PDFs em data/
+    AGENT_REPOSITORIO        "memoria" (padrão) ou "sqlite"; com SQLite todos os
+                             workers leem e gravam o mesmo banco (AGENT_DB, banco.db)
+    AGENT_DB_POOL            conexões SQLite por worker (4)
+    AGENT_WAL_DIR            diário de transações do repositório em memória; sem ele
+                             saldos e transações se perdem ao reiniciar (um por worker)
+    AGENT_WAL_JANELA_MS      janela do group commit em ms (1)
+    AGENT_WAL_SNAPSHOT       registros entre snapshots do diário (50000)
+    AGENT_MCP_BANKING        comando do servidor MCP da API bancária, iniciado uma
+                             vez por worker (node mcp_servers/banking-api-server.js)
+    AGENT_MCP_TIMEOUT        segundos aguardando uma resposta do servidor MCP (10)
+"""
+import asyncio
+import logging
+import os
+import weakref
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from agent.mcp_conexoes import gerenciador as gerenciador_mcp
+from agent.services import (
+    ativar_diario,
+    consultar_extrato,
+    desativar_diario,
+    exportar_extrato,
+    obter_cliente,
+    pagar_boletos_em_lote,
+    realizar_transferencias_em_lote
+)
+from agent.session_manager import SessionManager
+from agent.session_store import SQLiteSessionStore
+from utils import carregar_base_conhecimento, configurar_logging
+
+load_dotenv()
+configurar_logging()
+logger = logging.getLogger("api")
+
+MAX_TURNOS_SIMULTANEOS = int(os.getenv("API_MAX_TURNOS", "8"))
+ESPERA_FILA = float(os.getenv("API_ESPERA_FILA", "10"))
+
+
+class NovaSessao(BaseModel):
+    cliente_id: str
+    session_id: Optional[str] = None
+
+
+class NovaMensagem(BaseModel):
+    texto: str
+
+
+class Boleto(BaseModel):
+    codigo_barras: str
+    valor: float
+
+
+class Transferencia(BaseModel):
+    destino_id: str
+    valor: float
+
+
+class LoteBoletos(BaseModel):
+    session_id: str
+    boletos: List[Boleto]
+    atomico: bool = True
+
+
+class LoteTransferencias(BaseModel):
+    session_id: str
+    transferencias: List[Transferencia]
+    atomico: bool = True
+
+
+class Recursos:
+    """Estado do worker: sessões vivas, limite de concorrência e turnos em andamento."""
+
+    def __init__(self):
+        self.sessoes: Optional[SessionManager] = None
+        self.vagas = asyncio.Semaphore(MAX_TURNOS_SIMULTANEOS)
+        self.em_andamento = 0
+        self.ocioso = asyncio.Event()
+        self.ocioso.set()
+        self.encerrando = False
+        # Um turno por sessão de cada vez neste worker
+        self._locks_sessao = weakref.WeakValueDictionary()
+
+    def lock_sessao(self, session_id: str) -> asyncio.Lock:
+        lock = self._locks_sessao.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks_sessao[session_id] = lock
+        return lock
+
+    @asynccontextmanager
+    async def vaga(self, session_id: str):
+        """Reserva uma vaga de execução; 503 se o worker está encerrando ou saturado."""
+        if self.encerrando:
+            raise HTTPException(503, "Servidor em encerramento")
+        try:
+            await asyncio.wait_for(self.vagas.acquire(), ESPERA_FILA)
+        except asyncio.TimeoutError:
+            raise HTTPException(503, "Servidor ocupado, tente novamente")
+        self.em_andamento += 1
+        self.ocioso.clear()
+        try:
+            async with self.lock_sessao(session_id):
+                yield
+        finally:
+            self.em_andamento -= 1
+            if self.em_andamento == 0:
+                self.ocioso.set()
+            self.vagas.release()
+
+
+recursos = Recursos()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    vectorstore = None
+    if os.getenv("API_CARREGAR_FAQ", "1") != "0":
+        try:
+            vectorstore = await asyncio.to_thread(carregar_base_conhecimento, "data")
+        except Exception as e:
+            logger.error(f"Erro ao carregar a base de conhecimento: {e}", exc_info=True)
+    recursos.sessoes = SessionManager(vectorstore, SQLiteSessionStore(os.getenv("SESSION_DB", "sessoes.db")))
+    # Recupera saldos e transações do diário antes de aceitar operações
+    await asyncio.to_thread(ativar_diario)
+    yield
+    # Encerramento: recusa novos turnos e espera os que já estão rodando gravarem no store
+    recursos.encerrando = True
+    logger.info("Encerrando; aguardando %d turno(s) em andamento", recursos.em_andamento)
+    await recursos.ocioso.wait()
+    await asyncio.to_thread(desativar_diario)
+    await asyncio.to_thread(gerenciador_mcp.encerrar)
+
+
+app = FastAPI(title="Chat FourBank", lifespan=lifespan)
+
+
+def _carregar_agente(session_id: str):
+    agent = recursos.sessoes.obter(session_id)
+    if agent is None:
+        raise HTTPException(404, "Sessão não encontrada")
+    return agent
+
+
+def _verificar_sessao(cliente_id: str, session_id: str):
+    """A sessão precisa existir e ser do cliente cujos dados serão lidos ou debitados."""
+    agent = _carregar_agente(session_id)
+    if agent.cliente_id != cliente_id:
+        raise HTTPException(403, "A sessão não pertence a este cliente")
+
+
+def _mensagens(agent):
+    return [{"tipo": m.type, "texto": m.content} for m in agent.get_messages()]
+
+
+async def _eventos_do_turno(agent, texto: str):
+    """Roda o turno em um thread e repassa os eventos de ChatAgent.stream ao loop."""
+    loop = asyncio.get_running_loop()
+    fila = asyncio.Queue()
+
+    def produzir():
+        try:
+            for evento in agent.stream(texto):
+                loop.call_soon_threadsafe(fila.put_nowait, evento)
+        except Exception as e:
+            logger.error(f"Erro ao processar mensagem: {e}", exc_info=True)
+            loop.call_soon_threadsafe(fila.put_nowait, {
+                "tipo": "erro",
+                "texto": "Desculpe, ocorreu um erro ao processar sua mensagem. Por favor, tente novamente."
+            })
+        finally:
+            recursos.sessoes.atualizar(agent)
+            loop.call_soon_threadsafe(fila.put_nowait, None)
+
+    tarefa = asyncio.ensure_future(asyncio.to_thread(produzir))
+    while (evento := await fila.get()) is not None:
+        yield evento
+    await tarefa
+
+
+@app.get("/saude")
+async def saude():
+    return {
+        "status": "encerrando" if recursos.encerrando else "ok",
+        "turnos_em_andamento": recursos.em_andamento
+    }
+
+
+@app.get("/estatisticas")
+async def estatisticas():
+    """Sessões vivas neste worker, memória estimada por sessão e contadores de despejo."""
+    return recursos.sessoes.estatisticas()
+
+
+@app.get("/estatisticas/mcp")
+async def estatisticas_mcp():
+    """Processos MCP deste worker: inícios, reinícios, health checks e latência por servidor."""
+    return gerenciador_mcp.estatisticas()
+
+
+@app.post("/sessoes", status_code=201)
+async def criar_sessao(dados: NovaSessao):
+    if await asyncio.to_thread(obter_cliente, dados.cliente_id) is None:
+        raise HTTPException(404, "Cliente não encontrado")
+
+    agent = await asyncio.to_thread(recursos.sessoes.criar, dados.cliente_id, dados.session_id)
+    return {"session_id": agent.session_id, "cliente_id": agent.cliente_id, "mensagens": _mensagens(agent)}
+
+
+@app.get("/sessoes/{session_id}")
+async def obter_sessao(session_id: str):
+    agent = await asyncio.to_thread(_carregar_agente, session_id)
+    return {"session_id": session_id, "cliente_id": agent.cliente_id, "mensagens": _mensagens(agent)}
+
+
+@app.delete("/sessoes/{session_id}", status_code=204)
+async def remover_sessao(session_id: str):
+    await asyncio.to_thread(recursos.sessoes.remover, session_id)
+
+
+@app.post("/sessoes/{session_id}/mensagens")
+async def enviar_mensagem(session_id: str, dados: NovaMensagem):
+    async with recursos.vaga(session_id):
+        agent = await asyncio.to_thread(_carregar_agente, session_id)
+        resposta = None
+        async for evento in _eventos_do_turno(agent, dados.texto):
+            if evento["tipo"] == "erro":
+                raise HTTPException(500, evento["texto"])
+            if evento["tipo"] == "resposta":
+                resposta = evento["texto"]
+    return {"session_id": session_id, "resposta": resposta}
+
+
+@app.get("/clientes/{cliente_id}/extrato")
+async def extrato(
+    cliente_id: str,
+    session_id: str,
+    inicio: Optional[str] = None,
+    fim: Optional[str] = None,
+    tipo: Optional[str] = None,
+    contraparte: Optional[str] = None,
+    limite: int = 20,
+    cursor: Optional[str] = None
+):
+    """Página do extrato (inicio <= data < fim, ISO); repita os filtros com o "cursor" retornado para a próxima."""
+    await asyncio.to_thread(_verificar_sessao, cliente_id, session_id)
+    resultado = await asyncio.to_thread(
+        consultar_extrato, cliente_id, inicio, fim, tipo, contraparte, limite, cursor
+    )
+    if resultado["status"] == "erro":
+        raise HTTPException(404 if resultado["mensagem"] == "Cliente não encontrado" else 422, resultado["mensagem"])
+    return resultado
+
+
+@app.get("/clientes/{cliente_id}/extrato/exportar")
+async def exportar(
+    cliente_id: str,
+    session_id: str,
+    formato: str = "csv",
+    inicio: Optional[str] = None,
+    fim: Optional[str] = None,
+    gzip: bool = False
+):
+    """Download do extrato completo (CSV ou JSON Lines, opcionalmente gzip), gerado enquanto é enviado."""
+    await asyncio.to_thread(_verificar_sessao, cliente_id, session_id)
+    resultado = await asyncio.to_thread(exportar_extrato, cliente_id, formato, inicio, fim, gzip)
+    if resultado["status"] == "erro":
+        raise HTTPException(404 if resultado["mensagem"] == "Cliente não encontrado" else 422, resultado["mensagem"])
+    # O gerador é síncrono: o Starlette o consome em um thread, sem bloquear o loop
+    return StreamingResponse(
+        resultado["conteudo"],
+        media_type=resultado["tipo_conteudo"],
+        headers={"Content-Disposition": f'attachment; filename="{resultado["arquivo"]}"'}
+    )
+
+
+async def _executar_lote(operacao, cliente_id: str, session_id: str, itens: List[BaseModel], atomico: bool) -> dict:
+    """Executa o lote fora do loop; o corpo traz o resultado de cada item, mesmo quando o lote é recusado.
+
+    Todos os itens debitam `cliente_id`, então a sessão precisa ser desse cliente.
+    """
+    if await asyncio.to_thread(obter_cliente, cliente_id) is None:
+        raise HTTPException(404, "Cliente não encontrado")
+    await asyncio.to_thread(_verificar_sessao, cliente_id, session_id)
+    resultado = await asyncio.to_thread(operacao, cliente_id, [item.model_dump() for item in itens], atomico)
+    if "resultados" not in resultado:
+        raise HTTPException(422, resultado["mensagem"])
+    return resultado
+
+
+@app.post("/clientes/{cliente_id}/lotes/boletos")
+async def pagar_lote_boletos(cliente_id: str, dados: LoteBoletos):
+    """Paga até MAX_ITENS_LOTE boletos com um único débito; `atomico` recusa o lote inteiro se um item falhar."""
+    return await _executar_lote(pagar_boletos_em_lote, cliente_id, dados.session_id, dados.boletos, dados.atomico)
+
+
+@app.post("/clientes/{cliente_id}/lotes/transferencias")
+async def transferir_em_lote(cliente_id: str, dados: LoteTransferencias):
+    """Transferências em lote (folha de pagamento): contas travadas uma vez e um único registro no banco."""
+    return await _executar_lote(
+        realizar_transferencias_em_lote, cliente_id, dados.session_id, dados.transferencias, dados.atomico
+    )
+
+
+@app.websocket("/sessoes/{session_id}/stream")
+async def stream_sessao(websocket: WebSocket, session_id: str):
+    """Recebe {"texto": ...} e envia as respostas parciais de cada nó e a resposta final."""
+    await websocket.accept()
+    try:
+        while True:
+            dados = await websocket.receive_json()
+            try:
+                async with recursos.vaga(session_id):
+                    agent = await asyncio.to_thread(_carregar_agente, session_id)
+                    async for evento in _eventos_do_turno(agent, dados.get("texto", "")):
+                        await websocket.send_json(evento)
+            except HTTPException as e:
+                await websocket.send_json({"tipo": "erro", "status": e.status_code, "texto": e.detail})
+                if e.status_code == 404 or recursos.encerrando:
+                    await websocket.close(code=1008 if e.status_code == 404 else 1012)
+                    return
+    except WebSocketDisconnect:
+        pass
@@ -1,17 +1,25 @@
 import os
 import streamlit as st
 import logging
+from datetime import date, datetime, time, timedelta
 from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage, AIMessage
-import glob
 
-from agent import create_agent
-from utils import carregar_faq, carregar_multiplos_faqs
+from agent.exportacao import FORMATOS, TIPO_GZIP
+from agent.services import ativar_diario, exportar_extrato, listar_clientes, obter_cliente, resumo_conta
+from agent.session_manager import SessionManager
+from agent.session_store import SQLiteSessionStore
+from utils import carregar_base_conhecimento, configurar_logging
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+load_dotenv()
+
+configurar_logging()
 logger = logging.getLogger('app')
 
-load_dotenv()
+# O download_button do Streamlit precisa do arquivo inteiro em memória: o período
+# exportado pela interface é limitado; o histórico completo sai em streaming
+# pela API (GET /clientes/{id}/extrato/exportar)
+MAX_DIAS_EXPORTACAO = int(os.getenv("APP_MAX_DIAS_EXPORTACAO", "366"))
 
 st.set_page_config(
     page_title="Chat FourBank",
@@ -91,31 +99,64 @@ st.markdown("""
 if 'cliente_id' not in st.session_state:
     st.session_state.cliente_id = "1"
 
+@st.cache_resource(show_spinner="Carregando base de conhecimento...")
+def obter_base_conhecimento():
+    """Carrega o vectorstore uma única vez por processo, compartilhado por todas as sessões."""
+    return carregar_base_conhecimento("data")
+
 if 'vectorstore' not in st.session_state:
     try:
-        pdf_files = glob.glob(os.path.join("data", "*.pdf"))
-        if pdf_files:
-            with st.spinner("Carregando base de conhecimento..."):
-                if len(pdf_files) == 1:
-                    st.session_state.vectorstore = carregar_faq(pdf_files[0])
-                else:
-                    st.session_state.vectorstore = carregar_multiplos_faqs(pdf_files)
-        else:
+        st.session_state.vectorstore = obter_base_conhecimento()
+        if st.session_state.vectorstore is None:
             st.error("Nenhum arquivo PDF encontrado no diretório 'data'")
-            st.session_state.vectorstore = None
     except Exception as e:
         st.error(f"Erro ao carregar a base de conhecimento: {e}")
         logger.error(f"Erro ao carregar a base de conhecimento: {e}", exc_info=True)
         st.session_state.vectorstore = None
 
-if 'agent' not in st.session_state:
-    st.session_state.agent = create_agent(
-        st.session_state.cliente_id,
-        st.session_state.vectorstore
-    )
+@st.cache_resource
+def obter_session_store():
+    """Session store compartilhado pelo processo; as conversas sobrevivem a reinícios."""
+    return SQLiteSessionStore(os.getenv("SESSION_DB", "sessoes.db"))
+
+@st.cache_resource
+def obter_gerenciador_sessoes(_vectorstore):
+    """Sessões vivas do processo; as ociosas são despejadas para o session store."""
+    return SessionManager(_vectorstore, obter_session_store())
+
+@st.cache_resource
+def obter_diario():
+    """Diário de transações do processo (AGENT_WAL_DIR); recupera saldos e transações na primeira execução."""
+    return ativar_diario()
+
+obter_diario()
+
+@st.cache_data(ttl=300)
+def obter_nomes_clientes():
+    """Nomes para o seletor de clientes, relidos no máximo a cada 5 minutos em vez de a cada rerun."""
+    return {cliente_id: dados["nome"] for cliente_id, dados in listar_clientes()}
+
+def iniciar_sessao(session_id=None):
+    """Cria (ou restaura, se session_id existir no store) a sessão de chat do navegador."""
+    agent = obter_gerenciador_sessoes(st.session_state.vectorstore).criar(st.session_state.cliente_id, session_id)
+    st.session_state.session_id = agent.session_id
+    st.session_state.cliente_id = agent.cliente_id
+    st.session_state.messages = agent.get_messages()
+    st.query_params["sessao"] = agent.session_id
+
+def obter_agente():
+    """Sessão de chat do navegador, restaurada do session store se tiver sido despejada."""
+    agent = obter_gerenciador_sessoes(st.session_state.vectorstore).obter(st.session_state.session_id)
+    if agent is None:
+        iniciar_sessao()
+        agent = obter_gerenciador_sessoes(st.session_state.vectorstore).obter(st.session_state.session_id)
+    return agent
+
+if 'session_id' not in st.session_state:
+    iniciar_sessao(st.query_params.get("sessao"))
 
 if 'messages' not in st.session_state:
-    st.session_state.messages = st.session_state.agent.get_messages()
+    st.session_state.messages = obter_agente().get_messages()
 
 if 'is_processing' not in st.session_state:
     st.session_state.is_processing = False
@@ -123,12 +164,6 @@ if 'is_processing' not in st.session_state:
 if 'sent_message' not in st.session_state:
     st.session_state.sent_message = None
 
-clientes = {
-    "1": {"nome": "João Silva", "saldo": 5000.00, "conta": "12345-6", "tipo": "Conta Corrente"},
-    "2": {"nome": "Maria Santos", "saldo": 8500.00, "conta": "65432-1", "tipo": "Conta Premium"},
-    "3": {"nome": "Carlos Oliveira", "saldo": 2300.00, "conta": "98765-4", "tipo": "Conta Básica"}
-}
-
 def enviar_mensagem(texto):
     if st.session_state.sent_message == texto or st.session_state.is_processing:
         return
@@ -139,8 +174,10 @@ def enviar_mensagem(texto):
     try:
         st.session_state.messages.append(HumanMessage(content=texto))
         with st.spinner(""):
-            resposta = st.session_state.agent.invoke(texto)
-            st.session_state.messages = st.session_state.agent.get_messages()
+            agent = obter_agente()
+            resposta = agent.invoke(texto)
+            obter_gerenciador_sessoes(st.session_state.vectorstore).atualizar(agent)
+            st.session_state.messages = agent.get_messages()
     except Exception as e:
         logger.error(f"Erro ao processar mensagem: {e}", exc_info=True)
         st.session_state.messages.append(
@@ -157,10 +194,13 @@ col1, col2 = st.columns([1, 3])
 
 with col1:
     st.markdown("<h3>Configurações</h3>", unsafe_allow_html=True)
+    # Mesma fonte de dados que o agente usa (agent.services)
+    nomes_clientes = obter_nomes_clientes()
     cliente_selecionado = st.selectbox(
         "Selecione um cliente",
-        options=list(clientes.keys()),
-        format_func=lambda x: f"{clientes[x]['nome']}",
+        options=list(nomes_clientes.keys()),
+        index=list(nomes_clientes.keys()).index(st.session_state.cliente_id),
+        format_func=lambda x: nomes_clientes[x],
         key="cliente_selectbox"
     )
 
@@ -168,21 +208,13 @@ with col1:
         st.session_state.cliente_id = cliente_selecionado
         st.session_state.is_processing = False
         st.session_state.sent_message = None
-        st.session_state.agent = create_agent(
-            st.session_state.cliente_id,
-            st.session_state.vectorstore
-        )
-        st.session_state.messages = st.session_state.agent.get_messages()
+        iniciar_sessao()
         st.rerun()
 
     if st.button("Iniciar chat", key="iniciar_chat"):
         st.session_state.is_processing = False
         st.session_state.sent_message = None
-        st.session_state.agent = create_agent(
-            st.session_state.cliente_id,
-            st.session_state.vectorstore
-        )
-        st.session_state.messages = st.session_state.agent.get_messages()
+        iniciar_sessao()
         st.rerun()
 
     st.markdown("<h3>Ações Rápidas</h3>", unsafe_allow_html=True)
@@ -194,56 +226,102 @@ with col1:
         enviar_mensagem("Gostaria de visualizar o extrato da conta, por favor.")
 
     st.markdown("<h3>Ficha do Cliente</h3>", unsafe_allow_html=True)
-    cliente_atual = clientes[st.session_state.cliente_id]
+    cliente_atual = obter_cliente(st.session_state.cliente_id)
 
     cliente_html = f"""
     <div class="sidebar-card">
         <p><strong>Nome:</strong> {cliente_atual['nome']}</p>
         <p><strong>Conta:</strong> {cliente_atual['conta']}</p>
-        <p><strong>Tipo:</strong> {cliente_atual['tipo']}</p>
+        <p><strong>Tipo:</strong> {cliente_atual.get('tipo') or '-'}</p>
         <p><strong>Desde:</strong> Janeiro 2023</p>
     </div>
     """
     st.markdown(cliente_html, unsafe_allow_html=True)
 
     st.markdown("<h3>Resumo Financeiro</h3>", unsafe_allow_html=True)
+    # Valores mantidos pelos serviços a cada lançamento: ler a cada rerun não percorre o histórico
+    resumo = resumo_conta(st.session_state.cliente_id)
+    fatura = f"R$ {resumo['fatura_atual']:.2f}" if resumo["fatura_atual"] is not None else "-"
+    limite = f"R$ {resumo['limite_disponivel']:.2f}" if resumo["limite_disponivel"] is not None else "-"
     resumo_html = f"""
     <div class="sidebar-card">
         <div style="margin-bottom: 1rem;">
-            <div style="font-size: 1.2rem; font-weight: 600; color: #1f2937;">R$ {cliente_atual['saldo']:.2f}</div>
+            <div style="font-size: 1.2rem; font-weight: 600; color: #1f2937;">R$ {resumo['saldo']:.2f}</div>
             <div style="font-size: 0.8rem; color: #6b7280;">Saldo Disponível</div>
         </div>
         <div style="margin-bottom: 1rem;">
-            <div style="font-size: 1.2rem; font-weight: 600; color: #1f2937;">R$ 1,200.00</div>
+            <div style="font-size: 1.2rem; font-weight: 600; color: #1f2937;">{fatura}</div>
             <div style="font-size: 0.8rem; color: #6b7280;">Fatura do Cartão</div>
         </div>
+        <div style="margin-bottom: 1rem;">
+            <div style="font-size: 1.2rem; font-weight: 600; color: #1f2937;">{limite}</div>
+            <div style="font-size: 0.8rem; color: #6b7280;">Limite Disponível</div>
+        </div>
         <div>
-            <div style="font-size: 1.2rem; font-weight: 600; color: #1f2937;">3</div>
-            <div style="font-size: 0.8rem; color: #6b7280;">Transações Recentes</div>
+            <div style="font-size: 1.2rem; font-weight: 600; color: #1f2937;">{resumo['transacoes_no_mes']}</div>
+            <div style="font-size: 0.8rem; color: #6b7280;">Transações no Mês</div>
         </div>
     </div>
     """
     st.markdown(resumo_html, unsafe_allow_html=True)
 
+    st.markdown("<h3>Exportar Extrato</h3>", unsafe_allow_html=True)
+    formato_exportacao = st.selectbox(
+        "Formato",
+        options=["csv", "jsonl"],
+        format_func=lambda formato: {"csv": "CSV", "jsonl": "JSON Lines"}[formato],
+        key="formato_exportacao"
+    )
+    compactar_exportacao = st.checkbox("Compactar (gzip)", key="compactar_exportacao")
+    hoje = date.today()
+    periodo_exportacao = st.date_input(
+        "Período",
+        value=(hoje - timedelta(days=90), hoje),
+        max_value=hoje,
+        key="periodo_exportacao"
+    )
+    cliente_exportacao = st.session_state.cliente_id
+
+    if len(periodo_exportacao) != 2:
+        st.caption("Escolha a data inicial e a final.")
+    elif (periodo_exportacao[1] - periodo_exportacao[0]).days >= MAX_DIAS_EXPORTACAO:
+        st.caption(
+            f"Pela interface o período é de até {MAX_DIAS_EXPORTACAO} dias; "
+            "o histórico completo pode ser baixado pela API (/clientes/{id}/extrato/exportar)."
+        )
+    else:
+        inicio_exportacao = datetime.combine(periodo_exportacao[0], time.min)
+        fim_exportacao = datetime.combine(periodo_exportacao[1] + timedelta(days=1), time.min)
+
+        def gerar_exportacao():
+            """Monta o arquivo só no clique, fora da execução do script; com gzip fica bem menor."""
+            exportacao = exportar_extrato(
+                cliente_exportacao, formato_exportacao, inicio_exportacao, fim_exportacao, compactar=compactar_exportacao
+            )
+            return b"".join(exportacao["conteudo"]) if exportacao["status"] == "sucesso" else b""
+
+        # Nome e tipo vêm do formato escolhido: nenhum extrato é lido a cada rerun
+        st.download_button(
+            "Baixar Extrato",
+            data=gerar_exportacao,
+            file_name=f"extrato-{cliente_exportacao}.{formato_exportacao}" + (".gz" if compactar_exportacao else ""),
+            mime=TIPO_GZIP if compactar_exportacao else FORMATOS[formato_exportacao],
+            on_click="ignore"
+        )
+
     st.markdown("<div style='margin-top: 30px; text-align: center; font-size: 0.8rem; color: #6b7280;'>Laboratório de Inovação - <a href='#' style='color: #3b82f6; text-decoration: none;'>Foursys</a> | 2025</div>", unsafe_allow_html=True)
 
 with col2:
     if st.button("Novo Chat", type="primary"):
         st.session_state.is_processing = False
         st.session_state.sent_message = None
-        st.session_state.agent = create_agent(
-            st.session_state.cliente_id,
-            st.session_state.vectorstore
-        )
-        st.session_state.messages = st.session_state.agent.get_messages()
+        iniciar_sessao()
         st.rerun()
 
     filtered_messages = []
     prev_content = None
 
     for msg in st.session_state.messages:
-        if hasattr(msg, 'type') and msg.type == 'function':
-            continue
         current_content = msg.content if hasattr(msg, 'content') else None
         if current_content != prev_content:
             filtered_messages.append(msg)
@@ -0,0 +1,231 @@
+"""CPU por turno da análise da mensagem: três varreduras por palavras-chave (antes) x uma única (depois).
+
+O caminho "antes" é uma cópia do classificador, do _extract_topics e do laço de
+temas do responder_generico anteriores à análise única. Com --frases, as
+mensagens vêm do corpus rotulado da carga sintética (benchmarks.sintetico) e
+as intenções classificadas são conferidas com os rótulos.
+
+Uso: python -m benchmarks.bench_analise --repeticoes 20000
+     python -m benchmarks.bench_analise --repeticoes 20000 --frases 5000
+"""
+import argparse
+import re
+import time
+from collections import Counter
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agent.analise import analisar_mensagem
+from agent.entidades import extrair_valor, extrair_periodo, indice_clientes
+from agent.nodes import INTENCOES_LEITURA, classificar_intencao
+from benchmarks.sintetico import CargaSintetica
+
+MENSAGENS = [
+    "qual é o meu saldo?",
+    "quero transferir R$ 250,00 para Maria Santos",
+    "mostra meu saldo e o extrato dos últimos 10",
+    "extrato de março",
+    "pagar a conta de luz de 180 reais",
+    "comprei no restaurante com o cartão 45,90",
+    "analise meu perfil financeiro",
+    "quais documentos são necessários para abrir conta?",
+    "quero saber das taxas de juros do empréstimo consignado",
+    "bom dia, tudo bem?",
+    "quero investir meu dinheiro com bom rendimento",
+    "transferir 100 para a conta 98765-4, depois mostrar o saldo e também o extrato",
+]
+
+_SEPARADOR_LEGADO = re.compile(r",\s+|;\s*|\s+e\s+|\s+depois\s+|\s+também\s+")
+
+_TOPICOS_LEGADO = {
+    "saldo": ["saldo", "disponível", "conta"],
+    "transferencia": ["transferir", "transferência", "enviar"],
+    "extrato": ["extrato", "transações", "histórico"],
+    "boleto": ["boleto", "conta", "fatura"],
+    "cartao": ["cartão", "crédito", "compra"],
+    "perfil": ["perfil", "financeiro", "análise"],
+    "emprestimo": ["empréstimo", "crédito", "financiamento", "consignado", "taxa"],
+    "api": ["api", "integração", "sistema", "ferramenta", "consulta"]
+}
+
+
+def _classificar_trecho_legado(mensagem: str):
+    # Padrões mais sofisticados de dúvidas/perguntas
+    padrao_duvida = any(palavra in mensagem for palavra in [
+        "?", "como", "o que é", "explique", "qual", "quando", "por que", 
+        "dúvida", "pergunta", "pode me informar", "gostaria de saber",
+        "necessário", "necessarios", "documentos", "documentação"
+    ]) or mensagem.isupper()
+    
+    # Classificação baseada em padrões de linguagem natural
+    if any(palavra in mensagem for palavra in ["saldo", "quanto tenho", "disponível", "sobrou", "restante"]):
+        intencao = "consulta_saldo"
+        parametros = {}
+    elif any(palavra in mensagem for palavra in ["transferir", "transferência", "enviar", "mandar", "depositar", "passar", "pix"]):
+        valor = extrair_valor(mensagem)
+        if valor is None:
+            valor = 100
+        
+        # Busca o destinatário pela conta ou pelo nome no índice de clientes
+        destino_id = indice_clientes().resolver(mensagem) or ""
+        
+        parametros = {"valor": valor, "destino_id": destino_id}
+        intencao = "transferencia"
+    elif any(palavra in mensagem for palavra in ["transações", "extrato", "movimentações", "histórico", "atividade"]):
+        parametros = {"limite": 5}
+        parametros.update(extrair_periodo(mensagem))
+        intencao = "extrato"
+    elif any(palavra in mensagem for palavra in ["boleto", "conta", "fatura", "água", "luz", "energia", "internet", "telefone"]) and not padrao_duvida:
+        valor = extrair_valor(mensagem)
+        if valor is None:
+            valor = 150
+        
+        # Identificação mais inteligente do tipo de boleto
+        codigo = "12345678901234567890"
+        if "água" in mensagem:
+            codigo = "76543210987654321098"
+        elif "luz" in mensagem or "energia" in mensagem:
+            codigo = "89123456789012345678"
+        elif "internet" in mensagem:
+            codigo = "45678901234567890123"
+        elif "telefone" in mensagem or "celular" in mensagem:
+            codigo = "32109876543210987654"
+        
+        parametros = {"valor": valor, "codigo_barras": codigo}
+        intencao = "pagamento_boleto"
+    elif any(palavra in mensagem for palavra in ["cartão", "comprar", "compra", "crédito", "débito"]) and not padrao_duvida:
+        valor = extrair_valor(mensagem)
+        if valor is None:
+            valor = 80
+        
+        # Identificar estabelecimento com mais variações
+        estabelecimento = "Estabelecimento"
+        if any(palavra in mensagem for palavra in ["restaurante", "lanchonete", "comida"]):
+            estabelecimento = "Restaurante"
+        elif any(palavra in mensagem for palavra in ["mercado", "supermercado", "compras"]):
+            estabelecimento = "Supermercado"
+        elif any(palavra in mensagem for palavra in ["farmácia", "remédio", "medicamento"]):
+            estabelecimento = "Farmácia"
+        elif any(palavra in mensagem for palavra in ["posto", "gasolina", "combustível"]):
+            estabelecimento = "Posto de Combustível"
+        
+        parametros = {"valor": valor, "estabelecimento": estabelecimento, "cartao_id": "1"}
+        intencao = "pagamento_cartao"
+    elif any(palavra in mensagem for palavra in ["perfil", "comportamento", "análise", "gastos", "financeiro"]):
+        intencao = "perfil"
+        parametros = {}
+    # Priorizar dúvidas sobre outras intenções
+    elif padrao_duvida:
+        intencao = "duvida"
+        parametros = {"query": mensagem}
+    elif any(palavra in mensagem for palavra in [
+        "empréstimo consignado", "emprestimo consignado", "consignado", 
+        "taxas", "juros", "taxa de juros", "elegibilidade", 
+        "posso pegar empréstimo", "aprovação", "consultar", "consulta", 
+        "margem", "margem consignável", "disponibilidade"
+    ]):
+        intencao = "mcp"  # Intenção para processamento via MCP
+        parametros = {"query": mensagem}
+    else:
+        intencao = "outro"
+        parametros = {}
+    
+    return intencao, parametros
+
+def classificar_legado(mensagem):
+    mensagem = mensagem.lower()
+    intencao, parametros = _classificar_trecho_legado(mensagem)
+    intencoes = [{"intencao": intencao, "parametros": parametros, "ordem": 0}]
+    
+    trechos = _SEPARADOR_LEGADO.split(mensagem)
+    if len(trechos) > 1:
+        encontradas = []
+        for trecho in trechos:
+            intencao_trecho, parametros_trecho = _classificar_trecho_legado(trecho)
+            if intencao_trecho == "outro":
+                continue
+            # Consultas repetidas não precisam rodar duas vezes; operações sim
+            if intencao_trecho in INTENCOES_LEITURA and any(e["intencao"] == intencao_trecho for e in encontradas):
+                continue
+            encontradas.append({"intencao": intencao_trecho, "parametros": parametros_trecho, "ordem": len(encontradas)})
+        if len(encontradas) > 1:
+            intencoes = encontradas
+    return intencoes
+
+
+def topicos_legado(mensagem):
+    mensagem = mensagem.lower()
+    return [t for t, palavras in _TOPICOS_LEGADO.items() if any(p in mensagem for p in palavras)]
+
+
+def temas_legado(messages):
+    temas = []
+    for msg in messages[-5:]:
+        if isinstance(msg, HumanMessage):
+            content = msg.content.lower()
+            if any(word in content for word in ["investir", "investimento", "aplicar", "rendimento"]):
+                temas.append("investimentos")
+            elif any(word in content for word in ["empréstimo", "crédito", "financiamento", "emprestar"]):
+                temas.append("empréstimos")
+            elif any(word in content for word in ["cartão", "crédito", "comprar", "compra"]):
+                temas.append("cartões")
+    return temas
+
+
+def turno_antes(mensagem, historico):
+    classificar_legado(mensagem)
+    topicos_legado(mensagem)
+    temas_legado(historico)
+
+
+def turno_depois(mensagem, historico):
+    analise = analisar_mensagem(mensagem)
+    classificar_intencao({"messages": historico, "analise": analise})
+
+
+def medir(turno, repeticoes, mensagens):
+    historico = []
+    for mensagem in mensagens[:4]:
+        historico += [HumanMessage(content=mensagem), AIMessage(content="ok")]
+    inicio = time.process_time()
+    for i in range(repeticoes):
+        mensagem = mensagens[i % len(mensagens)]
+        turno(mensagem, historico + [HumanMessage(content=mensagem)])
+    return (time.process_time() - inicio) / repeticoes * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeticoes", type=int, default=20000)
+    parser.add_argument("--frases", type=int, default=0, help="usa N frases da carga sintética no lugar de MENSAGENS")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    mensagens = MENSAGENS
+    if args.frases:
+        corpus = list(CargaSintetica(seed=args.seed).frases(args.frases))
+        mensagens = [frase["texto"] for frase in corpus]
+        erros = Counter()
+        for frase in corpus:
+            analise = analisar_mensagem(frase["texto"])
+            obtidas = [e["intencao"] for e in classificar_intencao({"messages": [], "analise": analise})["intencoes"]]
+            if obtidas != frase["intencoes"]:
+                erros[("+".join(frase["intencoes"]), "+".join(obtidas))] += 1
+        acertos = len(corpus) - sum(erros.values())
+        print(f"Intenções iguais aos rótulos: {acertos} de {len(corpus)} ({acertos / len(corpus):.1%})")
+        for (esperadas, obtidas), quantidade in erros.most_common(5):
+            print(f"  {quantidade:>5}x {esperadas} -> {obtidas}")
+
+    divergentes = [
+        m for m in mensagens
+        if [e["intencao"] for e in classificar_legado(m)]
+        != [e["intencao"] for e in classificar_intencao({"messages": [], "analise": analisar_mensagem(m)})["intencoes"]]
+    ]
+    print(f"Mensagens com intenções diferentes do classificador antigo: {len(divergentes)} {divergentes[:5]}")
+
+    for nome, turno in (("antes", turno_antes), ("depois", turno_depois)):
+        print(f"{nome}: {medir(turno, args.repeticoes, mensagens):.1f} µs de CPU por turno")
+
+
+if __name__ == "__main__":
+    main()
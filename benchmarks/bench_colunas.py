@@ -0,0 +1,143 @@
+"""Análise de comportamento: loop sobre dicionários (antes) x agregação colunar com NumPy.
+
+Confere que as duas versões produzem o mesmo resultado (arredondado ao
+centavo) para todos os clientes consultados e mede a latência por cliente
+conforme cresce o volume do banco.
+
+Uso: python -m benchmarks.bench_colunas --volumes 1000000 10000000 --legado-ate 1000000
+"""
+import argparse
+import gc
+import random
+import statistics
+import time
+
+from agent.colunas import ColunasTransacoes, resumo_gastos
+from agent.ledger import Ledger
+from benchmarks.bench_ledger import gerar_historico
+
+
+def analisar_legado(ledger, cliente_id):
+    """analisar_comportamento antes das colunas: loop Python sobre os dicionários do cliente."""
+    transacoes_cliente = []
+    for t in ledger.do_cliente(cliente_id):
+        if t.get("tipo") in ["transferência", "pagamento_boleto"] and t.get("origem") == cliente_id:
+            transacoes_cliente.append(t)
+        elif t.get("tipo") == "pagamento_cartao" and t.get("cliente_id") == cliente_id:
+            transacoes_cliente.append(t)
+    if not transacoes_cliente:
+        return None
+
+    total_gastos = 0
+    categorias_boletos = {}
+    categorias_estabelecimentos = {}
+    for t in transacoes_cliente:
+        valor = t.get("valor", 0)
+        total_gastos += valor
+        if t.get("tipo") == "pagamento_boleto":
+            categoria = "Outros"
+            codigo = t.get("codigo_barras", "")
+            if codigo.startswith("765"):
+                categoria = "Água"
+            elif codigo.startswith("891"):
+                categoria = "Energia"
+            item = categorias_boletos.setdefault(categoria, {"quantidade": 0, "valor": 0})
+            item["quantidade"] += 1
+            item["valor"] += valor
+        elif t.get("tipo") == "pagamento_cartao":
+            estabelecimento = t.get("estabelecimento", "Desconhecido")
+            item = categorias_estabelecimentos.setdefault(estabelecimento, {"quantidade": 0, "valor": 0})
+            item["quantidade"] += 1
+            item["valor"] += valor
+
+    def principais(categorias):
+        return dict(sorted(categorias.items(), key=lambda x: x[1]["valor"], reverse=True)[:3])
+
+    return {
+        "total_gastos": total_gastos,
+        "num_transacoes": len(transacoes_cliente),
+        "principais_categorias_boletos": principais(categorias_boletos),
+        "principais_categorias_estabelecimentos": principais(categorias_estabelecimentos),
+        "valor_medio_transacao": total_gastos / len(transacoes_cliente),
+    }
+
+
+def normalizar(resultado):
+    """Arredonda valores ao centavo para comparar as duas versões."""
+    if resultado is None or resultado.get("status") == "info":
+        return None
+    normal = {}
+    for chave in ("total_gastos", "num_transacoes", "valor_medio_transacao",
+                  "principais_categorias_boletos", "principais_categorias_estabelecimentos"):
+        valor = resultado[chave]
+        if isinstance(valor, dict):
+            valor = [(nome, item["quantidade"], round(item["valor"], 2)) for nome, item in valor.items()]
+        elif isinstance(valor, float):
+            valor = round(valor, 2)
+        normal[chave] = valor
+    return normal
+
+
+def medir(funcao, argumentos):
+    tempos = []
+    for argumento in argumentos:
+        inicio = time.perf_counter()
+        funcao(argumento)
+        tempos.append(time.perf_counter() - inicio)
+    tempos.sort()
+    return statistics.median(tempos) * 1e6, tempos[int(len(tempos) * 0.99)] * 1e6
+
+
+class _SoColunas:
+    """Ledger reduzido às colunas, para volumes em que os dicionários não cabem na memória."""
+
+    def __init__(self):
+        self.colunas = ColunasTransacoes()
+
+    def append(self, transacao, epoch):
+        self.colunas.adicionar(transacao, epoch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--volumes", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--clientes", type=int, default=10_000)
+    parser.add_argument("--consultas", type=int, default=500)
+    parser.add_argument("--legado-ate", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    for volume in args.volumes:
+        legado = volume <= args.legado_ate
+        ledger = Ledger() if legado else _SoColunas()
+        inicio = time.perf_counter()
+        gerar_historico(ledger, volume, args.clientes)
+        carga = time.perf_counter() - inicio
+        consultados = [str(rng.randrange(1, args.clientes + 1)) for _ in range(args.consultas)]
+
+        colunas = ledger.colunas
+
+        def analisar_colunar(cliente_id):
+            return resumo_gastos(colunas.do_cliente(cliente_id), colunas.estabelecimentos)
+
+        colunar = medir(analisar_colunar, consultados)
+        linha = (
+            f"{volume:>10} transações (carga {carga:.1f}s, ~{volume // args.clientes} por cliente): "
+            f"colunar p50 {colunar[0]:.0f} µs p99 {colunar[1]:.0f} µs"
+        )
+        if legado:
+            antes = medir(lambda c: analisar_legado(ledger, c), consultados)
+            divergentes = sum(
+                normalizar(analisar_colunar(c)) != normalizar(analisar_legado(ledger, c)) for c in consultados
+            )
+            linha += (
+                f" | loop de dicionários p50 {antes[0]:.0f} µs p99 {antes[1]:.0f} µs"
+                f" | {divergentes} divergências em {len(consultados)} clientes"
+            )
+        print(linha)
+        del ledger, colunas
+        gc.collect()
+
+
+if __name__ == "__main__":
+    main()
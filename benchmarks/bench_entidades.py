@@ -0,0 +1,82 @@
+"""Benchmark da extração de entidades e do índice de clientes, com os clientes da carga sintética.
+
+Antes de medir, confere os períodos extraídos em datas fixas (PERIODOS_ESPERADOS).
+
+Uso: python -m benchmarks.bench_entidades --clientes 1000000 --consultas 20000
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime
+
+from agent.entidades import IndiceClientes, extrair_valor, extrair_periodo
+from benchmarks.sintetico import CargaSintetica
+
+
+# (mensagem, agora, início esperado): "últimos N meses" volta ao mesmo dia, limitado ao fim do mês
+PERIODOS_ESPERADOS = [
+    ("extrato dos últimos 3 meses", datetime(2026, 10, 19, 15, 30), "2026-07-19T00:00:00"),
+    ("últimos 3 meses", datetime(2026, 5, 31, 9), "2026-02-28T00:00:00"),
+    ("ultimos 1 mes", datetime(2024, 3, 31, 9), "2024-02-29T00:00:00"),
+    ("últimos 12 meses", datetime(2026, 1, 15), "2025-01-15T00:00:00"),
+    ("últimos 7 dias", datetime(2026, 10, 19, 8), "2026-10-12T00:00:00"),
+    ("extrato de março", datetime(2026, 10, 19), "2026-03-01T00:00:00"),
+]
+
+
+def conferir_periodos():
+    """Mensagens de PERIODOS_ESPERADOS cujo início extraído difere do esperado."""
+    return [
+        (mensagem, extrair_periodo(mensagem, agora).get("inicio"), esperado)
+        for mensagem, agora, esperado in PERIODOS_ESPERADOS
+        if extrair_periodo(mensagem, agora).get("inicio") != esperado
+    ]
+
+
+def medir(funcao, entradas):
+    tempos = []
+    for entrada in entradas:
+        inicio = time.perf_counter()
+        funcao(entrada)
+        tempos.append(time.perf_counter() - inicio)
+    tempos.sort()
+    return {
+        "media_us": statistics.fmean(tempos) * 1e6,
+        "p50_us": tempos[len(tempos) // 2] * 1e6,
+        "p99_us": tempos[int(len(tempos) * 0.99)] * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clientes", type=int, default=1_000_000)
+    parser.add_argument("--consultas", type=int, default=20_000)
+    args = parser.parse_args()
+
+    divergentes = conferir_periodos()
+    print(f"Períodos diferentes do esperado: {len(divergentes)} {divergentes}")
+
+    inicio = time.perf_counter()
+    clientes = list(CargaSintetica(args.clientes, transacoes=0).clientes())
+    indice = IndiceClientes.de_clientes(clientes)
+    print(f"Índice com {args.clientes} clientes construído em {time.perf_counter() - inicio:.2f}s")
+
+    rng = random.Random(7)
+    amostra = [clientes[rng.randrange(len(clientes))][1] for _ in range(args.consultas)]
+
+    cenarios = {
+        "conta": [f"pix de 50 para a conta {c['conta']}" for c in amostra],
+        "nome_completo": [f"transferir R$ 1.234,56 para {c['nome']}" for c in amostra],
+        "primeiro_nome": [f"manda 20 reais pra {c['nome'].split()[0]}" for c in amostra],
+    }
+    for nome, mensagens in cenarios.items():
+        print(f"resolver/{nome}: {medir(indice.resolver, mensagens)}")
+
+    mensagens = [m for lista in cenarios.values() for m in lista]
+    print(f"extrair_valor: {medir(extrair_valor, mensagens)}")
+    print(f"extrair_periodo: {medir(extrair_periodo, ['extrato de março', 'últimos 30 dias', 'últimas 10'] * 1000)}")
+
+
+if __name__ == "__main__":
+    main()
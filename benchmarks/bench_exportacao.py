@@ -0,0 +1,83 @@
+"""Exportação do extrato em stream x montar o arquivo inteiro na memória.
+
+Um cliente com `--volume` transações exporta o histórico completo em CSV e
+JSON Lines, com e sem gzip, nos dois repositórios. Mede linhas por segundo,
+o tamanho do arquivo e o pico de memória (tracemalloc) do gerador de
+agent.exportacao contra o caminho ingênuo: buscar todas as transações
+(ultimas_transacoes com o volume inteiro), reordenar e formatar tudo em uma
+string só.
+
+Uso: python -m benchmarks.bench_exportacao --volume 200000
+"""
+import argparse
+import gc
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+from agent.exportacao import exportar
+from agent.repositorio import RepositorioMemoria, RepositorioSQLite
+from benchmarks.bench_extrato import historico
+
+
+def _em_memoria(repositorio, volume, formato, compactar):
+    """O caminho ingênuo: a lista inteira e o arquivo inteiro de uma vez."""
+    transacoes = repositorio.ultimas_transacoes("1", volume)[::-1]
+    return len(b"".join(exportar(transacoes, formato, compactar)))
+
+
+def _em_stream(repositorio, volume, formato, compactar):
+    return sum(len(pedaco) for pedaco in exportar(repositorio.iterar_transacoes("1"), formato, compactar))
+
+
+def medir(funcao, *argumentos):
+    """(segundos, bytes gerados, pico de memória em bytes) de uma exportação."""
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    tamanho = funcao(*argumentos)
+    duracao = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duracao, tamanho, pico
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--volume", type=int, default=200_000)
+    args = parser.parse_args()
+    volume = args.volume
+
+    diretorio = tempfile.mkdtemp(prefix="bench_exportacao_")
+    try:
+        repositorios = {
+            "memoria": RepositorioMemoria(cartoes={}),
+            "sqlite": RepositorioSQLite(os.path.join(diretorio, "banco.db")),
+        }
+        for nome, repositorio in repositorios.items():
+            repositorio.importar(transacoes=historico(volume))
+            for formato in ("csv", "jsonl"):
+                for compactar in (False, True):
+                    rotulo = f"{nome:<8} {formato:<5} {'gzip' if compactar else '    '}"
+                    # Sem tracemalloc para a vazão; o pico vem de uma segunda execução rastreada
+                    inicio = time.perf_counter()
+                    tamanho = _em_stream(repositorio, volume, formato, compactar)
+                    duracao = time.perf_counter() - inicio
+                    _, _, pico = medir(_em_stream, repositorio, volume, formato, compactar)
+                    linha = (
+                        f"{rotulo} stream {volume / duracao:>9.0f} linhas/s {tamanho / 1e6:7.1f} MB "
+                        f"pico {pico / 1e6:6.2f} MB"
+                    )
+                    if not compactar:
+                        _, _, pico_ingenuo = medir(_em_memoria, repositorio, volume, formato, compactar)
+                        linha += f" | tudo em memória: pico {pico_ingenuo / 1e6:7.1f} MB"
+                    print(linha)
+            repositorio.fechar()
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Extrato paginado: custo da página N com cursor (keyset) x deslocamento (OFFSET).
+
+Um cliente com um histórico longo pagina o extrato de `--pagina` em
+`--pagina` transações. Mede a página 1, 50 e 500 seguindo o cursor e
+recalculando pelo deslocamento (as primeiras N * página transações
+descartadas), nos dois repositórios, e o "extrato de março" pelo intervalo
+do índice contra a varredura do histórico do cliente.
+
+Uso: python -m benchmarks.bench_extrato --volume 200000 --pagina 20
+"""
+import argparse
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+from agent.ledger import epoch_us
+from agent.repositorio import RepositorioMemoria, RepositorioSQLite, _transacao_de_linha
+from benchmarks.bench_colunas import medir
+
+PAGINAS = (1, 50, 500)
+
+_SQL_OFFSET = (
+    "SELECT t.id, t.data, t.tipo, t.origem, t.destino, t.cliente_id, t.cartao_id, t.estabelecimento, "
+    "t.codigo_barras, t.valor FROM extrato e JOIN transacoes t ON t.seq = e.seq "
+    "WHERE e.cliente_id = ? ORDER BY e.epoch DESC, e.seq DESC LIMIT ? OFFSET ?"
+)
+
+
+def historico(volume):
+    """Transações do cliente "1" com os clientes 2..4, uma a cada 5 minutos a partir de 2024."""
+    inicio = datetime(2024, 1, 1)
+    for i in range(volume):
+        data = (inicio + timedelta(minutes=5 * i)).isoformat()
+        if i % 3 == 0:
+            yield {"id": i, "data": data, "tipo": "pagamento_boleto", "origem": "1",
+                   "codigo_barras": "76543210987654321098", "valor": float(1 + i % 200)}
+        else:
+            yield {"id": i, "data": data, "tipo": "transferência", "origem": "1",
+                   "destino": str(2 + i % 3), "valor": float(1 + i % 200)}
+
+
+def cursores(repositorio, pagina, ate):
+    """Cursor do início de cada página, seguindo a paginação desde a primeira."""
+    encontrados = {1: None}
+    cursor = None
+    for numero in range(2, ate + 1):
+        _, cursor = repositorio.extrato("1", pagina, antes=cursor)
+        encontrados[numero] = cursor
+    return encontrados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--volume", type=int, default=200_000)
+    parser.add_argument("--pagina", type=int, default=20)
+    parser.add_argument("--repeticoes", type=int, default=200)
+    args = parser.parse_args()
+
+    diretorio = tempfile.mkdtemp(prefix="bench_extrato_")
+    try:
+        repositorios = {
+            "memoria": RepositorioMemoria(cartoes={}),
+            "sqlite": RepositorioSQLite(os.path.join(diretorio, "banco.db")),
+        }
+        for nome, repositorio in repositorios.items():
+            repositorio.importar(transacoes=historico(args.volume))
+            inicio_pagina = cursores(repositorio, args.pagina, max(PAGINAS))
+
+            for numero in PAGINAS:
+                cursor = inicio_pagina[numero]
+                keyset = medir(lambda _: repositorio.extrato("1", args.pagina, antes=cursor), range(args.repeticoes))
+                deslocamento = (numero - 1) * args.pagina
+                if nome == "memoria":
+                    def offset(_):
+                        return repositorio.ultimas_transacoes("1", deslocamento + args.pagina)[deslocamento:]
+                else:
+                    def offset(_):
+                        with repositorio._conexao() as conexao:
+                            linhas = conexao.execute(_SQL_OFFSET, ("1", args.pagina, deslocamento)).fetchall()
+                        return [_transacao_de_linha(linha) for linha in linhas]
+                por_offset = medir(offset, range(args.repeticoes))
+                print(
+                    f"{nome:<8} página {numero:>3}: cursor p50 {keyset[0]:8.1f} µs p99 {keyset[1]:8.1f} µs | "
+                    f"offset p50 {por_offset[0]:8.1f} µs p99 {por_offset[1]:8.1f} µs"
+                )
+
+            inicio, fim = datetime(2024, 3, 1), datetime(2024, 4, 1)
+            marco = medir(
+                lambda _: repositorio.extrato("1", args.pagina, inicio=epoch_us(inicio), fim=epoch_us(fim)),
+                range(args.repeticoes)
+            )
+            print(f"{nome:<8} extrato de março (1ª página): p50 {marco[0]:.1f} µs p99 {marco[1]:.1f} µs")
+            if nome == "memoria":
+                inicio_iso, fim_iso = inicio.isoformat(), fim.isoformat()
+                varredura = medir(
+                    lambda _: [t for t in repositorio.transacoes.do_cliente("1") if inicio_iso <= t["data"] < fim_iso][::-1][:args.pagina],
+                    range(min(args.repeticoes, 20))
+                )
+                print(f"{'':<8} varredura do histórico do cliente: p50 {varredura[0]:.1f} µs")
+            repositorio.fechar()
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Latência do extrato ("últimas N") e da análise de perfil conforme cresce o volume do banco.
+
+Compara a varredura da lista global (como era buscar_transacoes) com o
+Ledger indexado por cliente, em históricos sintéticos de até 10M transações.
+
+Uso: python -m benchmarks.bench_ledger --volumes 100000 1000000 10000000 --legado-ate 1000000
+"""
+import argparse
+import gc
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from agent import services
+from agent.ledger import Ledger, epoch_us
+from agent.repositorio import RepositorioMemoria
+
+TIPOS = ("transferência", "pagamento_boleto", "pagamento_cartao")
+ESTABELECIMENTOS = ("Restaurante", "Supermercado", "Farmácia", "Posto de Combustível")
+
+
+def gerar_historico(ledger, volume, clientes, seed=42):
+    """Preenche o ledger com transações em ordem de data, distribuídas entre os clientes."""
+    rng = random.Random(seed)
+    ids = [str(i) for i in range(1, clientes + 1)]
+    inicio = datetime(2024, 1, 1)
+    epoch_inicial = epoch_us(inicio)
+    # Datas ISO compartilhadas por minuto para caber 10M transações em memória
+    data = inicio.isoformat()
+    for i in range(volume):
+        epoch = epoch_inicial + i * 1_000_000
+        if i % 60 == 0:
+            data = (inicio + timedelta(seconds=i)).isoformat()
+        tipo = TIPOS[i % 3]
+        origem = ids[rng.randrange(clientes)]
+        if tipo == "pagamento_cartao":
+            transacao = {"id": i, "data": data, "tipo": tipo, "cliente_id": origem,
+                         "estabelecimento": ESTABELECIMENTOS[i % 4], "valor": float(i % 500)}
+        elif tipo == "pagamento_boleto":
+            transacao = {"id": i, "data": data, "tipo": tipo, "origem": origem,
+                         "codigo_barras": "76543210987654321098", "valor": float(i % 500)}
+        else:
+            transacao = {"id": i, "data": data, "tipo": tipo, "origem": origem,
+                         "destino": ids[rng.randrange(clientes)], "valor": float(i % 500)}
+        ledger.append(transacao, epoch)
+
+
+def buscar_legado(lista, cliente_id, limite=5):
+    """buscar_transacoes antes do Ledger: varre e ordena todas as transações do banco."""
+    transacoes_cliente = [
+        t for t in lista
+        if t.get("origem") == cliente_id or t.get("destino") == cliente_id or t.get("cliente_id") == cliente_id
+    ]
+    transacoes_cliente.sort(key=lambda x: x["data"], reverse=True)
+    return transacoes_cliente[:limite]
+
+
+def medir(funcao, argumentos):
+    tempos = []
+    for argumento in argumentos:
+        inicio = time.perf_counter()
+        funcao(argumento)
+        tempos.append(time.perf_counter() - inicio)
+    tempos.sort()
+    return statistics.fmean(tempos) * 1e6, tempos[int(len(tempos) * 0.99)] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--volumes", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--clientes", type=int, default=100_000)
+    parser.add_argument("--consultas", type=int, default=2000)
+    parser.add_argument("--legado-ate", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    for volume in args.volumes:
+        ledger = Ledger()
+        inicio = time.perf_counter()
+        gerar_historico(ledger, volume, args.clientes)
+        carga = time.perf_counter() - inicio
+        consultados = [str(rng.randrange(1, args.clientes + 1)) for _ in range(args.consultas)]
+
+        services.repositorio = RepositorioMemoria(transacoes=ledger)
+        ultimas = medir(lambda c: services.buscar_transacoes(c, 5), consultados)
+        perfil = medir(services.analisar_comportamento, consultados)
+        print(
+            f"{volume:>10} transações (carga {carga:.1f}s): "
+            f"últimas 5 média {ultimas[0]:.1f} µs p99 {ultimas[1]:.1f} µs | "
+            f"perfil média {perfil[0]:.1f} µs p99 {perfil[1]:.1f} µs"
+        )
+        if volume <= args.legado_ate:
+            # A lista global de dicionários que o serviço varria antes do Ledger
+            lista = list(ledger)
+            legado = medir(lambda c: buscar_legado(lista, c), consultados[:20])
+            del lista
+            print(f"{'':>10} varredura global (antes): últimas 5 média {legado[0] / 1000:.1f} ms")
+        del ledger
+        services.repositorio = None
+        gc.collect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Pagamentos e transferências em lote x uma chamada por item.
+
+Paga os mesmos boletos e faz a mesma folha de transferências item a item
+(pagar_boleto / realizar_transferencia) e com uma chamada em lote, no
+repositório em memória, em memória com o diário e no SQLite. Mostra itens
+por segundo, fsyncs do diário e confere que o dinheiro se conserva: a soma
+dos saldos só cai pelo total dos boletos pagos.
+
+Uso: python -m benchmarks.bench_lote --itens 500 --rodadas 5
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from agent import services
+from agent.repositorio import RepositorioMemoria, RepositorioSQLite
+from agent.travas import TravasContas
+
+SALDO_PAGADOR = 10_000_000
+SALDO_INICIAL = 1000
+
+
+def _boletos(itens):
+    return [{"codigo_barras": f"{765 + i % 4}{i:017d}", "valor": 10 + i % 90 + 0.5} for i in range(itens)]
+
+
+def _folha(itens, clientes):
+    return [{"destino_id": str(2 + i % (clientes - 1)), "valor": 100 + i % 50} for i in range(itens)]
+
+
+def _item_a_item(boletos, folha):
+    for boleto in boletos:
+        assert services.pagar_boleto("1", boleto["codigo_barras"], boleto["valor"])["status"] == "sucesso"
+    for item in folha:
+        assert services.realizar_transferencia("1", item["destino_id"], item["valor"])["status"] == "sucesso"
+
+
+def _em_lote(boletos, folha):
+    assert services.pagar_boletos_em_lote("1", boletos)["status"] == "sucesso"
+    assert services.realizar_transferencias_em_lote("1", folha)["status"] == "sucesso"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--itens", type=int, default=500, help="boletos e transferências por rodada")
+    parser.add_argument("--clientes", type=int, default=200)
+    parser.add_argument("--rodadas", type=int, default=5)
+    args = parser.parse_args()
+
+    boletos = _boletos(args.itens)
+    folha = _folha(args.itens, args.clientes)
+    total_boletos = sum(b["valor"] for b in boletos) * args.rodadas
+
+    diretorio = tempfile.mkdtemp(prefix="bench_lote_")
+    originais = (services.repositorio, services.travas, services.diario)
+    try:
+        for backend in ("memoria", "memoria+diario", "sqlite"):
+            for modo, executar in (("item a item", _item_a_item), ("em lote", _em_lote)):
+                caminho = os.path.join(diretorio, f"{backend}-{modo.replace(' ', '_')}")
+                clientes = {
+                    str(i): {"nome": f"Cliente {i}", "saldo": SALDO_PAGADOR if i == 1 else SALDO_INICIAL,
+                             "conta": f"{i:05d}-0", "tipo": "Conta Corrente"}
+                    for i in range(1, args.clientes + 1)
+                }
+                if backend == "sqlite":
+                    repositorio = RepositorioSQLite(caminho + ".db", semear=False)
+                    repositorio.importar(clientes=clientes.items())
+                else:
+                    repositorio = RepositorioMemoria(clientes=clientes, cartoes={})
+                services.repositorio, services.travas, services.diario = repositorio, TravasContas(), None
+                if backend == "memoria+diario":
+                    services.ativar_diario(caminho, snapshot_a_cada=10**9)
+                soma_inicial = sum(dados["saldo"] for _, dados in services.listar_clientes())
+
+                inicio = time.perf_counter()
+                for _ in range(args.rodadas):
+                    executar(boletos, folha)
+                duracao = time.perf_counter() - inicio
+
+                fsyncs = services.diario.estatisticas()["fsyncs"] if services.diario is not None else 0
+                services.desativar_diario()
+                soma_final = sum(dados["saldo"] for _, dados in services.listar_clientes())
+                conservado = abs(soma_inicial - total_boletos - soma_final) < 0.01
+                itens = 2 * args.itens * args.rodadas
+                print(
+                    f"{backend:<15} {modo:<12} {itens / duracao:>10.0f} itens/s"
+                    + (f" | {fsyncs} fsyncs" if backend == "memoria+diario" else "")
+                    + f" | saldos {'conservados' if conservado else 'DIVERGENTES'}"
+                )
+                repositorio.fechar()
+    finally:
+        services.repositorio, services.travas, services.diario = originais
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Servidor MCP por agente x um processo compartilhado pelo GerenciadorMCP.
+
+`--sessoes` agentes fazem `--chamadas` chamadas de ferramenta cada, em
+`--threads` threads. Antes, cada agente iniciava o próprio processo e o
+deixava vivo até o fim da sessão; depois, todos usam a conexão do
+gerenciador. Mede processos iniciados, filhos vivos no pico, tempo gasto
+iniciando servidores e a latência por chamada.
+
+O servidor padrão é o substituto em Python (mcp_servers/banking_api_server.py),
+que roda sem o SDK do Node; `--comando` troca o servidor. Com `--npx`, compara
+também o tempo de subida do `node` direto com o `npx -y node`.
+
+Uso: python -m benchmarks.bench_mcp --sessoes 100 --chamadas 20 --threads 8
+"""
+import argparse
+import logging
+import shlex
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agent.mcp_conexoes import ConexaoMCP, GerenciadorMCP
+
+COMANDO_PYTHON = [sys.executable, "mcp_servers/banking_api_server.py"]
+
+CHAMADA = ("tools/call", {"name": "get_loan_rates", "arguments": {"tipo_emprestimo": "consignado"}})
+
+
+def _percentis(latencias):
+    latencias = sorted(latencias)
+    return [latencias[min(len(latencias) - 1, len(latencias) * p // 100)] * 1000 for p in (50, 99)]
+
+
+def _sessao(requisitar, chamadas, latencias):
+    for _ in range(chamadas):
+        inicio = time.perf_counter()
+        requisitar(*CHAMADA)
+        latencias.append(time.perf_counter() - inicio)
+
+
+def um_processo_por_agente(comando, args):
+    conexoes, latencias = [], []
+    lock = threading.Lock()
+    inicio_total = [0.0]
+
+    def agente(_):
+        conexao = ConexaoMCP("banking", comando)
+        inicio = time.perf_counter()
+        conexao.iniciar()
+        with lock:
+            inicio_total[0] += time.perf_counter() - inicio
+            conexoes.append(conexao)
+        _sessao(conexao.requisitar, args.chamadas, latencias)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as executor:
+        list(executor.map(agente, range(args.sessoes)))
+    duracao = time.perf_counter() - inicio
+    vivos = sum(1 for conexao in conexoes if conexao.viva)
+    for conexao in conexoes:
+        conexao.encerrar()
+    return duracao, len(conexoes), vivos, inicio_total[0], latencias
+
+
+def processo_compartilhado(comando, args):
+    gerenciador = GerenciadorMCP({"banking": comando})
+    latencias = []
+
+    def agente(_):
+        _sessao(lambda metodo, params: gerenciador.requisitar("banking", metodo, params), args.chamadas, latencias)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as executor:
+        list(executor.map(agente, range(args.sessoes)))
+    duracao = time.perf_counter() - inicio
+    estatisticas = gerenciador.estatisticas()
+    gerenciador.encerrar()
+    conexao = estatisticas["servidores"]["banking"]
+    return (
+        duracao, estatisticas["processos_iniciados"], estatisticas["processos_vivos"],
+        conexao["inicializacao_ms"] / 1000, latencias
+    )
+
+
+def subida(comando, repeticoes=5):
+    """Tempo médio (ms) para um comando terminar, sem carregar nada."""
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        subprocess.run(comando, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - inicio) / repeticoes * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessoes", type=int, default=100)
+    parser.add_argument("--chamadas", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--comando", help="comando do servidor MCP (padrão: o substituto em Python)")
+    parser.add_argument("--npx", action="store_true", help="compara a subida do node direto com npx -y node")
+    args = parser.parse_args()
+    # O aviso de subida que cada servidor escreve no stderr
+    logging.getLogger("agent.mcp_conexoes").setLevel(logging.ERROR)
+    comando = shlex.split(args.comando) if args.comando else COMANDO_PYTHON
+
+    for rotulo, cenario in (("por agente", um_processo_por_agente), ("compartilhado", processo_compartilhado)):
+        duracao, iniciados, vivos, subindo, latencias = cenario(comando, args)
+        p50, p99 = _percentis(latencias)
+        print(
+            f"{rotulo:<14} {len(latencias) / duracao:7.0f} chamadas/s | {iniciados:4d} processos iniciados "
+            f"({subindo * 1000:7.0f} ms somados subindo), {vivos:4d} vivos no fim | chamada p50 {p50:.3f} ms p99 {p99:.3f} ms"
+        )
+
+    if args.npx:
+        if not (shutil.which("node") and shutil.which("npx")):
+            print("node/npx não encontrados")
+            return
+        print(f"subida do node direto: {subida(['node', '-e', '0']):.0f} ms")
+        print(f"subida com npx -y node: {subida(['npx', '-y', 'node', '-e', '0']):.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Vazão do cliente JSON-RPC multiplexado contra o servidor MCP em Python.
+
+Faz `--requisicoes` chamadas de ferramenta ao substituto local do servidor
+(mcp_servers/banking_api_server.py) por um único pipe, variando quantas ficam
+em andamento ao mesmo tempo: uma por vez (o comportamento do cliente antigo),
+várias pela API asyncio, em batches JSON-RPC e pela interface síncrona com
+várias threads. Mede chamadas por segundo e a latência de cada chamada.
+
+Uso: python -m benchmarks.bench_mcp_multiplexado --requisicoes 20000
+"""
+import argparse
+import asyncio
+import logging
+import shlex
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agent.mcp_conexoes import ClienteJsonRpc, ConexaoMCP
+
+COMANDO_PYTHON = [sys.executable, "mcp_servers/banking_api_server.py"]
+
+CHAMADA = ("tools/call", {"name": "get_loan_rates", "arguments": {"tipo_emprestimo": "consignado"}})
+
+
+def _percentis(latencias):
+    latencias = sorted(latencias)
+    return [latencias[min(len(latencias) - 1, len(latencias) * p // 100)] * 1000 for p in (50, 99)]
+
+
+async def _em_andamento(cliente, total, concorrencia, latencias):
+    """`concorrencia` tarefas fazendo chamadas até completar `total`."""
+    restantes = iter(range(total))
+
+    async def trabalhador():
+        for _ in restantes:
+            inicio = time.perf_counter()
+            await cliente.requisitar(*CHAMADA)
+            latencias.append(time.perf_counter() - inicio)
+
+    await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+
+
+async def _em_lotes(cliente, total, tamanho, latencias):
+    for inicio_lote in range(0, total, tamanho):
+        inicio = time.perf_counter()
+        resultados = await cliente.lote([CHAMADA] * min(tamanho, total - inicio_lote))
+        duracao = time.perf_counter() - inicio
+        latencias.extend([duracao] * len(resultados))
+
+
+async def cenarios_async(comando, total, concorrencias, lotes):
+    cliente = ClienteJsonRpc("banking", comando)
+    await cliente.iniciar()
+    try:
+        for concorrencia in concorrencias:
+            latencias = []
+            inicio = time.perf_counter()
+            await _em_andamento(cliente, total, concorrencia, latencias)
+            yield f"asyncio, {concorrencia:>3} em andamento", time.perf_counter() - inicio, latencias
+        for tamanho in lotes:
+            latencias = []
+            inicio = time.perf_counter()
+            await _em_lotes(cliente, total, tamanho, latencias)
+            yield f"batch de {tamanho:>3}", time.perf_counter() - inicio, latencias
+    finally:
+        await cliente.encerrar()
+
+
+def cenarios_sync(comando, total, threads):
+    conexao = ConexaoMCP("banking", comando)
+    conexao.iniciar()
+    try:
+        for quantidade in threads:
+            latencias = []
+
+            def chamar(_):
+                inicio = time.perf_counter()
+                conexao.requisitar(*CHAMADA)
+                latencias.append(time.perf_counter() - inicio)
+
+            inicio = time.perf_counter()
+            with ThreadPoolExecutor(quantidade) as executor:
+                list(executor.map(chamar, range(total)))
+            yield f"síncrono, {quantidade:>3} threads", time.perf_counter() - inicio, latencias
+    finally:
+        conexao.encerrar()
+
+
+def _imprimir(rotulo, duracao, latencias):
+    p50, p99 = _percentis(latencias)
+    print(f"{rotulo:<28} {len(latencias) / duracao:8.0f} chamadas/s | chamada p50 {p50:7.3f} ms p99 {p99:7.3f} ms")
+
+
+async def _imprimir_async(comando, args):
+    async for resultado in cenarios_async(comando, args.requisicoes, args.concorrencia, args.lotes):
+        _imprimir(*resultado)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requisicoes", type=int, default=20_000)
+    parser.add_argument("--concorrencia", type=int, nargs="+", default=[1, 8, 64, 256])
+    parser.add_argument("--lotes", type=int, nargs="+", default=[16, 128])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--comando", help="comando do servidor MCP (padrão: o substituto em Python)")
+    args = parser.parse_args()
+    # O aviso de subida que o servidor escreve no stderr
+    logging.getLogger("agent.mcp_conexoes").setLevel(logging.ERROR)
+    comando = shlex.split(args.comando) if args.comando else COMANDO_PYTHON
+
+    asyncio.run(_imprimir_async(comando, args))
+    for resultado in cenarios_sync(comando, args.requisicoes, args.threads):
+        _imprimir(*resultado)
+
+
+if __name__ == "__main__":
+    main()
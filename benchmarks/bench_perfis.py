@@ -0,0 +1,91 @@
+"""Perfil de gastos: agregados incrementais x recálculo completo sobre as colunas.
+
+Mede a consulta do perfil (analisar_comportamento) com os agregados mantidos
+na escrita e com o recálculo vetorizado, o custo extra por lançamento e roda o
+verificador de consistência sobre todos os clientes. Os cartões usam muitos
+estabelecimentos e alguns estornos (valores negativos) para exercitar o top-K.
+
+Uso: python -m benchmarks.bench_perfis --volume 1000000 --clientes 10000
+"""
+import argparse
+import random
+import time
+
+from agent import services
+from agent.colunas import resumo_gastos
+from agent.ledger import Ledger, epoch_us
+from agent.repositorio import RepositorioMemoria
+from agent.perfis import PerfisGastos, verificar_perfis
+from benchmarks.bench_colunas import medir
+from benchmarks.bench_ledger import gerar_historico
+
+CODIGOS = ("76543210987654321098", "89123456789012345678", "12345678901234567890")
+
+
+def lancamentos_variados(ledger, quantidade, clientes, estabelecimentos, seed=3):
+    """Boletos de todas as categorias e cartões em muitos estabelecimentos, com estornos ocasionais."""
+    rng = random.Random(seed)
+    epoch = epoch_us("2025-01-01T00:00:00")
+    for i in range(quantidade):
+        cliente = str(rng.randrange(1, clientes + 1))
+        valor = round(rng.uniform(-50, 500) if rng.random() < 0.05 else rng.uniform(0.01, 500), 2)
+        if i % 2:
+            transacao = {"id": f"v{i}", "data": "2025-01-01T00:00:00", "tipo": "pagamento_cartao",
+                         "cliente_id": cliente, "estabelecimento": f"Loja {rng.randrange(estabelecimentos)}",
+                         "valor": valor}
+        else:
+            transacao = {"id": f"v{i}", "data": "2025-01-01T00:00:00", "tipo": "pagamento_boleto",
+                         "origem": cliente, "codigo_barras": rng.choice(CODIGOS), "valor": valor}
+        ledger.append(transacao, epoch + i)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--volume", type=int, default=1_000_000)
+    parser.add_argument("--clientes", type=int, default=10_000)
+    parser.add_argument("--variados", type=int, default=200_000)
+    parser.add_argument("--estabelecimentos", type=int, default=40)
+    parser.add_argument("--consultas", type=int, default=2000)
+    args = parser.parse_args()
+
+    original = services.repositorio
+    try:
+        ledger = Ledger()
+        services.repositorio = RepositorioMemoria(transacoes=ledger)
+        inicio = time.perf_counter()
+        gerar_historico(ledger, args.volume, args.clientes)
+        lancamentos_variados(ledger, args.variados, args.clientes, args.estabelecimentos)
+        carga = time.perf_counter() - inicio
+        total = args.volume + args.variados
+        print(f"{total} lançamentos em {carga:.1f}s ({carga / total * 1e6:.1f} µs por lançamento, com agregados)")
+
+        separados = PerfisGastos()
+        inicio = time.perf_counter()
+        for transacao in ledger[:100_000]:
+            separados.registrar(transacao)
+        print(f"atualização dos agregados: {(time.perf_counter() - inicio) / 100_000 * 1e6:.1f} µs por lançamento")
+
+        rng = random.Random(7)
+        consultados = [str(rng.randrange(1, args.clientes + 1)) for _ in range(args.consultas)]
+        incremental = medir(services.analisar_comportamento, consultados)
+        colunas = ledger.colunas
+        completo = medir(lambda c: resumo_gastos(colunas.do_cliente(c), colunas.estabelecimentos), consultados)
+        print(
+            f"perfil incremental p50 {incremental[0]:.1f} µs p99 {incremental[1]:.1f} µs | "
+            f"recálculo p50 {completo[0]:.1f} µs p99 {completo[1]:.1f} µs"
+        )
+
+        inicio = time.perf_counter()
+        divergencias = verificar_perfis(ledger.perfis, colunas)
+        print(
+            f"verificação de {len(ledger.perfis)} clientes em {time.perf_counter() - inicio:.1f}s: "
+            f"{len(divergencias)} divergências"
+        )
+        for divergencia in divergencias[:3]:
+            print(divergencia)
+    finally:
+        services.repositorio = original
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Registros compactos (Transacao) x dicionários: bytes por transação, ordenação e agregação.
+
+Gera transações como os serviços produzem (UUID, data ISO, valor float) e
+mede a memória de guardá-las como dicionários e como Transacao (centavos,
+epoch em µs, tipo em código, ids internados), a memória do Ledger inteiro
+(índices, colunas e perfis incluídos), ordenar por data (texto ISO x
+inteiro), somar valores (float x centavos, com o erro acumulado) e o custo
+de voltar ao dicionário na saída.
+
+Uso: python -m benchmarks.bench_registros --volume 1000000
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from agent.ledger import Ledger, Transacao, epoch_us
+
+
+def gerar(volume, clientes=10_000, seed=42):
+    rng = random.Random(seed)
+    ids = [str(i) for i in range(1, clientes + 1)]
+    inicio = datetime(2024, 1, 1)
+    transacoes = []
+    for i in range(volume):
+        data = (inicio + timedelta(seconds=37 * i, microseconds=rng.randrange(1_000_000))).isoformat()
+        valor = rng.randrange(1, 50_000) / 100
+        origem = ids[rng.randrange(clientes)]
+        if i % 3 == 0:
+            transacao = {"id": str(uuid.UUID(int=rng.getrandbits(128))), "data": data, "tipo": "transferência",
+                         "origem": origem, "destino": ids[rng.randrange(clientes)], "valor": valor}
+        elif i % 3 == 1:
+            transacao = {"id": str(uuid.UUID(int=rng.getrandbits(128))), "data": data, "tipo": "pagamento_boleto",
+                         "origem": origem, "codigo_barras": "76543210987654321098", "valor": valor}
+        else:
+            transacao = {"id": str(uuid.UUID(int=rng.getrandbits(128))), "data": data, "tipo": "pagamento_cartao",
+                         "cliente_id": origem, "cartao_id": "1", "estabelecimento": "Farmácia", "valor": valor}
+        transacoes.append(transacao)
+    return transacoes
+
+
+def memoria(construir, volume):
+    """Bytes por transação retidos pelo que `construir` devolve (geração dos dicionários incluída)."""
+    gc.collect()
+    tracemalloc.start()
+    resultado = construir(gerar(volume))
+    gc.collect()
+    atual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del resultado
+    gc.collect()
+    return atual / volume
+
+
+def cronometrar(funcao, repeticoes=3):
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--volume", type=int, default=1_000_000)
+    args = parser.parse_args()
+    volume = args.volume
+
+    def so_registros(transacoes):
+        registros = [Transacao(t, epoch_us(t["data"])) for t in transacoes]
+        transacoes.clear()
+        return registros
+
+    def ledger(transacoes):
+        livro = Ledger()
+        livro.extend(transacoes)
+        transacoes.clear()
+        return livro
+
+    print(f"{volume} transações")
+    print(f"  dicionários:         {memoria(lambda t: t, volume):6.0f} bytes/transação")
+    print(f"  Transacao:           {memoria(so_registros, volume):6.0f} bytes/transação")
+    print(f"  Ledger completo:     {memoria(ledger, volume):6.0f} bytes/transação")
+
+    transacoes = gerar(volume)
+    registros = [Transacao(t, epoch_us(t["data"])) for t in transacoes]
+    embaralhados = list(zip(transacoes, registros))
+    random.Random(1).shuffle(embaralhados)
+    dicts = [t for t, _ in embaralhados]
+    compactos = [r for _, r in embaralhados]
+
+    ordenar_iso = cronometrar(lambda: sorted(dicts, key=lambda t: t["data"]))
+    ordenar_epoch = cronometrar(lambda: sorted(compactos, key=lambda r: r.epoch))
+    print(f"  ordenar por data:    ISO {ordenar_iso * 1000:.0f} ms | epoch {ordenar_epoch * 1000:.0f} ms")
+
+    somar_float = cronometrar(lambda: sum(t["valor"] for t in dicts))
+    somar_centavos = cronometrar(lambda: sum(r.centavos for r in compactos))
+    exato = sum(Decimal(str(t["valor"])) for t in dicts)
+    erro = abs(Decimal(repr(sum(t["valor"] for t in dicts))) - exato)
+    print(
+        f"  somar valores:       float {somar_float * 1000:.0f} ms (erro {erro} reais) | "
+        f"centavos {somar_centavos * 1000:.0f} ms (exato: {sum(r.centavos for r in compactos) / 100 == float(exato)})"
+    )
+
+    amostra = compactos[:100_000]
+    converter = cronometrar(lambda: [r.para_dict() for r in amostra])
+    print(f"  para_dict:           {converter / len(amostra) * 1e6:.2f} µs por transação devolvida")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Repositório em memória x SQLite com a mesma carga: consultas e commits por segundo.
+
+Carrega a mesma carga sintética (benchmarks.sintetico: clientes, cartões e
+histórico, reproduzíveis pela semente) nos dois backends, confere que
+extrato, perfil de gastos e resumo da conta saem iguais e mede saldo, últimas
+5 transações, perfil, resumo da conta (a ficha da interface) e
+transferências/boletos concorrentes pelos serviços.
+
+Uso: python -m benchmarks.bench_repositorio --clientes 10000 --volume 200000 --threads 1 8
+     python -m benchmarks.bench_repositorio --clientes 1000000 --volume 10000000 --seed 42
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+
+from agent import services
+from agent.repositorio import RepositorioMemoria, RepositorioSQLite
+from agent.travas import TravasContas
+from benchmarks.bench_colunas import medir, normalizar
+from benchmarks.bench_wal import executar
+from benchmarks.sintetico import CargaSintetica
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clientes", type=int, default=10_000)
+    parser.add_argument("--volume", type=int, default=200_000)
+    parser.add_argument("--consultas", type=int, default=2000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--operacoes", type=int, default=1000, help="operações por thread")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    carga = CargaSintetica(args.clientes, args.volume, args.seed)
+    clientes = list(carga.clientes())
+    cartoes = list(carga.cartoes())
+    historico = list(carga.transacoes())
+    rng = random.Random(7)
+    consultados = [str(rng.randrange(1, args.clientes + 1)) for _ in range(args.consultas)]
+
+    diretorio = tempfile.mkdtemp(prefix="bench_repositorio_")
+    originais = (services.repositorio, services.travas)
+    backends = {
+        "memoria": lambda: RepositorioMemoria(clientes={}, cartoes={}),
+        "sqlite": lambda: RepositorioSQLite(os.path.join(diretorio, "banco.db"), semear=False),
+    }
+    respostas = {}
+    try:
+        for nome, criar in backends.items():
+            repositorio = criar()
+            repositorio.importar(
+                clientes=[(i, dict(d)) for i, d in clientes], cartoes=[(i, dict(d)) for i, d in cartoes],
+                transacoes=historico
+            )
+            services.repositorio, services.travas = repositorio, TravasContas()
+            respostas[nome] = [
+                ([str(t["id"]) for t in services.buscar_transacoes(c, 5)["transacoes"]],
+                 normalizar(services.analisar_comportamento(c)),
+                 services.resumo_conta(c))
+                for c in consultados[:200]
+            ]
+
+            saldo = medir(services.consultar_saldo, consultados)
+            ultimas = medir(lambda c: services.buscar_transacoes(c, 5), consultados)
+            perfil = medir(services.analisar_comportamento, consultados)
+            resumo = medir(services.resumo_conta, consultados)
+            print(
+                f"{nome:<8} saldo p50 {saldo[0]:.1f} µs p99 {saldo[1]:.1f} µs | "
+                f"últimas 5 p50 {ultimas[0]:.1f} µs p99 {ultimas[1]:.1f} µs | "
+                f"perfil p50 {perfil[0]:.1f} µs p99 {perfil[1]:.1f} µs | "
+                f"resumo da conta p50 {resumo[0]:.1f} µs p99 {resumo[1]:.1f} µs"
+            )
+            for threads in args.threads:
+                duracao, sucessos = executar(args.clientes, threads, args.operacoes)
+                print(f"{'':<8} {threads:>3} threads: {threads * args.operacoes / duracao:.0f} operações/s ({sucessos} com sucesso)")
+            repositorio.fechar()
+
+        iguais = sum(a == b for a, b in zip(respostas["memoria"], respostas["sqlite"]))
+        print(f"extrato, perfil e resumo iguais nos dois backends para {iguais} de {len(respostas['memoria'])} clientes")
+    finally:
+        services.repositorio, services.travas = originais
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
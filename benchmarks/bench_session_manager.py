@@ -0,0 +1,72 @@
+"""Memória retida por muitas sessões com e sem o SessionManager.
+
+Uso: python -m benchmarks.bench_session_manager --sessoes 1000 --turnos 4 --orcamento-mb 2
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from agent.graph import create_agent, get_agent_graph
+from agent.session_manager import SessionManager
+from agent.session_store import SQLiteSessionStore
+
+MENSAGENS = ["qual meu saldo?", "extrato dos últimos 10", "analise meu perfil", "mostra meu saldo e o extrato"]
+
+
+def conversar(agent, turnos):
+    for turno in range(turnos):
+        agent.invoke(MENSAGENS[turno % len(MENSAGENS)])
+
+
+def sem_gerenciador(args, store):
+    sessoes = []
+    for _ in range(args.sessoes):
+        agent = create_agent("1", session_store=store)
+        conversar(agent, args.turnos)
+        sessoes.append(agent)
+    return sessoes, None
+
+
+def com_gerenciador(args, store):
+    gerenciador = SessionManager(session_store=store, orcamento_bytes=args.orcamento_mb * 1024 * 1024)
+    for _ in range(args.sessoes):
+        agent = gerenciador.criar("1")
+        conversar(agent, args.turnos)
+        gerenciador.atualizar(agent)
+    return gerenciador, gerenciador.estatisticas()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessoes", type=int, default=1000)
+    parser.add_argument("--turnos", type=int, default=4)
+    parser.add_argument("--orcamento-mb", type=int, default=2)
+    args = parser.parse_args()
+
+    get_agent_graph(None)
+    with tempfile.TemporaryDirectory() as diretorio:
+        store = SQLiteSessionStore(os.path.join(diretorio, "sessoes.db"))
+        for nome, cenario in (("sem gerenciador", sem_gerenciador), ("com gerenciador", com_gerenciador)):
+            gc.collect()
+            tracemalloc.start()
+            inicio = time.perf_counter()
+            retido, estatisticas = cenario(args, store)
+            duracao = time.perf_counter() - inicio
+            gc.collect()
+            memoria = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            print(f"{nome}: {memoria / 1024 / 1024:.1f} MiB retidos, {duracao:.1f}s")
+            if estatisticas:
+                print(
+                    f"  {estatisticas['sessoes']} sessões vivas, "
+                    f"{estatisticas['bytes_estimados'] / 1024 / 1024:.1f} MiB estimados, "
+                    f"{estatisticas['despejadas_lru']} despejadas"
+                )
+            del retido
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Benchmark de gravação e carga de sessões longas no SQLiteSessionStore.
+
+Uso: python -m benchmarks.bench_session_store --turnos 100 1000 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from agent.session_store import SQLiteSessionStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turnos", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--snapshot-a-cada", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, "sessoes.db")
+        store = SQLiteSessionStore(caminho, snapshot_a_cada=args.snapshot_a_cada)
+
+        for total in args.turnos:
+            session_id = f"sessao-{total}"
+            inicio = time.perf_counter()
+            for turno in range(total):
+                mensagens = [
+                    HumanMessage(content=f"Quero ver o extrato das últimas {turno % 20 + 1} transações"),
+                    AIMessage(content="Aqui estão suas últimas transações:\n- 01/03/2025 10:00: Transferência de R$ 50.00"),
+                ]
+                store.salvar_turno(session_id, "1", mensagens, {"last_access": f"2025-03-01T10:{turno % 60:02d}:00"})
+            gravacao = (time.perf_counter() - inicio) / total
+
+            inicio = time.perf_counter()
+            estado = store.carregar(session_id)
+            carga = time.perf_counter() - inicio
+
+            print(
+                f"{total} turnos: gravação {gravacao * 1000:.3f} ms/turno, "
+                f"carga {carga * 1000:.2f} ms ({len(estado['messages'])} mensagens)"
+            )
+        print(f"Tamanho do banco: {os.path.getsize(caminho) / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
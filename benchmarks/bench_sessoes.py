@@ -0,0 +1,43 @@
+"""Benchmark de criação de sessões: grafo compilado por sessão vs. grafo compartilhado.
+
+Uso: python -m benchmarks.bench_sessoes --sessoes 200
+"""
+import argparse
+import os
+import time
+import tracemalloc
+
+# O ChatGroq exige uma chave na construção; nenhuma chamada ao modelo é feita aqui
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+from agent.graph import ChatAgent, create_agent, create_agent_graph
+
+
+def medir(nome, criar_sessao, quantidade):
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    inicio = time.perf_counter()
+    sessoes = [criar_sessao(str(i % 3 + 1)) for i in range(quantidade)]
+    duracao = time.perf_counter() - inicio
+    memoria = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    print(
+        f"{nome}: {duracao / quantidade * 1000:.2f} ms/sessão, "
+        f"{memoria / quantidade / 1024:.1f} KiB/sessão ({len(sessoes)} sessões)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessoes", type=int, default=200)
+    args = parser.parse_args()
+
+    # Aquece o grafo compartilhado para medir apenas o custo por sessão
+    create_agent("1")
+
+    medir("grafo por sessão", lambda cliente_id: ChatAgent(cliente_id, create_agent_graph()), args.sessoes)
+    medir("grafo compartilhado", lambda cliente_id: create_agent(cliente_id), args.sessoes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Stress de transferências e pagamentos concorrentes: vazão e conservação dos saldos.
+
+Cada thread faz transferências entre contas aleatórias e pagamentos de boleto.
+Ao final, os saldos são conferidos contra o ledger: o dinheiro total só pode
+diminuir pelos boletos pagos, nenhum saldo pode ficar negativo e reaplicar o
+ledger sobre os saldos iniciais tem de reproduzir os saldos finais.
+
+--latencia-us simula o custo de gravar a transação de forma durável dentro da
+seção crítica; é aí que locks por conta deixam operações independentes
+andarem em paralelo, enquanto um lock global as enfileira.
+
+Uso: python -m benchmarks.bench_transferencias --contas 1000 --threads 1 4 16 --latencia-us 200
+"""
+import argparse
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from agent import services
+from agent.ledger import Ledger
+from agent.repositorio import RepositorioMemoria
+from agent.travas import TravasContas
+
+SALDO_INICIAL = 1000
+
+
+class TravaGlobal:
+    """Alternativa de comparação: um único lock para todas as contas."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def travar(self, *chaves):
+        with self._lock:
+            yield
+
+
+class LedgerComLatencia(Ledger):
+    def __init__(self, latencia):
+        super().__init__()
+        self.latencia = latencia
+
+    def append(self, transacao, epoch=None):
+        if self.latencia:
+            time.sleep(self.latencia)
+        super().append(transacao, epoch)
+
+
+def preparar(contas, latencia, travas):
+    services.repositorio = RepositorioMemoria(
+        clientes={str(i): {"nome": f"Cliente {i}", "saldo": SALDO_INICIAL, "conta": f"{i:05d}-0"} for i in range(contas)},
+        cartoes={},
+        transacoes=LedgerComLatencia(latencia)
+    )
+    services.travas = travas
+
+
+def trabalhar(contas, operacoes, seed, contagem):
+    rng = random.Random(seed)
+    sucesso = 0
+    for _ in range(operacoes):
+        origem = str(rng.randrange(contas))
+        valor = rng.randint(1, 300)
+        if rng.random() < 0.8:
+            resultado = services.realizar_transferencia(origem, str(rng.randrange(contas)), valor)
+        else:
+            resultado = services.pagar_boleto(origem, "76543210987654321098", valor)
+        sucesso += resultado["status"] == "sucesso"
+    contagem.append(sucesso)
+
+
+def verificar(contas, sucessos):
+    """Retorna a lista de violações encontradas (vazia quando tudo confere)."""
+    violacoes = []
+    clientes, transacoes = services.repositorio.clientes, services.repositorio.transacoes
+    saldos = {str(i): SALDO_INICIAL for i in range(contas)}
+    for t in transacoes:
+        saldos[t["origem"]] -= t["valor"]
+        if t["tipo"] == "transferência":
+            saldos[t["destino"]] += t["valor"]
+    boletos = sum(t["valor"] for t in transacoes if t["tipo"] == "pagamento_boleto")
+    total = sum(c["saldo"] for c in clientes.values())
+
+    if total + boletos != contas * SALDO_INICIAL:
+        violacoes.append(f"dinheiro não conservado: {total} + {boletos} != {contas * SALDO_INICIAL}")
+    negativos = [i for i, c in clientes.items() if c["saldo"] < 0]
+    if negativos:
+        violacoes.append(f"{len(negativos)} saldos negativos")
+    divergentes = [i for i, c in clientes.items() if c["saldo"] != saldos[i]]
+    if divergentes:
+        violacoes.append(f"{len(divergentes)} saldos divergem do ledger")
+    if len(transacoes) != sucessos:
+        violacoes.append(f"{len(transacoes)} lançamentos para {sucessos} operações")
+    return violacoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--contas", type=int, default=1000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--operacoes", type=int, default=2000, help="operações por thread")
+    parser.add_argument("--latencia-us", type=int, default=200)
+    parser.add_argument("--modos", nargs="+", default=["contas", "global"])
+    args = parser.parse_args()
+
+    modos = {"contas": TravasContas, "global": TravaGlobal}
+    originais = (services.repositorio, services.travas)
+    try:
+        for modo in args.modos:
+            for threads in args.threads:
+                preparar(args.contas, args.latencia_us / 1e6, modos[modo]())
+                contagem = []
+                trabalhadores = [
+                    threading.Thread(target=trabalhar, args=(args.contas, args.operacoes, seed, contagem))
+                    for seed in range(threads)
+                ]
+                inicio = time.perf_counter()
+                for t in trabalhadores:
+                    t.start()
+                for t in trabalhadores:
+                    t.join()
+                duracao = time.perf_counter() - inicio
+                violacoes = verificar(args.contas, sum(contagem))
+                print(
+                    f"{modo:<10} {threads:>3} threads: {threads * args.operacoes / duracao:>9.0f} op/s, "
+                    f"{sum(contagem)} com sucesso | "
+                    + ("saldos conservados" if not violacoes else "VIOLAÇÕES: " + "; ".join(violacoes))
+                )
+    finally:
+        services.repositorio, services.travas = originais
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Diário de transações: commits por segundo e tempo de recuperação.
+
+Compara as mesmas transferências e boletos concorrentes de
+bench_transferencias só em memória, com um fsync por commit e com group
+commit (um fsync por lote, dentro da janela). Depois grava um histórico,
+reinicia o estado e mede a recuperação com e sem snapshots, conferindo que
+saldos e transações voltam iguais.
+
+Uso: python -m benchmarks.bench_wal --threads 1 8 32 --janela-ms 1 --recuperacao 200000
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from agent import services
+from agent.travas import TravasContas
+from agent.wal import DiarioTransacoes
+from benchmarks.bench_transferencias import preparar, trabalhar, verificar
+
+
+class DiarioFsyncPorCommit(DiarioTransacoes):
+    """Alternativa ingênua: cada commit grava e faz fsync sozinho, dentro da seção crítica."""
+
+    def iniciar(self):
+        if self._arquivo is None:
+            self.recuperar()
+        return self
+
+    def efetivar(self, registro):
+        with self._lock:
+            registro["seq"] = self.seq + 1
+            if self.aplicar(registro) is False:
+                return 0
+            self.seq += 1
+            self._arquivo.write(json.dumps(registro, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self._arquivo.flush()
+            os.fsync(self._arquivo.fileno())
+            self.fsyncs += 1
+            self.gravados += 1
+            self.seq_duravel = self.seq
+            return self.seq
+
+
+def abrir(modo, diretorio, janela, snapshot_a_cada):
+    if modo == "memoria":
+        return None
+    classe = DiarioFsyncPorCommit if modo == "fsync" else DiarioTransacoes
+    return classe(
+        diretorio, services._aplicar, services._preparar_captura, services._restaurar,
+        janela=janela if modo == "grupo" else 0, snapshot_a_cada=snapshot_a_cada
+    ).iniciar()
+
+
+def executar(contas, threads, operacoes):
+    contagem = []
+    trabalhadores = [
+        threading.Thread(target=trabalhar, args=(contas, operacoes, seed, contagem)) for seed in range(threads)
+    ]
+    inicio = time.perf_counter()
+    for t in trabalhadores:
+        t.start()
+    for t in trabalhadores:
+        t.join()
+    return time.perf_counter() - inicio, sum(contagem)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--contas", type=int, default=1000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--operacoes", type=int, default=500, help="operações por thread")
+    parser.add_argument("--modos", nargs="+", default=["memoria", "fsync", "grupo"])
+    parser.add_argument("--janela-ms", type=float, default=1)
+    parser.add_argument("--recuperacao", type=int, default=200_000, help="operações gravadas antes de reiniciar")
+    parser.add_argument("--snapshot-a-cada", type=int, default=10_000)
+    args = parser.parse_args()
+
+    originais = (services.repositorio, services.travas, services.diario)
+    raiz = tempfile.mkdtemp(prefix="bench_wal_")
+    try:
+        for modo in args.modos:
+            for threads in args.threads:
+                diretorio = tempfile.mkdtemp(dir=raiz)
+                preparar(args.contas, 0, TravasContas())
+                services.diario = abrir(modo, diretorio, args.janela_ms / 1000, 10 ** 12)
+                duracao, sucessos = executar(args.contas, threads, args.operacoes)
+                estatisticas = services.diario.estatisticas() if services.diario else {}
+                if services.diario:
+                    services.diario.fechar()
+                violacoes = verificar(args.contas, sucessos)
+                print(
+                    f"{modo:<8} {threads:>3} threads: {threads * args.operacoes / duracao:>8.0f} commits/s"
+                    + (f", {estatisticas['registros_por_fsync']:.1f} registros por fsync" if estatisticas else "")
+                    + (" | saldos conservados" if not violacoes else " | VIOLAÇÕES: " + "; ".join(violacoes))
+                )
+
+        for snapshot_a_cada in (10 ** 12, args.snapshot_a_cada):
+            diretorio = tempfile.mkdtemp(dir=raiz)
+            preparar(args.contas, 0, TravasContas())
+            services.diario = abrir("grupo", diretorio, args.janela_ms / 1000, snapshot_a_cada)
+            threads = 16
+            executar(args.contas, threads, args.recuperacao // threads)
+            services.diario.fechar()
+            services.diario = None
+            esperado = services._capturar()
+
+            # Reinício: estado inicial de novo e recuperação a partir do diretório
+            preparar(args.contas, 0, TravasContas())
+            services.diario = None
+            diario = DiarioTransacoes(diretorio, services._aplicar, services._preparar_captura, services._restaurar)
+            resultado = diario.recuperar()
+            diario.fechar()
+            recuperado = services._capturar()
+            confere = (
+                recuperado["clientes"] == esperado["clientes"]
+                and [t["id"] for t in recuperado["transacoes"]] == [t["id"] for t in esperado["transacoes"]]
+            )
+            rotulo = "sem snapshot" if snapshot_a_cada == 10 ** 12 else f"snapshot a cada {snapshot_a_cada}"
+            print(
+                f"recuperação {rotulo}: {len(esperado['transacoes'])} transações, "
+                f"{resultado['reaplicados']} registros reaplicados do log, {resultado['duracao']:.2f}s | "
+                + ("estado idêntico" if confere else "ESTADO DIVERGENTE")
+            )
+    finally:
+        shutil.rmtree(raiz, ignore_errors=True)
+        services.repositorio, services.travas, services.diario = originais
+
+
+if __name__ == "__main__":
+    main()
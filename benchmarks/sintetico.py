@@ -0,0 +1,387 @@
+"""Carga sintética reproduzível para os benchmarks: clientes, cartões, transações e frases rotuladas.
+
+Tudo sai de uma semente: a mesma `CargaSintetica(clientes, transacoes, seed)`
+gera os mesmos dados em qualquer máquina, então qualquer número de benchmark
+pode ser refeito na escala de 1M de clientes. Cada fluxo (clientes, cartões,
+transações, frases) tem o próprio gerador aleatório e é produzido sob demanda,
+com memória constante:
+
+- clientes com nomes brasileiros, tipo de conta e saldo log-normal; quatro em
+  cada cinco têm cartão (com o mesmo id do cliente, como nos dados semeados);
+- transações em ordem de data, espalhadas por `dias` dias com o movimento
+  concentrado no horário comercial, na mistura de tipos de PESOS_TIPOS; poucos
+  clientes concentram boa parte do movimento e as transferências vão, na
+  maioria, para um pequeno grupo de contatos de cada cliente;
+- boletos com os prefixos que a análise de gastos categoriza (765 água, 891
+  energia) e outros, e compras em estabelecimentos com frequência de Zipf;
+- frases de usuário em português, rotuladas com as intenções esperadas do
+  classificador e as entidades (valor, destinatário, estabelecimento, conta).
+
+carregar() importa tudo em um repositório (o dos serviços, por padrão) e
+gravar() grava arquivos JSON Lines, opcionalmente gzip.
+
+Uso:
+    python -m benchmarks.sintetico --clientes 1000000 --transacoes 10000000 --saida carga/ --gzip
+    python -m benchmarks.sintetico --clientes 1000000 --transacoes 10000000 --banco banco.db
+"""
+import argparse
+import gzip
+import json
+import math
+import os
+import random
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterator, Tuple
+
+from agent.ledger import data_iso, epoch_us
+
+PRIMEIROS_NOMES = [
+    "Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Felipe", "Gabriela", "Henrique", "Isabela", "João",
+    "Karina", "Lucas", "Mariana", "Nicolas", "Olívia", "Paulo", "Quitéria", "Rafael", "Sofia", "Tiago",
+    "Úrsula", "Vitor", "Wesley", "Yasmin", "Zeca", "Maria", "Carlos", "Beatriz", "Gustavo", "Letícia"
+]
+SOBRENOMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima", "Gomes",
+    "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Soares", "Fernandes", "Vieira", "Barbosa",
+    "Rocha", "Dias", "Nascimento", "Andrade", "Moreira", "Nunes", "Marques", "Machado", "Mendes", "Freitas"
+]
+TIPOS_CONTA = (("Conta Corrente", 0.60), ("Conta Básica", 0.25), ("Conta Premium", 0.15))
+LIMITES_CARTAO = (2000.0, 5000.0, 10000.0, 15000.0, 30000.0)
+
+PESOS_TIPOS = (("pagamento_cartao", 0.45), ("transferência", 0.35), ("pagamento_boleto", 0.20))
+# Mediana e dispersão (log-normal) do valor de cada tipo, em reais
+VALORES = {"pagamento_cartao": (60.0, 0.9), "transferência": (200.0, 1.1), "pagamento_boleto": (150.0, 0.7)}
+# Prefixos de código de barras: água e energia (agent.colunas), internet, telefone e genéricos ("Outros")
+PREFIXOS_BOLETO = (("765", 0.30), ("891", 0.30), ("456", 0.15), ("321", 0.10), ("123", 0.15))
+# Os quatro primeiros são os que o chat reconhece; a frequência cai com a posição (Zipf)
+ESTABELECIMENTOS = (
+    "Supermercado", "Restaurante", "Posto de Combustível", "Farmácia", "Padaria", "Delivery",
+    "Aplicativo de Transporte", "Loja de Roupas", "Streaming", "Academia", "Pet Shop", "Livraria",
+    "Eletrônicos", "Cinema", "Hotel", "Companhia Aérea"
+)
+# Peso de cada hora do dia: madrugada quase parada, picos no almoço e no começo da noite
+PESOS_HORA = (1, 1, 1, 1, 1, 2, 4, 7, 9, 10, 11, 13, 14, 12, 10, 10, 11, 12, 14, 15, 12, 8, 5, 2)
+CONTATOS_POR_CLIENTE = 5
+
+_US_POR_DIA = 86_400_000_000
+_US_POR_HORA = 3_600_000_000
+
+
+def _acumulados(pesos):
+    total = 0.0
+    acumulados = []
+    for peso in pesos:
+        total += peso
+        acumulados.append(total)
+    return acumulados
+
+
+def conta_do_cliente(numero: int) -> str:
+    """Número de conta no formato 123456-7 que o índice de clientes reconhece; único até 10M de clientes."""
+    return f"{numero % 1_000_000:06d}-{(7 * (numero % 1_000_000) + numero // 1_000_000) % 10}"
+
+
+def tem_cartao(numero: int) -> bool:
+    return numero % 5 != 0
+
+
+class CargaSintetica:
+    """Gerador determinístico da carga de um banco com `clientes` clientes e `transacoes` transações."""
+
+    def __init__(
+        self,
+        clientes: int = 10_000,
+        transacoes: int = 100_000,
+        seed: int = 42,
+        inicio: datetime = datetime(2024, 1, 1),
+        dias: int = 365
+    ):
+        if clientes < 2:
+            raise ValueError("A carga precisa de pelo menos 2 clientes")
+        self.quantidade_clientes = clientes
+        self.quantidade_transacoes = transacoes
+        self.seed = seed
+        self.inicio = inicio
+        self.dias = dias
+
+    def _rng(self, fluxo: str) -> random.Random:
+        # Semente em texto: cada fluxo é independente e o resultado não depende de PYTHONHASHSEED
+        return random.Random(f"{self.seed}:{fluxo}")
+
+    def _sortear_cliente(self, rng: random.Random) -> int:
+        """Cliente de uma transação: metade do movimento vem do primeiro quarto dos clientes."""
+        return int(self.quantidade_clientes * rng.random() ** 2) + 1
+
+    def _contato(self, origem: int, rng: random.Random) -> int:
+        """Destino de uma transferência: na maioria das vezes um dos contatos frequentes do cliente."""
+        if rng.random() < 0.7:
+            destino = (origem * 7919 + rng.randrange(CONTATOS_POR_CLIENTE) * 104729) % self.quantidade_clientes + 1
+        else:
+            destino = rng.randrange(self.quantidade_clientes) + 1
+        return destino if destino != origem else destino % self.quantidade_clientes + 1
+
+    def nome(self, numero: int) -> str:
+        rng = random.Random(f"{self.seed}:nome:{numero}")
+        return f"{rng.choice(PRIMEIROS_NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}"
+
+    # ---- cadastro ----
+
+    def clientes(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Pares (id, dados) no formato de agent.repositorio.CLIENTES_INICIAIS."""
+        rng = self._rng("clientes")
+        tipos = [tipo for tipo, _ in TIPOS_CONTA]
+        acumulados = _acumulados(peso for _, peso in TIPOS_CONTA)
+        for numero in range(1, self.quantidade_clientes + 1):
+            yield str(numero), {
+                "nome": self.nome(numero),
+                "saldo": round(min(rng.lognormvariate(math.log(3000), 1.0), 500_000), 2),
+                "conta": conta_do_cliente(numero),
+                "tipo": rng.choices(tipos, cum_weights=acumulados)[0]
+            }
+
+    def cartoes(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Pares (id, dados) no formato de CARTOES_INICIAIS, com a fatura entre 0 e 60% do limite."""
+        rng = self._rng("cartoes")
+        for numero in range(1, self.quantidade_clientes + 1):
+            if not tem_cartao(numero):
+                continue
+            limite = rng.choice(LIMITES_CARTAO)
+            yield str(numero), {
+                "numero": f"**** **** **** {rng.randrange(10_000):04d}",
+                "limite": limite,
+                "fatura_atual": round(limite * rng.uniform(0, 0.6), 2)
+            }
+
+    # ---- transações ----
+
+    def transacoes(self) -> Iterator[Dict[str, Any]]:
+        """As transações em ordem de data, no formato gravado pelos serviços (ids UUID, data ISO, valor em reais)."""
+        rng = self._rng("transacoes")
+        tipos = [tipo for tipo, _ in PESOS_TIPOS]
+        pesos_tipos = _acumulados(peso for _, peso in PESOS_TIPOS)
+        pesos_hora = _acumulados(PESOS_HORA)
+        prefixos = [prefixo for prefixo, _ in PREFIXOS_BOLETO]
+        pesos_prefixos = _acumulados(peso for _, peso in PREFIXOS_BOLETO)
+        pesos_estabelecimentos = _acumulados(1 / posicao for posicao in range(1, len(ESTABELECIMENTOS) + 1))
+        epoch_inicial = epoch_us(self.inicio)
+
+        gerados = 0
+        for dia in range(self.dias):
+            # Partes inteiras do total por dia, somando exatamente `quantidade_transacoes`
+            no_dia = round(self.quantidade_transacoes * (dia + 1) / self.dias) - gerados
+            gerados += no_dia
+            horas = rng.choices(range(24), cum_weights=pesos_hora, k=no_dia)
+            instantes = sorted(hora * _US_POR_HORA + rng.randrange(_US_POR_HORA) for hora in horas)
+            base = epoch_inicial + dia * _US_POR_DIA
+            for instante in instantes:
+                tipo = rng.choices(tipos, cum_weights=pesos_tipos)[0]
+                mediana, dispersao = VALORES[tipo]
+                valor = max(1.0, round(rng.lognormvariate(math.log(mediana), dispersao), 2))
+                transacao = {
+                    "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                    "data": data_iso(base + instante),
+                    "tipo": tipo
+                }
+                origem = self._sortear_cliente(rng)
+                if tipo == "pagamento_cartao":
+                    titular = origem if tem_cartao(origem) else origem - 1
+                    transacao["cliente_id"] = transacao["cartao_id"] = str(titular)
+                    transacao["estabelecimento"] = rng.choices(ESTABELECIMENTOS, cum_weights=pesos_estabelecimentos)[0]
+                elif tipo == "pagamento_boleto":
+                    transacao["origem"] = str(origem)
+                    prefixo = rng.choices(prefixos, cum_weights=pesos_prefixos)[0]
+                    transacao["codigo_barras"] = f"{prefixo}{rng.randrange(10 ** 17):017d}"
+                else:
+                    transacao["origem"] = str(origem)
+                    transacao["destino"] = str(self._contato(origem, rng))
+                transacao["valor"] = valor
+                yield transacao
+
+    # ---- frases ----
+
+    def frases(self, quantidade: int = 10_000) -> Iterator[Dict[str, Any]]:
+        """Mensagens de usuário rotuladas: {"texto", "intencoes": [...], "entidades": [{...}, ...]}.
+
+        As intenções são as do classificador (agent.nodes.classificar_intencao),
+        uma por pedido na ordem da mensagem; 15% das mensagens juntam dois
+        pedidos. Destinatários são clientes da própria carga, citados pelo nome
+        ou pela conta.
+        """
+        rng = self._rng("frases")
+        for _ in range(quantidade):
+            texto, intencao, entidades = _frase(self, rng)
+            intencoes, todas = [intencao], [entidades]
+            if rng.random() < 0.15:
+                segundo, intencao, entidades = _frase(self, rng, leitura=True, exceto=intencao)
+                texto = f"{texto}{rng.choice((' e ', ', depois ', ' e também '))}{segundo}"
+                intencoes.append(intencao)
+                todas.append(entidades)
+            yield {"texto": texto, "intencoes": intencoes, "entidades": todas}
+
+    # ---- saída ----
+
+    def carregar(self, repositorio=None):
+        """Importa clientes, cartões e transações no repositório (por padrão, o dos serviços).
+
+        Carregando o repositório dos serviços, o índice de clientes do chat é
+        reconstruído para resolver os destinatários das frases.
+        """
+        from agent import services
+        from agent.entidades import reconstruir_indice_clientes
+        if repositorio is None:
+            repositorio = services.obter_repositorio()
+        repositorio.importar(clientes=self.clientes(), cartoes=self.cartoes(), transacoes=self.transacoes())
+        if repositorio is services.repositorio:
+            reconstruir_indice_clientes()
+        return repositorio
+
+    def gravar(self, diretorio: str, frases: int = 10_000, compactar: bool = False) -> Dict[str, int]:
+        """Grava clientes, cartões, transações e frases em JSON Lines; retorna as linhas de cada arquivo."""
+        os.makedirs(diretorio, exist_ok=True)
+        fluxos = {
+            "clientes": ({"id": i, **dados} for i, dados in self.clientes()),
+            "cartoes": ({"id": i, **dados} for i, dados in self.cartoes()),
+            "transacoes": self.transacoes(),
+            "frases": self.frases(frases),
+        }
+        linhas = {}
+        for nome, registros in fluxos.items():
+            caminho = os.path.join(diretorio, f"{nome}.jsonl" + (".gz" if compactar else ""))
+            abrir = gzip.open if compactar else open
+            with abrir(caminho, "wt", encoding="utf-8") as arquivo:
+                linhas[nome] = 0
+                for registro in registros:
+                    arquivo.write(json.dumps(registro, ensure_ascii=False, separators=(",", ":")) + "\n")
+                    linhas[nome] += 1
+        return linhas
+
+
+def ler(caminho: str) -> Iterator[Dict[str, Any]]:
+    """Lê de volta um arquivo de gravar(), linha a linha (.jsonl ou .jsonl.gz)."""
+    abrir = gzip.open if caminho.endswith(".gz") else open
+    with abrir(caminho, "rt", encoding="utf-8") as arquivo:
+        for linha in arquivo:
+            yield json.loads(linha)
+
+
+# ---- frases ----
+
+_MESES = ("janeiro", "fevereiro", "março", "abril", "maio", "junho", "julho", "agosto", "setembro",
+          "outubro", "novembro", "dezembro")
+# Estabelecimentos que o chat reconhece, como o usuário os cita
+_LOCAIS = (("no restaurante", "Restaurante"), ("na lanchonete", "Restaurante"), ("no supermercado", "Supermercado"),
+           ("no mercado", "Supermercado"), ("na farmácia", "Farmácia"), ("no posto", "Posto de Combustível"))
+_CONTAS_BOLETO = (("água", "agua"), ("luz", "luz"), ("energia", "luz"), ("internet", "internet"),
+                  ("telefone", "telefone"))
+
+_SALDO = ("qual é o meu saldo?", "quanto tenho disponível na conta?", "me diz meu saldo", "saldo, por favor",
+          "quanto sobrou na minha conta este mês?", "consultar saldo")
+_EXTRATO = ("me mostra o extrato", "quero ver as últimas {n} transações", "extrato de {mes}",
+            "histórico de movimentações de {mes}", "mostra minhas últimas {n} movimentações")
+_PERFIL = ("analise meu perfil financeiro", "como estão meus gastos?",
+           "quero uma análise do meu comportamento financeiro", "onde estou gastando mais?")
+_DUVIDA = ("quais documentos são necessários para abrir conta?", "como faço para aumentar meu limite?",
+           "qual o horário de atendimento da agência?", "o que é CDB?", "como funciona o cheque especial?")
+_MCP = ("consultar margem consignável", "quero consultar a disponibilidade de empréstimo consignado",
+        "verificar elegibilidade para consignado")
+_TRANSFERENCIA = ("quero transferir {valor} {destino}", "faz um pix de {valor} {destino}",
+                  "enviar {valor} {destino}", "transferir {valor} {destino}",
+                  "transfere {valor} {destino}", "manda {valor} {destino}")
+_BOLETO = ("pagar a conta de {conta} de {valor}", "quero pagar o boleto de {conta} de {valor}",
+           "paga o boleto de {valor}", "pagar boleto de {valor}")
+_CARTAO = ("comprei {valor} {local} com o cartão", "compra de {valor} {local} no crédito",
+           "passa {valor} no cartão {local}", "paguei {valor} {local} no débito")
+
+
+def _valor_falado(valor: float, rng: random.Random) -> str:
+    inteiro = f"{int(valor):,}".replace(",", ".")
+    centavos = f"{round(valor * 100) % 100:02d}"
+    return rng.choice((f"R$ {inteiro},{centavos}", f"{int(valor)} reais", f"{inteiro},{centavos}", f"R${int(valor)}"))
+
+
+def _frase(
+    carga: CargaSintetica, rng: random.Random, leitura: bool = False, exceto: str = ""
+) -> Tuple[str, str, Dict[str, Any]]:
+    """Uma frase, a intenção esperada e as entidades.
+
+    `leitura` sorteia só consultas, para o segundo pedido de uma mensagem; a
+    consulta `exceto` fica de fora porque o classificador junta consultas repetidas.
+    """
+    if leitura:
+        pesos = {"consulta_saldo": 3, "extrato": 3, "perfil": 1}
+        pesos.pop(exceto, None)
+    else:
+        pesos = {"consulta_saldo": 20, "extrato": 18, "transferencia": 20, "pagamento_boleto": 12,
+                 "pagamento_cartao": 12, "perfil": 6, "duvida": 8, "mcp": 4}
+    intencao = rng.choices(list(pesos), weights=list(pesos.values()))[0]
+    if intencao == "consulta_saldo":
+        return rng.choice(_SALDO), intencao, {}
+    if intencao == "extrato":
+        n = rng.choice((5, 10, 20))
+        return rng.choice(_EXTRATO).format(n=n, mes=rng.choice(_MESES)), intencao, {}
+    if intencao == "perfil":
+        return rng.choice(_PERFIL), intencao, {}
+    if intencao == "duvida":
+        return rng.choice(_DUVIDA), intencao, {}
+    if intencao == "mcp":
+        return rng.choice(_MCP), intencao, {}
+
+    mediana, dispersao = VALORES[{"transferencia": "transferência"}.get(intencao, intencao)]
+    valor = round(max(1.0, rng.lognormvariate(math.log(mediana), dispersao)), 2)
+    if rng.random() < 0.5:
+        valor = float(int(valor))
+    falado = _valor_falado(valor, rng)
+    valor = float(falado.replace("R$", "").replace("reais", "").replace(".", "").replace(",", ".").strip())
+    if intencao == "transferencia":
+        destino = rng.randrange(carga.quantidade_clientes) + 1
+        if rng.random() < 0.6:
+            citado = f"{rng.choice(('para', 'pra'))} {carga.nome(destino)}"
+        else:
+            citado = f"para a conta {conta_do_cliente(destino)}"
+        texto = rng.choice(_TRANSFERENCIA).format(valor=falado, destino=citado)
+        return texto, intencao, {"valor": valor, "destino_id": str(destino)}
+    if intencao == "pagamento_boleto":
+        modelo = rng.choice(_BOLETO)
+        conta, tipo_conta = rng.choice(_CONTAS_BOLETO)
+        entidades = {"valor": valor}
+        if "{conta}" in modelo:
+            entidades["conta"] = tipo_conta
+        return modelo.format(valor=falado, conta=conta), intencao, entidades
+    local, estabelecimento = rng.choice(_LOCAIS)
+    texto = rng.choice(_CARTAO).format(valor=falado, local=local)
+    return texto, intencao, {"valor": valor, "estabelecimento": estabelecimento}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clientes", type=int, default=1_000_000)
+    parser.add_argument("--transacoes", type=int, default=10_000_000)
+    parser.add_argument("--frases", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("--saida", help="diretório para os arquivos JSON Lines")
+    parser.add_argument("--gzip", action="store_true", help="compacta os arquivos da --saida")
+    parser.add_argument("--banco", help="arquivo SQLite a carregar (AGENT_REPOSITORIO=sqlite AGENT_DB=...)")
+    args = parser.parse_args()
+    if not args.saida and not args.banco:
+        parser.error("informe --saida e/ou --banco")
+
+    carga = CargaSintetica(args.clientes, args.transacoes, args.seed, dias=args.dias)
+    if args.saida:
+        inicio = time.perf_counter()
+        linhas = carga.gravar(args.saida, args.frases, args.gzip)
+        print(f"{linhas} gravados em {args.saida} em {time.perf_counter() - inicio:.1f}s")
+    if args.banco:
+        from agent.repositorio import RepositorioSQLite
+        inicio = time.perf_counter()
+        repositorio = RepositorioSQLite(args.banco, semear=False)
+        carga.carregar(repositorio)
+        repositorio.fechar()
+        print(f"{args.clientes} clientes e {args.transacoes} transações carregados em {args.banco} "
+              f"em {time.perf_counter() - inicio:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
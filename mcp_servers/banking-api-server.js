@@ -1,6 +1,7 @@
 #!/usr/bin/env node
 import { Server } from '@modelcontextprotocol/sdk/server/index.js';
 import { StdioServerTransport } from '@modelcontextprotocol/sdk/server/stdio.js';
+import { CallToolRequestSchema, ListToolsRequestSchema } from '@modelcontextprotocol/sdk/types.js';
 
 class BankingAPIServer {
     constructor() {
@@ -23,7 +24,7 @@ class BankingAPIServer {
     }
 
     setupToolHandlers() {
-        this.server.setRequestHandler('ListTools', async () => ({
+        this.server.setRequestHandler(ListToolsRequestSchema, async () => ({
             tools: [
                 {
                     name: 'check_loan_eligibility',
@@ -60,7 +61,7 @@ class BankingAPIServer {
             ]
         }));
 
-        this.server.setRequestHandler('CallTool', async (request) => {
+        this.server.setRequestHandler(CallToolRequestSchema, async (request) => {
             const { name, arguments: args } = request.params;
 
             if (name === 'check_loan_eligibility') {
@@ -79,11 +80,11 @@ class BankingAPIServer {
             content: [
                 {
                     type: 'text',
-                    text: {
+                    text: JSON.stringify({
                         eligible: true,
                         max_amount: 50000.00,
                         reason: 'Cliente com bom histórico e margem consignável disponível'
-                    }
+                    })
                 }
             ]
         };
@@ -108,9 +109,9 @@ class BankingAPIServer {
             content: [
                 {
                     type: 'text',
-                    text: rates[args.tipo_emprestimo] || {
+                    text: JSON.stringify(rates[args.tipo_emprestimo] || {
                         error: 'Tipo de empréstimo não encontrado'
-                    }
+                    })
                 }
             ]
         };
@@ -1,38 +1,69 @@
 #!/usr/bin/env python3
-from typing import Dict, Any
-from modelcontextprotocol.server import Server
-from modelcontextprotocol.server.stdio import StdioServerTransport
-from modelcontextprotocol.types import (
-    CallToolRequestSchema,
-    ErrorCode,
-    ListToolsRequestSchema,
-    McpError,
-)
+"""Servidor MCP da API bancária em stdio, sem dependências além da biblioteca padrão.
+
+Tem as mesmas ferramentas do banking-api-server.js e serve de substituto local
+do servidor Node:
+
+    AGENT_MCP_BANKING="python mcp_servers/banking_api_server.py"
+
+Cada linha da entrada é uma mensagem JSON-RPC 2.0, ou um batch (lista de
+mensagens); cada resposta, ou a lista de respostas do batch, sai em uma linha
+da saída. Notificações (mensagens sem id) não têm resposta.
+"""
+import json
+import sys
+from typing import Dict, Any, Optional
+
+VERSAO_PROTOCOLO = "2024-11-05"
+
+# Códigos de erro do JSON-RPC
+ERRO_PARSE = -32700
+ERRO_REQUISICAO_INVALIDA = -32600
+ERRO_METODO_NAO_ENCONTRADO = -32601
+ERRO_PARAMETROS_INVALIDOS = -32602
+ERRO_INTERNO = -32603
+
+
+class McpError(Exception):
+    def __init__(self, codigo: int, mensagem: str):
+        super().__init__(mensagem)
+        self.codigo = codigo
+        self.mensagem = mensagem
+
+
+def _erro(requisicao_id, codigo: int, mensagem: str) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": requisicao_id, "error": {"code": codigo, "message": mensagem}}
+
+
+def _texto(dados) -> Dict[str, Any]:
+    """Resultado de ferramenta com um único conteúdo de texto (JSON)."""
+    return {"content": [{"type": "text", "text": json.dumps(dados, ensure_ascii=False)}]}
+
 
 class BankingAPIServer:
     def __init__(self):
-        self.server = Server(
-            {
-                "name": "banking-api-server",
-                "version": "0.1.0",
-            },
-            {
-                "capabilities": {
-                    "tools": {},
-                }
-            }
-        )
-
-        self.setup_tool_handlers()
-        
-        # Error handling
-        self.server.onerror = lambda error: print("[MCP Error]", error)
+        self.info = {
+            "name": "banking-api-server",
+            "version": "0.1.0",
+        }
+        self.capabilities = {
+            "tools": {},
+        }
+        self.handlers = {
+            "initialize": self.handle_initialize,
+            "ping": lambda params: {},
+            "tools/list": self.handle_list_tools,
+            "tools/call": self.handle_call_tool,
+        }
 
-    def setup_tool_handlers(self):
-        self.server.set_request_handler(ListToolsRequestSchema, self.handle_list_tools)
-        self.server.set_request_handler(CallToolRequestSchema, self.handle_call_tool)
+    def handle_initialize(self, params):
+        return {
+            "protocolVersion": params.get("protocolVersion", VERSAO_PROTOCOLO),
+            "capabilities": self.capabilities,
+            "serverInfo": self.info,
+        }
 
-    async def handle_list_tools(self, _):
+    def handle_list_tools(self, _):
         """Lista as ferramentas disponíveis no servidor."""
         return {
             "tools": [
@@ -71,39 +102,32 @@ class BankingAPIServer:
             ]
         }
 
-    async def handle_call_tool(self, request):
+    def handle_call_tool(self, params):
         """Processa as chamadas de ferramentas."""
-        tool_name = request.params.name
-        args = request.params.arguments
+        tool_name = params.get("name")
+        args = params.get("arguments") or {}
 
         if tool_name == "check_loan_eligibility":
-            return await self._check_loan_eligibility(args)
+            return self._check_loan_eligibility(args)
         elif tool_name == "get_loan_rates":
-            return await self._get_loan_rates(args)
+            return self._get_loan_rates(args)
         else:
             raise McpError(
-                ErrorCode.MethodNotFound,
+                ERRO_METODO_NAO_ENCONTRADO,
                 f"Ferramenta desconhecida: {tool_name}"
             )
 
-    async def _check_loan_eligibility(self, args: Dict[str, Any]):
+    def _check_loan_eligibility(self, args: Dict[str, Any]):
         """Simula verificação de elegibilidade para empréstimo."""
         # Aqui você implementaria a lógica real de verificação
         # Por enquanto, retornamos uma resposta simulada
-        return {
-            "content": [
-                {
-                    "type": "text",
-                    "text": {
-                        "eligible": True,
-                        "max_amount": 50000.00,
-                        "reason": "Cliente com bom histórico e margem consignável disponível"
-                    }
-                }
-            ]
-        }
+        return _texto({
+            "eligible": True,
+            "max_amount": 50000.00,
+            "reason": "Cliente com bom histórico e margem consignável disponível"
+        })
 
-    async def _get_loan_rates(self, args: Dict[str, Any]):
+    def _get_loan_rates(self, args: Dict[str, Any]):
         """Simula obtenção de taxas de juros."""
         # Aqui você implementaria a integração real com a API do banco
         rates = {
@@ -118,25 +142,55 @@ class BankingAPIServer:
                 "prazo_maximo": 48
             }
         }
-        
-        return {
-            "content": [
-                {
-                    "type": "text",
-                    "text": rates.get(args["tipo_emprestimo"], {
-                        "error": "Tipo de empréstimo não encontrado"
-                    })
-                }
-            ]
-        }
 
-    async def run(self):
-        """Inicia o servidor MCP."""
-        transport = StdioServerTransport()
-        await self.server.connect(transport)
-        print("Servidor BankingAPI MCP rodando em stdio")
+        return _texto(rates.get(args["tipo_emprestimo"], {
+            "error": "Tipo de empréstimo não encontrado"
+        }))
+
+    def processar(self, mensagem) -> Optional[Dict[str, Any]]:
+        """Resposta a uma mensagem JSON-RPC; None para notificações."""
+        if not isinstance(mensagem, dict) or mensagem.get("jsonrpc") != "2.0" or "method" not in mensagem:
+            requisicao_id = mensagem.get("id") if isinstance(mensagem, dict) else None
+            return _erro(requisicao_id, ERRO_REQUISICAO_INVALIDA, "Requisição inválida")
+        if "id" not in mensagem:
+            return None
+
+        requisicao_id = mensagem["id"]
+        handler = self.handlers.get(mensagem["method"])
+        if handler is None:
+            return _erro(requisicao_id, ERRO_METODO_NAO_ENCONTRADO, f"Método desconhecido: {mensagem['method']}")
+        try:
+            return {"jsonrpc": "2.0", "id": requisicao_id, "result": handler(mensagem.get("params") or {})}
+        except McpError as e:
+            return _erro(requisicao_id, e.codigo, e.mensagem)
+        except (KeyError, TypeError, AttributeError) as e:
+            return _erro(requisicao_id, ERRO_PARAMETROS_INVALIDOS, f"Parâmetros inválidos: {e}")
+        except Exception as e:
+            return _erro(requisicao_id, ERRO_INTERNO, str(e))
+
+    def run(self, entrada=None, saida=None):
+        """Atende as mensagens da entrada até ela ser fechada."""
+        entrada = entrada or sys.stdin
+        saida = saida or sys.stdout
+        print("Servidor BankingAPI MCP rodando em stdio", file=sys.stderr, flush=True)
+        for linha in entrada:
+            if not linha.strip():
+                continue
+            try:
+                mensagem = json.loads(linha)
+            except json.JSONDecodeError:
+                resposta = _erro(None, ERRO_PARSE, "JSON inválido")
+            else:
+                if not isinstance(mensagem, list):
+                    resposta = self.processar(mensagem)
+                elif mensagem:
+                    resposta = [r for r in map(self.processar, mensagem) if r is not None] or None
+                else:
+                    resposta = _erro(None, ERRO_REQUISICAO_INVALIDA, "Batch vazio")
+            if resposta is not None:
+                saida.write(json.dumps(resposta) + "\n")
+                saida.flush()
 
 if __name__ == "__main__":
-    import asyncio
     server = BankingAPIServer()
-    asyncio.run(server.run())
+    server.run()
@@ -1 +1,2 @@
-from .vectorstore import carregar_faq, carregar_multiplos_faqs
\ No newline at end of file
+from .vectorstore import carregar_faq, carregar_multiplos_faqs, carregar_base_conhecimento
+from .logs import configurar_logging
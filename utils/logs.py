@@ -0,0 +1,172 @@
+"""Configuração de logging estruturado do processo.
+
+Os registros passam por um QueueHandler no thread da requisição e são
+formatados em JSON e gravados por um QueueListener em segundo plano, de modo
+que a escrita em disco ou stdout não soma latência ao turno.
+
+Variáveis de ambiente:
+    LOG_LEVEL           nível padrão (INFO)
+    LOG_LEVELS          níveis por módulo, ex.: "agent.nodes=DEBUG,vectorstore=WARNING"
+    LOG_DEBUG_AMOSTRA   fração de registros DEBUG mantidos (1.0 = todos)
+    LOG_FILE            arquivo de saída; sem ele os registros vão para stderr
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Atributos padrão de LogRecord; os demais vêm de `extra=` e entram no JSON
+_ATRIBUTOS_PADRAO = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# Contas no formato 12345-6; mantém só o dígito verificador
+_PADRAO_CONTA = re.compile(r"\b\d{4,6}-(\d)\b")
+# Número sem hífen logo depois de "conta" ("conta 654321", "conta nº 123456")
+_PADRAO_CONTA_CITADA = re.compile(r"(\bconta:?\s*(?:n[º°o.]*\s*)?)(\d{4,7})\b", re.IGNORECASE)
+# Números soltos que podem ser contas sem hífen; só são mascarados se o índice os conhece
+_PADRAO_NUMERO = re.compile(r"(?<![\d.,*-])(\d{5,7})(?![\d.,-])")
+_PADRAO_PALAVRA = re.compile(r"[^\W\d_]+")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_lock = threading.Lock()
+
+
+class FormatadorJSON(logging.Formatter):
+    """Um objeto JSON por linha, com os campos de `extra=` no nível superior."""
+
+    def format(self, record):
+        registro = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensagem": record.getMessage()
+        }
+        for chave, valor in vars(record).items():
+            if chave not in _ATRIBUTOS_PADRAO:
+                registro[chave] = valor
+        return json.dumps(registro, ensure_ascii=False, default=str)
+
+
+class AmostragemDebug(logging.Filter):
+    """Mantém apenas uma fração dos registros DEBUG; níveis acima passam sempre."""
+
+    def __init__(self, fracao: float):
+        super().__init__()
+        self.fracao = fracao
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or self.fracao >= 1 or random.random() < self.fracao
+
+
+def _ocultar_digitos(numero: str) -> str:
+    return "*" * (len(numero) - 1) + numero[-1]
+
+
+class MascararPII(logging.Filter):
+    """Mascara nomes de clientes e números de conta na mensagem e nos campos extras.
+
+    `indice` retorna o índice de clientes (agent.entidades.IndiceClientes).
+    Cada palavra da mensagem é conferida nele sem acentos e sem diferenciar
+    maiúsculas, então "joao silva" e só "maria" também são mascarados, e o
+    custo por palavra é uma busca em dicionário, qualquer que seja o número
+    de clientes. Sem índice só as contas são mascaradas.
+    """
+
+    def __init__(self, indice: Optional[Callable[[], Any]] = None):
+        super().__init__()
+        self._indice = indice
+
+    def mascarar(self, texto: str) -> str:
+        texto = _PADRAO_CONTA.sub(r"*****-\1", texto)
+        texto = _PADRAO_CONTA_CITADA.sub(lambda m: m.group(1) + _ocultar_digitos(m.group(2)), texto)
+        if self._indice is None:
+            return texto
+        indice = self._indice()
+        texto = _PADRAO_NUMERO.sub(
+            lambda m: _ocultar_digitos(m.group(1)) if indice.por_conta(m.group(1)) else m.group(0), texto
+        )
+        return _PADRAO_PALAVRA.sub(lambda m: m.group(0)[0] + "***" if indice.eh_nome(m.group(0)) else m.group(0), texto)
+
+    def filter(self, record):
+        # Formata uma vez aqui; o QueueHandler reaproveita a mensagem já mascarada
+        record.msg = self.mascarar(record.getMessage())
+        record.args = None
+        if record.exc_info:
+            record.excecao = self.mascarar(logging.Formatter().formatException(record.exc_info))
+            record.exc_info = None
+            record.exc_text = None
+        for chave, valor in vars(record).items():
+            if chave not in _ATRIBUTOS_PADRAO and isinstance(valor, str):
+                setattr(record, chave, self.mascarar(valor))
+        return True
+
+
+def _niveis_por_modulo(valor: str) -> Dict[str, str]:
+    niveis = {}
+    for item in valor.split(","):
+        if "=" in item:
+            modulo, nivel = item.split("=", 1)
+            niveis[modulo.strip()] = nivel.strip().upper()
+    return niveis
+
+
+def _indice_de_clientes(nomes: Optional[Iterable[str]]) -> Optional[Callable[[], Any]]:
+    """Índice consultado pelo MascararPII; sem `nomes`, o dos clientes cadastrados."""
+    try:
+        from agent.entidades import IndiceClientes, indice_clientes
+    except ImportError:
+        return None
+    if nomes is None:
+        # Consultado a cada registro: acompanha reconstruir_indice_clientes()
+        return indice_clientes
+    fixo = IndiceClientes()
+    for i, nome in enumerate(nomes):
+        fixo.adicionar(str(i), nome)
+    return lambda: fixo
+
+
+def configurar_logging(nomes_sensiveis: Optional[Iterable[str]] = None):
+    """Instala o handler assíncrono no logger raiz. Chamadas repetidas não têm efeito.
+
+    `nomes_sensiveis` são os nomes mascarados nos registros; por padrão, os
+    nomes dos clientes cadastrados.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+
+        saida = logging.FileHandler(os.environ["LOG_FILE"], encoding="utf-8") if os.getenv("LOG_FILE") \
+            else logging.StreamHandler()
+        saida.setFormatter(FormatadorJSON())
+
+        fila = queue.SimpleQueue()
+        handler = logging.handlers.QueueHandler(fila)
+        handler.addFilter(AmostragemDebug(float(os.getenv("LOG_DEBUG_AMOSTRA", "1.0"))))
+        handler.addFilter(MascararPII(_indice_de_clientes(nomes_sensiveis)))
+
+        raiz = logging.getLogger()
+        for antigo in list(raiz.handlers):
+            raiz.removeHandler(antigo)
+        raiz.addHandler(handler)
+        raiz.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+        for modulo, nivel in _niveis_por_modulo(os.getenv("LOG_LEVELS", "")).items():
+            logging.getLogger(modulo).setLevel(nivel)
+
+        _listener = logging.handlers.QueueListener(fila, saida, respect_handler_level=True)
+        _listener.start()
+        atexit.register(encerrar_logging)
+
+
+def encerrar_logging():
+    """Esvazia a fila e para o thread de escrita."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
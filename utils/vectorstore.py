@@ -1,3 +1,4 @@
+import glob
 import os
 import PyPDF2
 from langchain_openai import OpenAIEmbeddings
@@ -5,8 +6,6 @@ from langchain.vectorstores import FAISS
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 import logging
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('vectorstore')
 
 def carregar_faq(pdf_path):
@@ -199,6 +198,16 @@ def carregar_multiplos_faqs(pdf_paths):
         logger.error(f"Erro ao gerar embeddings ou criar vectorstore: {str(e)}")
         raise ValueError(f"Falha ao criar base de conhecimento unificada: {str(e)}")
 
+def carregar_base_conhecimento(diretorio="data"):
+    """Carrega todos os PDFs do diretório em um vectorstore; retorna None se não houver PDFs."""
+    pdf_files = sorted(glob.glob(os.path.join(diretorio, "*.pdf")))
+    if not pdf_files:
+        logger.warning(f"Nenhum arquivo PDF encontrado em: {diretorio}")
+        return None
+    if len(pdf_files) == 1:
+        return carregar_faq(pdf_files[0])
+    return carregar_multiplos_faqs(pdf_files)
+
 def buscar_documentos_similares(vectorstore, query, k=3):
     """Função utilitária para buscar documentos similares no vectorstore."""
     if not vectorstore: